@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Área exacta frente al estimador adaptativo en Earth Engine (necesita conexión).
+
+Sobre un AOI real evalúa ``analyze`` con ``area_mode="exact"`` (suma a
+10 m) y ``"adaptive"`` (``EarthEngineBackend.area_estimate``) alternando
+el orden en cada repetición, y da el tiempo de la petición ``getInfo``,
+el área, la cota y la diferencia con la suma exacta. Earth Engine guarda
+en caché resultados idénticos, así que la primera repetición de cada modo
+es la representativa; las siguientes dan una idea de la variación.
+
+``benchmarks/bench_area.py`` mide la misma comparación con la referencia
+NumPy y sin conexión (cobertura de la cota).
+
+Uso:
+    python -m benchmarks.bench_area_ee --project mi-proyecto \\
+        --bbox -0.75,39.05,-0.05,39.55 --date 2024-10-29 --repeat 2
+"""
+import argparse
+
+from model.session import EarthEngineSession, set_session
+from model.trace import RunTrace, activate
+
+MODES = ("exact", "adaptive")
+
+
+def _run(date, bbox, mode):
+    import ee
+    from model.ee_engine import analyze
+
+    geometry = ee.Geometry.Rectangle(bbox, proj=None, geodesic=False)
+    trace = RunTrace({"date": date, "area_mode": mode})
+    with activate(trace):
+        area_ha, result = analyze(date, 30, 10, "VH", "DESCENDING", geometry, area_mode=mode)
+    trace.finish()
+    wall_s = sum(req["wall_s"] or 0 for span in trace.as_dict()["spans"]
+                 for req in span["requests"] if req["kind"] == "getInfo")
+    return area_ha, result.area_error_ha or 0.0, wall_s
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--project", required=True, help="proyecto de Earth Engine")
+    parser.add_argument("--bbox", required=True, help="xmin,ymin,xmax,ymax (EPSG:4326)")
+    parser.add_argument("--date", default="2024-10-29")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    bbox = [float(v) for v in args.bbox.split(",")]
+    session = EarthEngineSession(project=args.project)
+    set_session(session)
+    session.ensure()
+
+    print(f"{'rep':>3} {'modo':<9} {'getInfo s':>10} {'área ha':>12} {'± ha':>10} {'dif. ha':>10}")
+    for rep in range(args.repeat):
+        runs = {}
+        for mode in (MODES if rep % 2 == 0 else MODES[::-1]):
+            runs[mode] = session.call(lambda m=mode: _run(args.date, bbox, m))
+        exact = runs["exact"][0]
+        for mode in MODES:
+            area_ha, error_ha, wall_s = runs[mode]
+            print(f"{rep:>3} {mode:<9} {wall_s:>10.2f} {area_ha:>12.2f} {error_ha:>10.2f} "
+                  f"{area_ha - exact:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
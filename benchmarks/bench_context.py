@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del contexto espacial (paso 8): media enmascarada sobre un kernel
+cuadrado, versión ingenua O(k²) frente a tablas integrales.
+
+Uso:
+    python -m benchmarks.bench_context --size 2048 --radius 5
+"""
+import argparse
+import time
+
+import numpy as np
+
+from model.focal import box_mean, neighborhood_mean, square_offsets
+
+
+def synthetic_fm2(size, seed=0):
+    """FM2 sintético: valores en (0.8, 1] y ~40 % de píxeles enmascarados."""
+    rng = np.random.default_rng(seed)
+    fm2 = rng.uniform(0.8, 1.0, (size, size)).astype(np.float32)
+    fm2[rng.random((size, size)) < 0.4] = np.nan
+    return fm2
+
+
+def _best_time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=2048, help="lado del raster (px)")
+    parser.add_argument("--radius", type=int, nargs="+", default=[1, 3, 5, 10, 20])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    fm2 = synthetic_fm2(args.size)
+    mpx = fm2.size / 1e6
+    print(f"raster {args.size}x{args.size} ({mpx:.1f} Mpx), {np.isnan(fm2).mean():.0%} enmascarado")
+    print(f"{'radio':>6} {'ingenua Mpx/s':>14} {'integral Mpx/s':>15} {'aceleración':>12} {'máx |dif|':>10}")
+    for radius in args.radius:
+        t_naive, ref = _best_time(lambda: neighborhood_mean(fm2, square_offsets(radius)), args.repeat)
+        t_sat, out = _best_time(lambda: box_mean(fm2, radius), args.repeat)
+        diff = float(np.nanmax(np.abs(out - ref)))
+        print(f"{radius:>6} {mpx / t_naive:>14.1f} {mpx / t_sat:>15.1f} "
+              f"{t_naive / t_sat:>11.1f}x {diff:>10.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Tamaño del grafo Earth Engine con las pertenencias difusas de utils.py
+frente a la forma compacta de model/ee_fuzzy.py (sustituto fake_ee).
+
+Mide los nodos distintos y los bytes serializados de una pertenencia
+aislada y de las dos peticiones del análisis (área y teselas), y comprueba
+sobre una escena sintética que ambas versiones dan el mismo resultado.
+
+Uso:
+    python -m benchmarks.bench_graph --size 96
+"""
+import argparse
+import types
+
+import numpy as np
+
+from benchmarks.synthetic import ee_catalog, make_scene
+from model import fake_ee
+
+DATE = "2024-10-20"
+
+
+def _variants():
+    from model import utils
+    from model.ee_fuzzy import FuzzyExpressionBuilder
+    return {
+        "utils.fuzzyS/Z": lambda: types.SimpleNamespace(s=utils.fuzzyS, z=utils.fuzzyZ),
+        "ee_fuzzy": FuzzyExpressionBuilder,
+    }
+
+
+def _measure(make_fuzzy):
+    import ee
+    from model.ee_engine import EarthEngineBackend, evaluate_summary, load_inputs
+    from model.engine import FloodParams, run_pipeline
+
+    session = ee.session
+    fuzzy = make_fuzzy()
+    single = fuzzy.z(ee.Image("JRC/GSW1_4/GlobalSurfaceWater").select("occurrence"), 0, 5)
+
+    geometry = ee.Geometry.Rectangle([-0.5, 39.2, -0.2, 39.5])
+    inputs, counts = load_inputs(DATE, 30, 10, "VH", "DESCENDING", geometry)
+    result = run_pipeline(EarthEngineBackend(geometry, fuzzy), inputs, FloodParams())
+    first = len(session.requests)
+    values = evaluate_summary(counts, result.area_ha)
+    result.flooded_bin.getMapId({"min": 0, "max": 1, "palette": ["blue"]})
+    flooded = session.compute(result.flooded_bin).array()
+    return {
+        "single": (fake_ee.graph_size(single), len(fake_ee.serialize(single))),
+        "requests": list(zip([k for k, _ in session.requests[first:]],
+                             session.graph_nodes[first:], session.request_bytes[first:])),
+        "area_ha": values["area_ha"],
+        "flooded": np.nan_to_num(flooded) > 0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=96, help="lado de la escena (px)")
+    args = parser.parse_args(argv)
+
+    catalog = ee_catalog(make_scene(args.size), DATE)
+    results = {}
+    for name in ("utils.fuzzyS/Z", "ee_fuzzy"):
+        with fake_ee.installed(catalog=catalog):
+            # utils/ee_fuzzy importan ``ee``: se cargan con el sustituto ya instalado
+            results[name] = _measure(_variants()[name])
+
+    print(f"{'versión':<16} {'petición':<14} {'nodos':>6} {'KiB':>8}")
+    for name, res in results.items():
+        nodes, size = res["single"]
+        print(f"{name:<16} {'una pertenencia':<14} {nodes:>6} {size / 1024:>8.2f}")
+        for kind, nodes, size in res["requests"]:
+            print(f"{name:<16} {kind:<14} {nodes:>6} {size / 1024:>8.2f}")
+
+    old, new = results.values()
+    same = np.array_equal(old["flooded"], new["flooded"])
+    print(f"\náreas: {old['area_ha']:.2f} ha / {new['area_ha']:.2f} ha, "
+          f"FloodedBin idéntico: {'sí' if same else 'no'}")
+    for (kind, n_old, b_old), (_, n_new, b_new) in zip(old["requests"], new["requests"]):
+        print(f"{kind}: {n_old} -> {n_new} nodos ({1 - n_new / n_old:.0%} menos), "
+              f"{b_old / 1024:.1f} -> {b_new / 1024:.1f} KiB ({1 - b_new / b_old:.0%} menos)")
+
+
+if __name__ == "__main__":
+    main()
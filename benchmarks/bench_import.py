@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Coste de importación del plugin al arrancar QGIS (``classFactory``).
+
+Lanza un intérprete limpio con ``-X importtime``, importa el módulo del
+plugin tal y como lo hace QGIS y resume el tiempo propio del plugin y de
+las dependencias pesadas que no deberían cargarse hasta abrir el diálogo
+(``ee``, ``resources``, el diálogo, NumPy). Debe ejecutarse con el Python
+de QGIS (necesita ``qgis``).
+
+Uso:
+    python -m benchmarks.bench_import
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = os.path.basename(PLUGIN_DIR)
+
+# Módulos que no deben importarse hasta run_dialog/run_analysis
+DEFERRED = ("ee", f"{PACKAGE}.resources", f"{PACKAGE}.flood_analysis_module_dialog",
+            f"{PACKAGE}.flood_analysis_task", "numpy")
+
+
+def _importtime(statement):
+    """Devuelve {módulo: (propio_us, acumulado_us)} de ``statement``."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [os.path.dirname(PLUGIN_DIR), os.environ.get("PYTHONPATH", "")]))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                          env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.parse_args(argv)
+
+    # Lo que QGIS ya tiene cargado no cuenta como coste del plugin
+    baseline = _importtime("import qgis.core, qgis.gui, qgis.PyQt.QtWidgets")
+    plugin = _importtime(f"import qgis.core, qgis.gui, qgis.PyQt.QtWidgets; "
+                         f"import {PACKAGE}.flood_analysis_module")
+
+    extra = {name: t for name, t in plugin.items() if name not in baseline}
+    total_ms = sum(self_us for self_us, _ in extra.values()) / 1000
+    print(f"importación del plugin: {total_ms:.1f} ms en {len(extra)} módulos nuevos")
+    for name, (self_us, cumulative_us) in sorted(extra.items(), key=lambda kv: -kv[1][1])[:10]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    loaded = [name for name in DEFERRED if name in extra]
+    if loaded:
+        print("se cargan al arrancar (deberían diferirse): " + ", ".join(loaded))
+        return 1
+    print("ee, resources, diálogo y NumPy quedan diferidos hasta abrir el plugin.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
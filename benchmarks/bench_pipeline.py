@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark por etapas del modelo (motor NumPy) sobre escenas sintéticas.
+
+Para cada tamaño de AOI mide tiempo, rendimiento (Mpx/s) y pico de memoria
+de las etapas de ``_run_analysis``: compuestas, razón, FM_FV (difuso y
+máscaras), FM_OW, FM_HD, fusión, contexto, binario y área. Sin conexión.
+
+Uso:
+    python -m benchmarks.bench_pipeline --size 512 1024 2048
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.synthetic import make_scene
+from model.engine import FloodParams
+from model.numpy_engine import NumpyEngine, make_inputs
+
+
+def _stages(engine, scene, params):
+    """Etapas en el orden del pipeline: (nombre, función que usa ``layers``)."""
+    return [
+        ("compuestas", lambda L: L.update(inputs=make_inputs(
+            scene["before"], scene["after"], scene["ndbi"], scene["precip"],
+            scene["occurrence"], scene["dem"]))),
+        ("razón", lambda L: L.update(difference=engine.difference(
+            L["inputs"].before, L["inputs"].after, params))),
+        ("FM_FV", lambda L: L.update(FM_FV=engine.fm_fv(
+            L["difference"], L["inputs"].ndbi, L["inputs"].precip, params))),
+        ("FM_OW", lambda L: L.update(FM_OW=engine.fm_ow(L["inputs"].occurrence, params))),
+        ("FM_HD", lambda L: L.update(FM_HD=engine.fm_hd(L["inputs"].dem, params))),
+        ("fusión", lambda L: L.update(zip(("FM1", "FM2"), engine.fuse(
+            L["FM_FV"], L["FM_OW"], L["FM_HD"], params)))),
+        ("contexto", lambda L: L.update(zip(("D", "FM3"), engine.context(L["FM2"], params)))),
+        ("binario", lambda L: L.update(zip(("flooded", "FloodedBin"), engine.flooded(
+            L["FM3"], L["FM_FV"])))),
+        ("área", lambda L: L.update(area_ha=engine.area_ha(L["FloodedBin"]))),
+    ]
+
+
+def profile(scene, pixel_size=10.0, params=None, memory=True):
+    """Ejecuta las etapas una vez; devuelve ([(etapa, s, pico MB)], capas)."""
+    params = params or FloodParams()
+    engine = NumpyEngine(pixel_size)
+    layers, timings = {}, []
+    if memory:
+        tracemalloc.start()
+    try:
+        for name, fn in _stages(engine, scene, params):
+            if memory:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+            t0 = time.perf_counter()
+            fn(layers)
+            elapsed = time.perf_counter() - t0
+            peak = (tracemalloc.get_traced_memory()[1] - base) / 2**20 if memory else float("nan")
+            timings.append((name, elapsed, peak))
+    finally:
+        if memory:
+            tracemalloc.stop()
+    return timings, layers
+
+
+def _best(runs):
+    """Mejor tiempo por etapa entre varias repeticiones (pico de la primera)."""
+    best = []
+    for i, (name, elapsed, peak) in enumerate(runs[0]):
+        best.append((name, min(run[i][1] for run in runs), peak))
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, nargs="+", default=[512, 1024, 2048],
+                        help="lado del AOI (px)")
+    parser.add_argument("--pixel-size", type=float, default=10.0, help="m")
+    parser.add_argument("--before", type=int, default=4, help="escenas S1 before")
+    parser.add_argument("--after", type=int, default=2, help="escenas S1 after")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true",
+                        help="no mide el pico de memoria (tracemalloc)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for size in args.size:
+        scene = make_scene(size, args.before, args.after, pixel_size=args.pixel_size,
+                           seed=args.seed)
+        mpx = size * size / 1e6
+        runs = []
+        for i in range(args.repeat):
+            timings, layers = profile(scene, args.pixel_size,
+                                      memory=not args.no_memory and i == 0)
+            runs.append(timings)
+        best = _best(runs)
+
+        truth = scene["truth"]
+        pred = layers["FloodedBin"].astype(bool)
+        iou = (pred & truth).sum() / max((pred | truth).sum(), 1)
+        total = sum(t for _, t, _ in best)
+        print(f"\nAOI {size}x{size} ({mpx:.2f} Mpx), área {layers['area_ha']:.1f} ha, "
+              f"IoU frente a la verdad {iou:.2f}")
+        print(f"{'etapa':<12} {'ms':>9} {'Mpx/s':>9} {'%':>6} {'pico MB':>9}")
+        for name, elapsed, peak in best:
+            print(f"{name:<12} {elapsed * 1e3:>9.1f} {mpx / elapsed:>9.1f} "
+                  f"{100 * elapsed / total:>5.1f}% {peak:>9.1f}")
+        print(f"{'total':<12} {total * 1e3:>9.1f} {mpx / total:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Etiquetado de componentes y vectorización de FloodedBin (model/polygonize.py).
+
+Mide el etiquetado por tramos de toda la máscara frente al etiquetado por
+teselas en paralelo con costuras cosidas (mismo número de componentes), y
+la escritura del GeoPackage si GDAL/OGR está disponible.
+
+Uso:
+    python -m benchmarks.bench_polygonize --size 8192 --tile-size 2048
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import smooth_field
+from model.components import label, label_tiled
+from model.polygonize import ogr, polygonize
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=8192, help="lado de la máscara (px)")
+    parser.add_argument("--tile-size", type=int, default=2048)
+    parser.add_argument("--fraction", type=float, default=0.08, help="fracción inundada")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    field = smooth_field((args.size, args.size), 24, rng)
+    flooded = (field > np.quantile(field, 1 - args.fraction)).astype(np.uint8)
+    mpx = flooded.size / 1e6
+
+    t0 = time.perf_counter()
+    _, n = label(flooded)
+    t_full = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    _, n_tiled = label_tiled(flooded, args.tile_size, workers=args.workers)
+    t_tiled = time.perf_counter() - t0
+
+    print(f"máscara {args.size}x{args.size} ({mpx:.0f} Mpx), {args.fraction:.0%} inundada")
+    print(f"{'etapa':<22} {'s':>7} {'Mpx/s':>8} {'zonas':>8}")
+    print(f"{'etiquetado completo':<22} {t_full:>7.2f} {mpx / t_full:>8.1f} {n:>8}")
+    print(f"{'etiquetado por teselas':<22} {t_tiled:>7.2f} {mpx / t_tiled:>8.1f} {n_tiled:>8}")
+    if n != n_tiled:
+        print("AVISO: el número de zonas no coincide")
+
+    if ogr is None:
+        print("GDAL/OGR no disponible: se omite la escritura del GeoPackage.")
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "FloodedBin.gpkg")
+        t0 = time.perf_counter()
+        written = polygonize(flooded, path, (0, 10, 0, args.size * 10, 0, -10),
+                             tile_size=args.tile_size, workers=args.workers)
+        t_poly = time.perf_counter() - t0
+        print(f"{'GeoPackage':<22} {t_poly:>7.2f} {mpx / t_poly:>8.1f} {written:>8} "
+              f"({os.path.getsize(path) / 2 ** 20:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Cuenta las peticiones bloqueantes y el tamaño del grafo del análisis Earth
+Engine usando el sustituto ``model.fake_ee`` (sin conexión).
+
+Con ``--size N`` el grafo se ejecuta sobre una escena sintética de N x N
+píxeles y el área se compara con la del motor NumPy.
+
+Uso:
+    python -m benchmarks.bench_roundtrips [--size 128]
+"""
+import argparse
+
+from model import fake_ee
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--date", default="2024-10-29")
+    parser.add_argument("--before", type=int, default=30)
+    parser.add_argument("--after", type=int, default=10)
+    parser.add_argument("--size", type=int, default=0,
+                        help="ejecuta sobre una escena sintética de este lado (px)")
+    args = parser.parse_args(argv)
+
+    catalog = scene = None
+    date = args.date
+    if args.size:
+        from benchmarks.synthetic import ee_catalog, make_scene
+        # Sin la mezcla T500 (sólo existe como asset en Earth Engine)
+        date = "2024-10-20" if date == "2024-10-29" else date
+        scene = make_scene(args.size)
+        catalog = ee_catalog(scene, date, args.before, args.after)
+
+    with fake_ee.installed(responses={"size": 2, "If": 0}, catalog=catalog) as session:
+        import ee
+        from model.ee_engine import analyze
+
+        geometry = ee.Geometry.Rectangle([-0.5, 39.2, -0.2, 39.5])
+        area_ha, result = analyze(date, args.before, args.after,
+                                  "VH", "DESCENDING", geometry)
+        result.flooded_bin.getMapId({"min": 0, "max": 1, "palette": ["blue"]})
+
+    kinds = [kind for kind, _ in session.requests]
+    print(f"peticiones bloqueantes: {session.round_trips} "
+          f"(getInfo={kinds.count('getInfo')}, getMapId={kinds.count('getMapId')})")
+    print(f"nodos creados: {session.nodes}")
+    for kind, size, nodes in zip(kinds, session.request_bytes, session.graph_nodes):
+        print(f"  {kind:<9} {nodes:>5} nodos distintos {size / 1024:>8.1f} KiB serializados")
+
+    if scene is not None:
+        from model.engine import run_pipeline
+        from model.numpy_engine import NumpyEngine, make_inputs
+        inputs = make_inputs(*(scene[k] for k in ("before", "after", "ndbi", "precip",
+                                                   "occurrence", "dem")))
+        local = run_pipeline(NumpyEngine(catalog["pixel_size"]), inputs)
+        print(f"área EE (sustituto): {area_ha:.2f} ha, motor NumPy: {local.area_ha:.2f} ha")
+
+
+if __name__ == "__main__":
+    main()
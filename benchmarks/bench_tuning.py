@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Reevaluación incremental al ajustar umbrales y pesos (StageGraph).
+
+Guarda una escena sintética como ``.npy`` (pilas S1 y CHIRPS sin componer)
+y, para cada parámetro que se suele ajustar, compara el tiempo de rehacer
+todo (lectura, compuestas y etapas) con el de ``model.batch.tune_local_job``
+sobre el mismo trabajo, lista las etapas recalculadas y comprueba que el
+área coincide.
+
+Uso:
+    python -m benchmarks.bench_tuning --size 2048
+"""
+import argparse
+import os
+import tempfile
+import time
+from dataclasses import replace
+
+import numpy as np
+
+from benchmarks.synthetic import make_scene
+from model.batch import BatchJob, tune_local_job
+from model.engine import FloodParams, GraphCache
+
+CHANGES = (
+    ("s1_thr", 1.10), ("s2_thr", 1.30), ("ndbi_thr", 0.25), ("rain_thr", 8.0),
+    ("w1", 5.0), ("w2", 2.0), ("fm1_thr", 0.7), ("d_z2", 0.3), ("isolated_weight", 0.0),
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=2048, help="lado del AOI (px)")
+    parser.add_argument("--pixel-size", type=float, default=10.0, help="m")
+    args = parser.parse_args(argv)
+
+    scene = make_scene(args.size, pixel_size=args.pixel_size)
+    with tempfile.TemporaryDirectory() as tmp:
+        inputs = {}
+        for name in ("before", "after", "ndbi", "precip", "occurrence", "dem"):
+            inputs[name] = os.path.join(tmp, f"{name}.npy")
+            np.save(inputs[name], scene[name])
+        job = BatchJob("tuning", "2024-10-20", inputs=inputs, pixel_size=args.pixel_size)
+        graphs = GraphCache()
+
+        t0 = time.perf_counter()
+        tune_local_job(job, graphs=graphs)
+        print(f"AOI {args.size}x{args.size}: primera ejecución {time.perf_counter() - t0:.2f} s")
+        print(f"{'parámetro':<16} {'todo s':>7} {'incr. s':>8} {'x':>6}  etapas recalculadas")
+        for name, value in CHANGES:
+            params = replace(FloodParams(), **{name: value})
+            t0 = time.perf_counter()
+            full = tune_local_job(job, params, graphs=GraphCache())
+            t_full = time.perf_counter() - t0
+            tune_local_job(job, graphs=graphs)  # cada cambio parte de los valores por defecto
+            t0 = time.perf_counter()
+            result = tune_local_job(job, params, graphs=graphs)
+            t_incr = time.perf_counter() - t0
+            flag = "" if abs(result.area_ha - full.area_ha) < 1e-6 else "  ¡área distinta!"
+            print(f"{name:<16} {t_full:>7.2f} {t_incr:>8.3f} {t_full / t_incr:>6.1f}  "
+                  f"{', '.join(graphs.latest.computed)}{flag}")
+
+if __name__ == "__main__":
+    main()
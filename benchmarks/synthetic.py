@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Escenas sintéticas para los benchmarks (sin conexión ni datos reales).
+
+``make_scene`` genera, sobre una malla de ``size`` x ``size`` píxeles, las
+mismas capas que ``ee_engine.load_inputs`` recoge de Earth Engine:
+
+ - pilas S1 before/after en dB con speckle multiplicativo (gamma, L looks)
+   y manchas de inundación (retrodispersión baja) en las zonas bajas,
+ - NDBI con núcleos urbanos y huecos de nubes (NaN),
+ - pila diaria CHIRPS a resolución gruesa (~5 km),
+ - ocurrencia GSW (río permanente con orillas estacionales) y
+ - DEM de un valle con relieve suave.
+
+Devuelve también la verdad terreno (``truth``) de las manchas inundadas.
+"""
+import numpy as np
+
+from model.focal import box_mean
+
+LAND_DB  = -15.0   # retrodispersión media VH de suelo
+WATER_DB = -24.0   # agua libre
+
+
+def smooth_field(shape, scale_px, rng):
+    """Ruido suave en [0, 1] con estructuras de ~``scale_px`` píxeles."""
+    h, w = shape
+    step = max(int(scale_px), 1)
+    coarse = rng.random((h // step + 2, w // step + 2)).astype(np.float32)
+    field = np.repeat(np.repeat(coarse, step, axis=0), step, axis=1)[:h, :w]
+    field = box_mean(field, max(step // 2, 1))
+    lo, hi = float(field.min()), float(field.max())
+    return (field - lo) / (hi - lo or 1)
+
+
+def speckle_db(mean_db, looks, rng):
+    """Aplica speckle gamma (media 1) en lineal y vuelve a dB."""
+    linear = 10 ** (mean_db / 10)
+    noise = rng.gamma(looks, 1.0 / looks, mean_db.shape).astype(np.float32)
+    return (10 * np.log10(linear * noise)).astype(np.float32)
+
+
+def make_scene(size=1024, n_before=4, n_after=2, n_days=1, pixel_size=10.0,
+               flood_fraction=0.08, looks=4, urban_fraction=0.05, cloud_fraction=0.02,
+               seed=0):
+    """Escena sintética: dict con las entradas de ``make_inputs`` y ``truth``."""
+    rng = np.random.default_rng(seed)
+    shape = (size, size)
+    rows, cols = np.mgrid[0:size, 0:size].astype(np.float32)
+
+    # DEM: valle con el cauce serpenteando por el centro
+    river_col = size / 2 + size / 8 * np.sin(rows / size * 2 * np.pi)
+    dist = np.abs(cols - river_col) * pixel_size  # m
+    dem = (20 + dist * 0.02 + 15 * smooth_field(shape, size / 16, rng)).astype(np.float32)
+
+    # GSW: cauce permanente y orillas estacionales
+    occurrence = np.zeros(shape, np.float32)
+    bank = dist < 12 * pixel_size
+    occurrence[bank] = rng.uniform(5, 40, bank.sum())
+    channel = dist < 4 * pixel_size
+    occurrence[channel] = rng.uniform(80, 100, channel.sum())
+
+    # Manchas de inundación en las zonas bajas próximas al cauce
+    lowness = 1 - (dem - dem.min()) / (np.ptp(dem) or 1)
+    blobs = smooth_field(shape, size / 32, rng)
+    score = lowness * blobs
+    truth = score >= np.quantile(score, 1 - flood_fraction)
+    truth &= ~channel
+
+    # S1: la escena "after" baja la retrodispersión donde hay agua
+    base_db = LAND_DB + 3 * (smooth_field(shape, size / 64, rng) - 0.5)
+    base_db[channel] = WATER_DB
+    after_db = np.where(truth, WATER_DB, base_db).astype(np.float32)
+    before = np.stack([speckle_db(base_db, looks, rng) for _ in range(n_before)])
+    after = np.stack([speckle_db(after_db, looks, rng) for _ in range(n_after)])
+
+    # NDBI: vegetación/suelo < 0, núcleos urbanos > 0.2, nubes => NaN
+    ndbi = (-0.15 + 0.1 * rng.standard_normal(shape)).astype(np.float32)
+    urban = smooth_field(shape, size / 24, rng) > 1 - urban_fraction
+    ndbi[urban] = rng.uniform(0.25, 0.45, urban.sum())
+    ndbi[smooth_field(shape, size / 48, rng) > 1 - cloud_fraction] = np.nan
+
+    # CHIRPS: celdas de ~5 km, lluvia intensa el día del evento
+    cell = max(int(round(5000 / pixel_size)), 1)
+    precip = np.stack([
+        np.kron(rng.gamma(2.0, 8.0, (size // cell + 1, size // cell + 1)),
+                np.ones((cell, cell)))[:size, :size].astype(np.float32)
+        for _ in range(n_days)
+    ])
+
+    return {
+        "before": before, "after": after, "ndbi": ndbi, "precip": precip,
+        "occurrence": occurrence, "dem": dem, "truth": truth,
+    }
+
+
+def ee_catalog(scene, date_str, days_before=30, days_after=10, polarization="VH",
+               orbit="DESCENDING", pixel_size=10.0):
+    """
+    Catálogo de ``model.fake_ee`` con la escena: mismas colecciones, bandas
+    y propiedades que consulta ``ee_engine.load_inputs`` para ``date_str``.
+    """
+    import datetime
+
+    event = datetime.datetime.fromisoformat(date_str)
+
+    def stamp(days):
+        return (event + datetime.timedelta(days=days)).isoformat()
+
+    s1_props = {"instrumentMode": "IW", "orbitProperties_pass": orbit,
+                "transmitterReceiverPolarisation": ["VV", "VH"], "resolution_meters": 10}
+    s1 = []
+    for i, img in enumerate(scene["before"]):
+        day = -days_before + (i + 0.5) * days_before / len(scene["before"])
+        s1.append({"properties": {**s1_props, "system:time_start": stamp(day)},
+                   "bands": {polarization: img}})
+    for i, img in enumerate(scene["after"]):
+        day = (i + 0.5) * days_after / len(scene["after"])
+        s1.append({"properties": {**s1_props, "system:time_start": stamp(day)},
+                   "bands": {polarization: img}})
+
+    # S2 SR: B8/B11 que reproducen el NDBI; las nubes, en el bit 10 de QA60
+    ndbi = scene["ndbi"]
+    clouds = np.isnan(ndbi)
+    b8 = np.full(ndbi.shape, 3000.0)
+    b11 = b8 * (1 + np.nan_to_num(ndbi)) / (1 - np.nan_to_num(ndbi))
+    s2 = [{"properties": {"CLOUDY_PIXEL_PERCENTAGE": 5, "system:time_start": "2024-09-01"},
+           "bands": {"B8": b8, "B11": b11, "QA60": np.where(clouds, 1 << 10, 0)}}]
+
+    chirps = [{"properties": {"system:time_start": stamp(-i)}, "bands": {"precipitation": day}}
+              for i, day in enumerate(scene["precip"])]
+
+    return {
+        "pixel_size": pixel_size,
+        "shape": scene["dem"].shape,
+        "COPERNICUS/S1_GRD": s1,
+        "COPERNICUS/S2_SR_HARMONIZED": s2,
+        "UCSB-CHG/CHIRPS/DAILY": chirps,
+        "JRC/GSW1_4/GlobalSurfaceWater": {"occurrence": scene["occurrence"]},
+        "WWF/HydroSHEDS/03VFDEM": {"b1": scene["dem"]},
+    }
@@ -1,14 +1,15 @@
 # -*- coding: utf-8 -*-
+import math
 import os
-import ee
+import time
 
 from qgis.PyQt.QtCore    import QSettings, QTranslator, QCoreApplication, Qt
 from qgis.PyQt.QtGui     import QIcon
-from qgis.PyQt.QtWidgets import QAction, QMessageBox, QProgressDialog
+from qgis.PyQt.QtWidgets import QAction, QMessageBox
 
 from qgis.core import (
+    QgsApplication,
     QgsProject,
-    QgsRasterLayer,
     QgsCoordinateReferenceSystem,
     QgsCoordinateTransform,
     QgsGeometry,
@@ -18,8 +19,8 @@ from qgis.core import (
 )
 from qgis.gui import QgsMapTool, QgsRubberBand
 
-from .resources import *
-from .flood_analysis_module_dialog import flood_analysisDialog
+# ``ee``, ``resources``, el diálogo y el modelo se importan al usarse por
+# primera vez (run_dialog / run_analysis) para no retrasar el arranque de QGIS.
 
 
 # ------------------------ TOOLS ------------------------
@@ -158,7 +159,7 @@ class flood_analysis:
     """
     Plugin flood_analysis_module para QGIS 3.x:
      - AOI por Punto (con tamaño) o Rectángulo dibujado.
-     - Progreso modal simple.
+     - Análisis en segundo plano (QgsTask), con varias ejecuciones en cola.
      - Parche null-safe para GSW y área.
     """
 
@@ -188,6 +189,16 @@ class flood_analysis:
         self.map_tool_point = None
         self.map_tool_rect  = None
 
+        # Caché de resultados y servidor local de teselas (al primer uso)
+        self.result_cache = None
+        self.tile_server  = None
+
+        # Tareas en curso (referencia para que no las recoja el GC)
+        self.tasks = []
+
+        # Proveedor de Processing
+        self.provider = None
+
     def tr(self, message):
         return QCoreApplication.translate('flood_analysis', message)
 
@@ -212,8 +223,17 @@ class flood_analysis:
         self.actions.append(action)
         return action
 
+    def initProcessing(self):
+        from .flood_analysis_provider import FloodAnalysisProvider
+        self.provider = FloodAnalysisProvider()
+        QgsApplication.processingRegistry().addProvider(self.provider)
+
     def initGui(self):
-        icon_run = ':/plugins/flood_analysis_module/icon.png'
+        self.initProcessing()
+        QgsProject.instance().readProject.connect(self._on_project_read)
+
+        # Icono desde archivo: no obliga a cargar resources.py al arrancar
+        icon_run = os.path.join(self.plugin_dir, 'img', 'icon.png')
         self.action_run = self.add_action(
             icon_path=icon_run,
             text=self.tr('Analizar Inundaciones'),
@@ -223,6 +243,17 @@ class flood_analysis:
         self.first_start = True
 
     def unload(self):
+        self.cancel_analyses()
+        try:
+            QgsProject.instance().readProject.disconnect(self._on_project_read)
+        except (TypeError, RuntimeError):
+            pass
+        if self.provider is not None:
+            QgsApplication.processingRegistry().removeProvider(self.provider)
+            self.provider = None
+        if self.tile_server is not None:
+            self.tile_server.shutdown()
+            self.tile_server = None
         for action in self.actions:
             self.iface.removePluginMenu(self.menu, action)
             self.iface.removeToolBarIcon(action)
@@ -232,14 +263,18 @@ class flood_analysis:
     def run_dialog(self):
         if self.first_start or not hasattr(self, 'dlg'):
             self.first_start = False
+            from . import resources  # noqa: F401 (registra :/plugins/flood_analysis_module)
+            from .flood_analysis_module_dialog import flood_analysisDialog
             self.dlg = flood_analysisDialog()
             self.dlg.btn_run.clicked.connect(self.run_analysis)
+            self.dlg.btn_cancel.clicked.connect(self.cancel_analyses)
             self.dlg.btn_point.clicked.connect(self.activate_point_tool)
             self.dlg.btn_rect.clicked.connect(self.activate_rect_tool)
 
         # Reset textos
         self.dlg.lbl_coords.setText("AOI: (sin definir)")
         self.dlg.lbl_area.setText("Área inundada: -- ha")
+        self.dlg.lbl_trace.setText("")
         self.dlg.show()
 
     def activate_point_tool(self):
@@ -256,33 +291,14 @@ class flood_analysis:
         if hasattr(self, "dlg"):
             self.dlg.lbl_coords.setText("AOI: arrastre para dibujar el rectángulo…")
 
-    # --------------- Progreso helpers ---------------
-
-    def _new_progress(self, text="Preparando…", maximum=100):
-        parent = self.dlg if hasattr(self, "dlg") else self.iface.mainWindow()
-        prog = QProgressDialog(text, "Abortar", 0, maximum, parent)
-        prog.setWindowTitle("FloodAnalysis – Progreso")
-        prog.setWindowModality(Qt.WindowModal)
-        prog.setMinimumDuration(0)
-        prog.setAutoClose(False)
-        prog.setAutoReset(False)
-        prog._cancelled = False
-        prog.canceled.connect(lambda: setattr(prog, "_cancelled", True))
-        return prog
-
-    def _step(self, prog: QProgressDialog, value: int, text: str = None):
-        if prog is None:
-            return
-        if getattr(prog, "_cancelled", False):
-            raise RuntimeError("Operación cancelada por el usuario.")
-        if text:
-            prog.setLabelText(text)
-        prog.setValue(value)
-        QCoreApplication.processEvents()
-
     # ----------------- Ejecutar -----------------
 
     def run_analysis(self):
+        import ee
+        from .flood_analysis_task import FloodAnalysisTask, add_flood_layer
+        from .model.cache import cache_key
+        from .model.engine import FloodParams
+
         # Parámetros
         qdate = self.dlg.date_event.date()
         event_date_str = qdate.toString('yyyy-MM-dd')
@@ -306,231 +322,158 @@ class flood_analysis:
                                     "El rectángulo debe tener ancho y alto. Dibújalo nuevamente.")
                 return
             ee_geometry = ee.Geometry.Rectangle([xmin, ymin, xmax, ymax], proj=None, geodesic=False)
+            aoi = {"bbox": [xmin, ymin, xmax, ymax]}
+            aoi_bbox = (xmin, ymin, xmax, ymax)
         elif (self.click_lon is not None) and (self.click_lat is not None):
             size_km = int(self.dlg.spin_size.value())
             half_m  = (size_km * 1000) / 2.0
             center_point = ee.Geometry.Point([self.click_lon, self.click_lat])
             ee_geometry  = center_point.buffer(half_m).bounds()
+            aoi = {"point": [self.click_lon, self.click_lat], "size_km": size_km}
+            dlat = half_m / 111320.0
+            dlon = dlat / max(math.cos(math.radians(self.click_lat)), 1e-6)
+            aoi_bbox = (self.click_lon - dlon, self.click_lat - dlat,
+                        self.click_lon + dlon, self.click_lat + dlat)
         else:
             QMessageBox.warning(self.dlg, self.tr('Falta AOI'),
                                 self.tr('Defina el AOI con Point o Rectángulo.'))
             return
 
-        # Progreso
-        prog = self._new_progress("Inicializando análisis…")
-        self.dlg.btn_run.setEnabled(False)
-
-        try:
-            self._step(prog, 5, "Inicializando Earth Engine…")
-            # Ejecutar algoritmo
-            area_ha = self._run_analysis(
-                event_date_str, days_before, days_after,
-                polarization, orbit_dir, ee_geometry, prog
-            )
-            self._step(prog, 100, "Completado.")
-
-            QMessageBox.information(self.dlg, "Éxito",
-                                    "El análisis ha terminado y la capa ha sido añadida.")
-            self.dlg.lbl_area.setText(f"Área inundada: {area_ha:.2f} ha")
+        key = cache_key(
+            date=event_date_str, days_before=days_before, days_after=days_after,
+            polarization=polarization, orbit=orbit_dir, aoi=aoi, params=FloodParams()
+        )
 
-        except Exception as e:
-            QMessageBox.critical(self.dlg, self.tr('Error durante el análisis'), str(e))
-        finally:
+        # Caché: mismo análisis con teselas aún vigentes o guardadas en disco
+        # => capa inmediata. Si la URL de EE caducó, la capa se sirve desde
+        # el MBTiles local y una tarea renueva la URL para las que falten.
+        cached = self._result_cache().get(key)
+        tile_server = self._tile_server()
+        fresh = bool(cached) and cached.get("tile_expires", 0) > time.time()
+        shown = bool(cached) and (fresh or tile_server.has_tiles(key))
+        if shown:
             try:
-                prog.close()
-            except Exception:
-                pass
-            self.dlg.btn_run.setEnabled(True)
-            # limpiar estado del AOI
-            self.click_lon = None
-            self.click_lat = None
-            self.rect_bbox = None
+                add_flood_layer(cached["xyz_url"] if fresh else None, tile_server, key,
+                                aoi_bbox if fresh else None)
+                area_text = self._area_text(cached["area_ha"], cached.get("area_error_ha", 0))
+                self.dlg.lbl_area.setText(f"Área inundada: {area_text} (caché)")
+            except Exception as e:
+                QMessageBox.critical(self.dlg, self.tr('Error durante el análisis'), str(e))
+            if fresh:
+                self._reset_aoi()
+                return
 
-    # --------------- Núcleo del algoritmo ---------------
+        # Ejecutar algoritmo en segundo plano
+        task = FloodAnalysisTask(
+            event_date_str, days_before, days_after, polarization, orbit_dir,
+            ee_geometry, cache=self._result_cache(), cache_key=key, cached=cached,
+            trace_dir=self._plugin_data_dir("traces"), tile_server=tile_server,
+            aoi_bbox=aoi_bbox, add_layer=not shown
+        )
+        task.stepChanged.connect(
+            lambda value, text: self.dlg.lbl_area.setText(f"{text} ({value} %)")
+        )
+        task.analysisFinished.connect(lambda area_ha, t=task: self._on_task_finished(t, area_ha))
+        task.analysisFailed.connect(lambda message, t=task: self._on_task_failed(t, message))
+        self.tasks.append(task)
+        QgsApplication.taskManager().addTask(task)
+        if not shown:
+            self.dlg.lbl_area.setText("Análisis en cola…")
 
-    def _run_analysis(self, date_str, days_before, days_after,
-                      polarization, orbit_dir, ee_geometry, prog=None):
+        # limpiar estado del AOI (permite lanzar otro análisis)
+        self._reset_aoi()
 
-        # 1) EE init
-        try:
-            ee.Initialize(project='tidop-424613')
-        except Exception as ee_err:
-            raise RuntimeError(f"No se pudo inicializar Earth Engine:\n{ee_err}")
-        self._step(prog, 20, "Filtrando colecciones…")
-
-        # 2) Fechas
-        event_date   = ee.Date(date_str)
-        before_start = event_date.advance(-days_before, 'day')
-        before_end   = event_date
-        after_start  = event_date
-        after_end    = event_date.advance(days_after, 'day')
-
-        # 3) Colecciones
-        col_s1 = (
-            ee.ImageCollection("COPERNICUS/S1_GRD")
-            .filter(ee.Filter.eq("instrumentMode", "IW"))
-            .filter(ee.Filter.listContains("transmitterReceiverPolarisation", polarization))
-            .filter(ee.Filter.eq("orbitProperties_pass", orbit_dir))
-            .filter(ee.Filter.eq("resolution_meters", 10))
-            .filterBounds(ee_geometry)
-            .select(polarization)
-        )
+    def cancel_analyses(self):
+        for task in list(self.tasks):
+            task.cancel()
 
-        if col_s1.filterDate(before_start, before_end).size().getInfo() == 0:
-            raise RuntimeError("No hay imágenes 'before' para esa fecha y área.")
-        if col_s1.filterDate(after_start, after_end).size().getInfo() == 0:
-            raise RuntimeError("No hay imágenes 'after' para esa fecha y área.")
-
-        def _mask_s2_clouds(image):
-            qa = image.select('QA60')
-            cloud_bit = 1 << 10
-            cirrus_bit = 1 << 11
-            mask = qa.bitwiseAnd(cloud_bit).eq(0).And(qa.bitwiseAnd(cirrus_bit).eq(0))
-            return image.updateMask(mask).divide(10000)
-
-        s2_sr = (
-            ee.ImageCollection("COPERNICUS/S2_SR_HARMONIZED")
-            .filterDate('2024-08-10', '2024-09-20')
-            .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 20))
-            .filterBounds(ee_geometry)
-            .map(_mask_s2_clouds)
-            .median()
-            .clip(ee_geometry)
-        )
+    def _reset_aoi(self):
+        self.click_lon = None
+        self.click_lat = None
+        self.rect_bbox = None
 
-        chirps = (
-            ee.ImageCollection("UCSB-CHG/CHIRPS/DAILY")
-            .filterDate(event_date, event_date.advance(1, "day"))
-            .filterBounds(ee_geometry)
-            .select("precipitation")
-        )
+    def _forget_task(self, task):
+        if task in self.tasks:
+            self.tasks.remove(task)
 
-        gsw = ee.Image("JRC/GSW1_4/GlobalSurfaceWater")
-        occ = gsw.select("occurrence")  # 0..100
-        dem = ee.Image('WWF/HydroSHEDS/03VFDEM')
-
-        # 4) Diferencia S1
-        self._step(prog, 35, "Compuestas before/after y razón…")
-        before_img = col_s1.filterDate(before_start, before_end).median().clip(ee_geometry)
-        after_img  = col_s1.filterDate(after_start,  after_end ).median().clip(ee_geometry)
-
-        smoothing_radius = 50  # m
-        before_f = before_img.focal_mean(smoothing_radius, "circle", "meters")
-        after_f  = after_img .focal_mean(smoothing_radius, "circle", "meters")
-        difference = after_f.divide(before_f).rename("difference")
-
-        # 5) Fuzzy
-        self._step(prog, 50, "Variación SAR (FM_FV) y filtros…")
-        def _fuzzyS(img, s1, s2):
-            s1_img = ee.Image.constant(s1)
-            s2_img = ee.Image.constant(s2)
-            trans  = img.gte(s1_img).And(img.lte(s2_img)).multiply(
-                        img.subtract(s1_img).divide(s2_img.subtract(s1_img))
-                    )
-            return img.lt(s1_img).multiply(0) \
-                    .add(img.gt(s2_img).multiply(1)) \
-                    .add(trans)
-
-        def _fuzzyZ(img, z1, z2):
-            z1_img = ee.Image.constant(z1)
-            z2_img = ee.Image.constant(z2)
-            trans  = img.gte(z1_img).And(img.lte(z2_img)).multiply(
-                        ee.Image(1).subtract(
-                            img.subtract(z1_img).divide(z2_img.subtract(z1_img))
-                        )
-                    )
-            return img.lt(z1_img).multiply(1) \
-                    .add(img.gt(z2_img).multiply(0)) \
-                    .add(trans)
-
-        s1_thr = 1.05
-        s2_thr = 1.20
-        FM_FV = _fuzzyS(difference, s1_thr, s2_thr).rename("FM_FV").updateMask(ee.Image(1))
-
-        # Excluir urbano
-        ndbi = s2_sr.normalizedDifference(["B11", "B8"]).rename("NDBI")
-        FM_FV = FM_FV.updateMask(ndbi.gt(0.2).Not())
-
-        # Lluvia mínima
-        precip_accum = chirps.sum().clip(ee_geometry)
-        FM_FV = FM_FV.updateMask(precip_accum.gt(5))
-
-        # 6) FM_OW (null-safe)
-        self._step(prog, 65, "Agua histórica (GSW)…")
-        low_occ_mask = occ.lt(30)
-        occ_norm = occ.divide(100)
-
-        stats = occ_norm.updateMask(occ_norm.gt(0)).reduceRegion(
-            reducer=ee.Reducer.mean().combine(reducer2=ee.Reducer.stdDev(), sharedInputs=True),
-            geometry=ee_geometry, scale=30, bestEffort=True
+    def _on_task_finished(self, task, area_ha):
+        self._forget_task(task)
+        self.iface.messageBar().pushSuccess(
+            "FloodAnalysis", f"{task.description()}: análisis terminado y "
+            + ("capa añadida." if task.add_layer else "teselas renovadas.")
         )
-        # Si no hay píxeles de GSW en el AOI, usa defaults
-        mu = ee.Number(ee.Algorithms.If(stats.contains('occurrence_mean'),
-                                        stats.get('occurrence_mean'), 0))
-        sigma = ee.Number(ee.Algorithms.If(stats.contains('occurrence_stdDev'),
-                                           stats.get('occurrence_stdDev'), 0))
-        z1_default = ee.Number(0.05)
-        z2_default = ee.Number(0.30)
-        z1_ow = ee.Number(ee.Algorithms.If(mu.add(sigma).eq(0), z1_default, mu))
-        z2_ow = ee.Number(ee.Algorithms.If(mu.add(sigma).eq(0),
-                                           z2_default,
-                                           mu.add(sigma.multiply(2))))
-        z1_ow = z1_ow.max(0).min(1)
-        z2_ow = z2_ow.max(0).min(1)
-
-        FM_OW = _fuzzyZ(occ_norm, z1_ow, z2_ow).updateMask(low_occ_mask).rename("FM_OW").clip(ee_geometry)
-
-        # Mezcla T=500 si aplica
-        if date_str == '2024-10-29':
-            q500_v = ee.FeatureCollection('projects/tidop-424613/assets/TIDOP/T500_v')
-            q500_m = ee.FeatureCollection('projects/tidop-424613/assets/TIDOP/T500_m')
-            q500_v_img = ee.Image().byte().paint(featureCollection=q500_v, color=1).rename('Q500_v').selfMask()
-            q500_m_img = ee.Image().byte().paint(featureCollection=q500_m, color=1).rename('Q500_m').selfMask()
-            FM_OW = FM_OW.blend(q500_v_img).blend(q500_m_img).clip(ee_geometry)
-
-        # 7) Conectividad y fusión
-        self._step(prog, 78, "Conectividad hidráulica y fusión…")
-        FM1 = FM_FV.max(FM_OW).rename('FM1')
-
-        terrain = ee.Algorithms.Terrain(dem)
-        slope   = terrain.select('slope')
-        FM_HD = _fuzzyZ(slope, 0, 5).clip(ee_geometry).rename('FM_HD').updateMask(ee.Image(1))
-
-        w1, w2 = 6, 1
-        FM2 = (FM1.updateMask(FM1.gt(0.8)).multiply(w1).add(FM_HD.multiply(w2))).divide(w1 + w2).rename('FM2')
-
-        # 8) Contexto espacial
-        self._step(prog, 85, "Contexto espacial…")
-        kernel = ee.Kernel.square(radius=5)
-        mean_context = FM2.reduceNeighborhood(reducer=ee.Reducer.mean(), kernel=kernel)
-        D = FM2.subtract(mean_context).rename('D')
-        FM3 = _fuzzyZ(D, -0.2, 0.2).multiply(FM2).rename('FM3')
-
-        # 9) Binario final
-        flooded     = FM3.multiply(FM_FV).rename('flooded')
-        flooded_bin = flooded.gt(0).selfMask().rename('FloodedBin')
-
-        # 10) Área (null-safe)
-        self._step(prog, 92, "Calculando área…")
-        flooded_area_img = flooded_bin.multiply(ee.Image.pixelArea())
-        flooded_dict = flooded_area_img.reduceRegion(
-            reducer=ee.Reducer.sum(), geometry=ee_geometry, scale=10, maxPixels=1e13
-        )
-        raw_area = flooded_dict.get('FloodedBin')
-        area_ha  = ee.Algorithms.If(raw_area, ee.Number(raw_area).divide(10000), 0)
-        area_ha_value = float(ee.Number(area_ha).getInfo())
-
-        # 11) Publicación
-        self._step(prog, 96, "Generando teselas…")
-        viz_params = {'min': 0, 'max': 1, 'palette': ['blue']}
-        tile_fetcher = flooded_bin.getMapId(viz_params)["tile_fetcher"]
-        xyz_url = tile_fetcher.url_format
-
-        uri = f"type=xyz&url={xyz_url}&zmin=0&zmax=22"
-        layer_name = "Áreas Inundadas"
-        layer = QgsRasterLayer(uri, layer_name, "wms")
-        if not layer.isValid():
-            raise RuntimeError("No se pudo crear la capa XYZ desde Earth Engine.")
-        QgsProject.instance().addMapLayer(layer)
-
-        return area_ha_value
+        self.dlg.lbl_area.setText(f"Área inundada: {self._area_text(area_ha, task.area_error_ha)}")
+        self._show_trace(task)
+
+    def _on_task_failed(self, task, message):
+        self._forget_task(task)
+        self.dlg.lbl_area.setText("Área inundada: -- ha")
+        self._show_trace(task)
+        if task.isCanceled():
+            self.iface.messageBar().pushInfo("FloodAnalysis", f"{task.description()}: {message}")
+            return
+        QMessageBox.critical(self.dlg, self.tr('Error durante el análisis'), message)
+
+    @staticmethod
+    def _area_text(area_ha, error_ha=0):
+        if error_ha:
+            return f"{area_ha:.2f} ± {error_ha:.2f} ha (estimación adaptativa, 95 %)"
+        return f"{area_ha:.2f} ha"
+
+    def _show_trace(self, task):
+        text = f"Tiempos: {task.trace.summary()}"
+        if task.trace_path:
+            text += f"\nTraza: {task.trace_path}"
+        self.dlg.lbl_trace.setText(text)
+
+    def _plugin_data_dir(self, name):
+        return os.path.join(QgsApplication.qgisSettingsDirPath(), "flood_analysis", name)
+
+    def _tile_server(self, port=None):
+        """
+        Servidor de teselas de la sesión. Escucha en ``port`` o en el puerto
+        configurado; si está ocupado usa uno de los siguientes, lo guarda
+        en los ajustes y avisa: las capas que se publiquen llevarán ese
+        puerto en su URL.
+        """
+        if self.tile_server is None:
+            from .model.tiles import DEFAULT_PORT, MAX_CACHE_BYTES, TileServer
+            settings = QSettings()
+            # Puerto fijo: las capas guardadas en proyectos lo llevan en su URL
+            if port is None:
+                port = settings.value("flood_analysis/tile_port", DEFAULT_PORT, type=int)
+            max_mb = settings.value("flood_analysis/tile_cache_mb",
+                                    MAX_CACHE_BYTES // 2**20, type=int)
+            self.tile_server = TileServer(self._plugin_data_dir("tiles"), port=port,
+                                          max_bytes=max_mb * 2**20, fallback=True)
+            if self.tile_server.moved:
+                settings.setValue("flood_analysis/tile_port", self.tile_server.port)
+                self.iface.messageBar().pushWarning(
+                    "FloodAnalysis",
+                    f"El puerto {port} del servidor de teselas está ocupado; se usa el "
+                    f"{self.tile_server.port} (guardado en los ajustes). Las capas guardadas "
+                    f"con el puerto {port} no se verán hasta liberarlo.")
+        return self.tile_server
+
+    def _on_project_read(self, *args):
+        """
+        Arranca el servidor de teselas si el proyecto tiene capas que lo usan,
+        en el puerto de esas capas, y avisa de las que apuntan a otro.
+        """
+        from .model.tiles import local_ports
+        ports = local_ports(layer.source() for layer in QgsProject.instance().mapLayers().values())
+        if not ports:
+            return
+        server = self._tile_server(port=min(ports))
+        others = sorted(ports - {server.port})
+        if others:
+            self.iface.messageBar().pushWarning(
+                "FloodAnalysis",
+                f"Hay capas de inundación en el puerto {', '.join(map(str, others))}, "
+                f"pero el servidor de teselas escucha en el {server.port}.")
+
+    def _result_cache(self):
+        if self.result_cache is None:
+            from .model.cache import ResultCache
+            self.result_cache = ResultCache(self._plugin_data_dir("cache"))
+        return self.result_cache
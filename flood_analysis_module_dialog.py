@@ -28,8 +28,8 @@ class flood_analysisDialog(QDialog):
           * Botón “Point” (un clic) y
           * Botón “Rectángulo” (arrastrar en el canvas).
      - Campo “Tamaño (km)” (solo cuando se usa Point).
-     - Botón “Ejecutar”.
-     - Label “Área inundada”.
+     - Botones “Ejecutar” (lanza el análisis en segundo plano) y “Cancelar”.
+     - Label “Área inundada” y resumen de tiempos por etapa.
     """
 
     def __init__(self, parent=None):
@@ -172,7 +172,16 @@ class flood_analysisDialog(QDialog):
         self.btn_run = QPushButton("Ejecutar", self)
         self.btn_run.setFixedHeight(36)
         self.btn_run.setStyleSheet("background-color:#2980B9;color:white;font-weight:bold;padding-left:16px;padding-right:16px;border-radius:5px;")
-        form.addRow("", self.btn_run)
+        self.btn_cancel = QPushButton("Cancelar", self)
+        self.btn_cancel.setFixedHeight(36)
+        self.btn_cancel.setStyleSheet("background-color:#7F8C8D;color:white;font-weight:bold;padding-left:16px;padding-right:16px;border-radius:5px;")
+
+        run_layout = QHBoxLayout()
+        run_layout.setContentsMargins(0, 0, 0, 0)
+        run_layout.setSpacing(8)
+        run_layout.addWidget(self.btn_run)
+        run_layout.addWidget(self.btn_cancel)
+        form.addRow("", run_layout)
 
         # Área
         self.lbl_area = QLabel("Área inundada: -- ha", self)
@@ -180,6 +189,13 @@ class flood_analysisDialog(QDialog):
         self.lbl_area.setWordWrap(True)
         form.addRow("", self.lbl_area)
 
+        # Tiempos por etapa de la última ejecución
+        self.lbl_trace = QLabel("", self)
+        self.lbl_trace.setStyleSheet("font-size: 11px; color: #555555;")
+        self.lbl_trace.setWordWrap(True)
+        self.lbl_trace.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        form.addRow("", self.lbl_trace)
+
         right_layout.addWidget(group)
         right_layout.addStretch(1)
 
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Proveedor de Processing del plugin: expone el análisis como algoritmo
+para modelos gráficos, la interfaz por lotes y ``processing.run``.
+"""
+import datetime
+import os
+
+from qgis.PyQt.QtGui import QIcon
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsProcessingAlgorithm,
+    QgsProcessingException,
+    QgsProcessingOutputNumber,
+    QgsProcessingOutputString,
+    QgsProcessingParameterBoolean,
+    QgsProcessingParameterEnum,
+    QgsProcessingParameterExtent,
+    QgsProcessingParameterFileDestination,
+    QgsProcessingParameterFolderDestination,
+    QgsProcessingParameterNumber,
+    QgsProcessingParameterRasterDestination,
+    QgsProcessingParameterString,
+    QgsProcessingProvider,
+)
+
+# Mismas opciones y valores por defecto que flood_analysisDialog
+POLARIZATIONS = ["VH", "VV"]
+ORBITS        = ["DESCENDING", "ASCENDING"]
+AREA_MODES    = ["auto", "exact", "adaptive"]  # ``model.area.AREA_MODES``
+
+_ICON = os.path.join(os.path.dirname(__file__), "img", "icon.png")
+
+
+class FloodAnalysisAlgorithm(QgsProcessingAlgorithm):
+    """
+    Análisis de inundaciones sobre la extensión indicada. Cada ejecución
+    crea su propia instancia, así que varias pueden correr a la vez (lotes,
+    modelos); Earth Engine se inicializa una sola vez por sesión.
+    """
+
+    DATE          = "DATE"
+    DAYS_BEFORE   = "DAYS_BEFORE"
+    DAYS_AFTER    = "DAYS_AFTER"
+    POLARIZATION  = "POLARIZATION"
+    ORBIT         = "ORBIT"
+    EXTENT        = "EXTENT"
+    MASK_SCALE    = "MASK_SCALE"
+    AREA_MODE     = "AREA_MODE"
+    ADD_LAYER     = "ADD_LAYER"
+    OUTPUT_MASK   = "OUTPUT_MASK"
+    OUTPUT_COGS   = "OUTPUT_COGS"
+    OUTPUT_POLYGONS = "OUTPUT_POLYGONS"
+    AREA_HA       = "AREA_HA"
+    AREA_ERROR_HA = "AREA_ERROR_HA"
+    XYZ_URL       = "XYZ_URL"
+
+    def __init__(self):
+        super().__init__()
+        self.xyz_url = None
+        self.add_layer = False
+
+    def tr(self, text):
+        from qgis.PyQt.QtCore import QCoreApplication
+        return QCoreApplication.translate("FloodAnalysisAlgorithm", text)
+
+    def createInstance(self):
+        return FloodAnalysisAlgorithm()
+
+    def name(self):
+        return "floodanalysis"
+
+    def displayName(self):
+        return self.tr("Analizar inundaciones (Sentinel-1)")
+
+    def group(self):
+        return self.tr("Inundaciones")
+
+    def groupId(self):
+        return "inundaciones"
+
+    def icon(self):
+        return QIcon(_ICON)
+
+    def shortHelpString(self):
+        return self.tr(
+            "Estima el área inundada con el modelo difuso del plugin (S1, NDBI, "
+            "CHIRPS, GSW y pendiente) en Earth Engine. Devuelve el área en ha y la "
+            "URL XYZ de FloodedBin y, opcionalmente, descarga la máscara y las "
+            "pertenencias (FM_FV, FM_OW, FM_HD, FM3) como Cloud-Optimized GeoTIFF y "
+            "las zonas inundadas como polígonos en un GeoPackage. En AOIs de más de "
+            "500 km² el área se estima por defecto con el estimador adaptativo, que "
+            "devuelve también su cota de error."
+        )
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterString(
+            self.DATE, self.tr("Fecha del evento (yyyy-MM-dd)"),
+            defaultValue=datetime.date.today().isoformat()))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.DAYS_BEFORE, self.tr("Días antes"),
+            QgsProcessingParameterNumber.Integer, 30, minValue=1, maxValue=180))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.DAYS_AFTER, self.tr("Días después"),
+            QgsProcessingParameterNumber.Integer, 10, minValue=1, maxValue=180))
+        self.addParameter(QgsProcessingParameterEnum(
+            self.POLARIZATION, self.tr("Polarización"), options=POLARIZATIONS, defaultValue=0))
+        self.addParameter(QgsProcessingParameterEnum(
+            self.ORBIT, self.tr("Dirección órbita"), options=ORBITS, defaultValue=0))
+        self.addParameter(QgsProcessingParameterExtent(
+            self.EXTENT, self.tr("AOI")))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.MASK_SCALE, self.tr("Resolución de la máscara (m)"),
+            QgsProcessingParameterNumber.Double, 30, minValue=10))
+        self.addParameter(QgsProcessingParameterEnum(
+            self.AREA_MODE, self.tr("Cálculo del área"),
+            options=[self.tr("Automático (estimador en AOIs > 500 km²)"),
+                     self.tr("Suma exacta a 10 m"), self.tr("Estimador adaptativo")],
+            defaultValue=0))
+        self.addParameter(QgsProcessingParameterBoolean(
+            self.ADD_LAYER, self.tr("Añadir la capa XYZ al proyecto"), defaultValue=False))
+        self.addParameter(QgsProcessingParameterRasterDestination(
+            self.OUTPUT_MASK, self.tr("Máscara FloodedBin"), optional=True,
+            createByDefault=False))
+        self.addParameter(QgsProcessingParameterFolderDestination(
+            self.OUTPUT_COGS, self.tr("Carpeta COG (FloodedBin y pertenencias)"), optional=True,
+            createByDefault=False))
+        self.addParameter(QgsProcessingParameterFileDestination(
+            self.OUTPUT_POLYGONS, self.tr("Polígonos de FloodedBin"), "GeoPackage (*.gpkg)",
+            optional=True, createByDefault=False))
+
+        self.addOutput(QgsProcessingOutputNumber(self.AREA_HA, self.tr("Área inundada (ha)")))
+        self.addOutput(QgsProcessingOutputNumber(
+            self.AREA_ERROR_HA, self.tr("Cota de error del área (ha, 95 %)")))
+        self.addOutput(QgsProcessingOutputString(self.XYZ_URL, self.tr("URL XYZ de FloodedBin")))
+
+    def processAlgorithm(self, parameters, context, feedback):
+        from .model.batch import download
+        from .model.cog import download_cogs
+        from .model.ee_engine import analyze, download_urls
+        from .model.polygonize import polygonize_raster
+        from .model.engine import FloodParams
+        from .model.session import get_session
+
+        # 1) Parámetros (mismos que el diálogo)
+        date_str = self.parameterAsString(parameters, self.DATE, context).strip()
+        try:
+            datetime.date.fromisoformat(date_str)
+        except ValueError:
+            raise QgsProcessingException(self.tr("Fecha no válida: use yyyy-MM-dd."))
+        days_before  = self.parameterAsInt(parameters, self.DAYS_BEFORE, context)
+        days_after   = self.parameterAsInt(parameters, self.DAYS_AFTER, context)
+        polarization = POLARIZATIONS[self.parameterAsEnum(parameters, self.POLARIZATION, context)]
+        orbit_dir    = ORBITS[self.parameterAsEnum(parameters, self.ORBIT, context)]
+        mask_scale   = self.parameterAsDouble(parameters, self.MASK_SCALE, context)
+        area_mode    = AREA_MODES[self.parameterAsEnum(parameters, self.AREA_MODE, context)]
+        mask_path    = self.parameterAsOutputLayer(parameters, self.OUTPUT_MASK, context)
+        cog_dir      = self.parameterAsString(parameters, self.OUTPUT_COGS, context)
+        gpkg_path    = self.parameterAsFileOutput(parameters, self.OUTPUT_POLYGONS, context)
+        self.add_layer = self.parameterAsBoolean(parameters, self.ADD_LAYER, context)
+
+        # 2) AOI en EPSG:4326
+        rect = self.parameterAsExtent(parameters, self.EXTENT, context,
+                                      QgsCoordinateReferenceSystem("EPSG:4326"))
+        if rect.isEmpty():
+            raise QgsProcessingException(self.tr("El AOI debe tener ancho y alto."))
+        bbox = [rect.xMinimum(), rect.yMinimum(), rect.xMaximum(), rect.yMaximum()]
+
+        def step(value, text=None):
+            if feedback.isCanceled():
+                raise QgsProcessingException(self.tr("Operación cancelada por el usuario."))
+            feedback.setProgress(value)
+            if text:
+                feedback.pushInfo(text)
+
+        def evaluate():
+            import ee
+            ee_geometry = ee.Geometry.Rectangle(bbox, proj=None, geodesic=False)
+            area_ha, result = analyze(date_str, days_before, days_after, polarization,
+                                      orbit_dir, ee_geometry, FloodParams(), step=step,
+                                      area_mode=area_mode)
+            step(96, self.tr("Generando teselas…"))
+            viz_params = {'min': 0, 'max': 1, 'palette': ['blue']}
+            xyz_url = result.flooded_bin.getMapId(viz_params)["tile_fetcher"].url_format
+            raster_path = mask_path or (gpkg_path and gpkg_path + ".FloodedBin.tif")
+            if raster_path:
+                step(98, self.tr("Descargando máscara…"))
+                url = result.flooded_bin.unmask(0).toByte().getDownloadURL({
+                    "region": ee_geometry, "scale": mask_scale, "format": "GEO_TIFF",
+                })
+                download(url, raster_path)
+            if cog_dir:
+                step(99, self.tr("Exportando COG…"))
+                download_cogs(download_urls(result, ee_geometry, mask_scale), cog_dir)
+            if gpkg_path:
+                step(99, self.tr("Vectorizando FloodedBin…"))
+                polygonize_raster(raster_path, gpkg_path)
+                if raster_path != mask_path:
+                    os.remove(raster_path)
+            return area_ha, result.area_error_ha or 0.0, xyz_url
+
+        # 3) Análisis en la sesión EE compartida
+        step(5, self.tr("Inicializando Earth Engine…"))
+        try:
+            area_ha, area_error_ha, self.xyz_url = get_session().call(evaluate)
+        except QgsProcessingException:
+            raise
+        except Exception as e:
+            raise QgsProcessingException(str(e))
+        feedback.pushInfo(self.tr("Área inundada: {:.2f} ± {:.2f} ha").format(area_ha, area_error_ha))
+        feedback.setProgress(100)
+
+        results = {self.AREA_HA: area_ha, self.AREA_ERROR_HA: area_error_ha,
+                   self.XYZ_URL: self.xyz_url}
+        if mask_path:
+            results[self.OUTPUT_MASK] = mask_path
+        if cog_dir:
+            results[self.OUTPUT_COGS] = cog_dir
+        if gpkg_path:
+            results[self.OUTPUT_POLYGONS] = gpkg_path
+        return results
+
+    def postProcessAlgorithm(self, context, feedback):
+        # Hilo principal: aquí sí se puede tocar el proyecto
+        if self.add_layer and self.xyz_url:
+            from .flood_analysis_task import add_flood_layer
+            try:
+                add_flood_layer(self.xyz_url)
+            except Exception as e:
+                feedback.reportError(str(e))
+        return {}
+
+
+class FloodAnalysisProvider(QgsProcessingProvider):
+
+    def loadAlgorithms(self):
+        self.addAlgorithm(FloodAnalysisAlgorithm())
+
+    def id(self):
+        return "floodanalysis"
+
+    def name(self):
+        return "FloodAnalysis"
+
+    def icon(self):
+        return QIcon(_ICON)
+
+    def longName(self):
+        return self.name()
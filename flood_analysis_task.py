@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+import time
+
+from qgis.PyQt.QtCore import pyqtSignal
+from qgis.core import QgsProject, QgsRasterLayer, QgsTask
+
+from .model.engine import FloodParams
+from .model.ee_engine import analyze
+from .model.session import get_session
+from .model.trace import RunTrace, activate, request
+
+# Vigencia asumida de las URLs de teselas de getMapId
+TILE_URL_TTL = 2 * 3600  # s
+
+
+def add_flood_layer(xyz_url, tile_server=None, key=None, bbox=None):
+    """
+    Añade al proyecto la capa XYZ del binario inundado (hilo principal).
+    Con ``tile_server`` la capa apunta al servidor local (``key`` identifica
+    su MBTiles) y se precargan las teselas de ``bbox``.
+    """
+    if tile_server is not None and key:
+        xyz_url = tile_server.publish(key, xyz_url, bbox)
+        if bbox is not None:
+            tile_server.prefetch(key)
+    uri = f"type=xyz&url={xyz_url}&zmin=0&zmax=22"
+    layer_name = "Áreas Inundadas"
+    layer = QgsRasterLayer(uri, layer_name, "wms")
+    if not layer.isValid():
+        raise RuntimeError("No se pudo crear la capa XYZ desde Earth Engine.")
+    QgsProject.instance().addMapLayer(layer)
+    return layer
+
+
+class FloodAnalysisTask(QgsTask):
+    """
+    Análisis Earth Engine en segundo plano:
+     - ``run`` (hilo del gestor de tareas) construye y evalúa el grafo.
+     - ``finished`` (hilo principal) publica la capa y guarda la caché.
+     - El progreso llega por ``setProgress`` y ``stepChanged``; la
+       cancelación se comprueba en cada hito del algoritmo.
+     - Cada hito abre un tramo de ``trace``; la traza se guarda como JSON
+       en ``trace_dir`` al terminar (con éxito o no).
+     - Con ``tile_server`` la capa se sirve desde la caché local de teselas;
+       con ``add_layer=False`` sólo se renueva su URL de Earth Engine.
+    """
+
+    stepChanged      = pyqtSignal(int, str)
+    analysisFinished = pyqtSignal(float)
+    analysisFailed   = pyqtSignal(str)
+
+    def __init__(self, date_str, days_before, days_after, polarization, orbit_dir,
+                 ee_geometry, cache=None, cache_key=None, cached=None, session=None,
+                 trace_dir=None, tile_server=None, aoi_bbox=None, add_layer=True):
+        super().__init__(f"FloodAnalysis {date_str} ({polarization}, {orbit_dir})",
+                         QgsTask.CanCancel)
+        self.date_str     = date_str
+        self.days_before  = days_before
+        self.days_after   = days_after
+        self.polarization = polarization
+        self.orbit_dir    = orbit_dir
+        self.ee_geometry  = ee_geometry
+        self.cache        = cache
+        self.cache_key    = cache_key
+        self.cached       = cached  # registro con teselas caducadas: se reutiliza el área
+        self.session      = session or get_session()
+        self.trace_dir    = trace_dir
+        self.tile_server  = tile_server
+        self.aoi_bbox     = aoi_bbox
+        self.add_layer    = add_layer
+        self.trace        = RunTrace({
+            "date": date_str, "days_before": days_before, "days_after": days_after,
+            "polarization": polarization, "orbit": orbit_dir, "cache_key": cache_key,
+            "cached_area": cached is not None,
+        })
+        self.trace_path   = None
+
+        self.area_ha = None
+        self.area_error_ha = 0.0
+        self.xyz_url = None
+        self.error   = None
+        self.t0      = None
+
+    def _step(self, value, text=None):
+        if self.isCanceled():
+            raise RuntimeError("Operación cancelada por el usuario.")
+        self.setProgress(value)
+        self.trace.step(value, text)
+        if text:
+            self.stepChanged.emit(value, text)
+
+    def run(self):
+        self.t0 = time.time()
+        with activate(self.trace):
+            try:
+                # 1) EE init (una vez por sesión de QGIS)
+                self._step(5, "Inicializando Earth Engine…")
+                self.session.ensure()
+                self._step(20, "Filtrando colecciones…")
+
+                # 2-11) Colecciones, modelo difuso, área y teselas
+                self.area_ha, self.xyz_url = self.session.call(self._evaluate)
+                return True
+            except Exception as e:
+                self.error = str(e)
+                return False
+
+    def _evaluate(self):
+        # Colecciones, modelo difuso y área en una sola petición
+        area_ha, result = analyze(
+            self.date_str, self.days_before, self.days_after,
+            self.polarization, self.orbit_dir, self.ee_geometry,
+            FloodParams(), step=self._step, with_area=self.cached is None
+        )
+        if self.cached:
+            area_ha = self.cached["area_ha"]
+            self.area_error_ha = self.cached.get("area_error_ha", 0.0)
+        else:
+            self.area_error_ha = result.area_error_ha or 0.0
+
+        self._step(96, "Generando teselas…")
+        viz_params = {'min': 0, 'max': 1, 'palette': ['blue']}
+        with request("getMapId", result.flooded_bin) as req:
+            req.response = result.flooded_bin.getMapId(viz_params)
+        self._step(98)
+        return area_ha, req.response["tile_fetcher"].url_format
+
+    def _write_trace(self, status):
+        self.trace.finish(status, self.error)
+        if not self.trace_dir:
+            return
+        try:
+            self.trace_path = self.trace.write(self.trace_dir)
+        except OSError:
+            self.trace_path = None
+
+    def finished(self, result):
+        if not result:
+            self._write_trace("cancelled" if self.isCanceled() else "error")
+            self.analysisFailed.emit(self.error or "Operación cancelada por el usuario.")
+            return
+        try:
+            if self.add_layer:
+                add_flood_layer(self.xyz_url, self.tile_server, self.cache_key, self.aoi_bbox)
+            elif self.tile_server is not None:
+                self.tile_server.publish(self.cache_key, self.xyz_url, self.aoi_bbox)
+                if self.aoi_bbox is not None:
+                    self.tile_server.prefetch(self.cache_key)
+        except Exception as e:
+            self.error = str(e)
+            self._write_trace("error")
+            self.analysisFailed.emit(str(e))
+            return
+        self._write_trace("ok")
+
+        if self.cache is not None and self.cache_key:
+            self.cache.put(self.cache_key, {
+                "area_ha": self.area_ha,
+                "area_error_ha": self.area_error_ha,
+                "xyz_url": self.xyz_url,
+                "tile_expires": time.time() + TILE_URL_TTL,
+                "created": self.t0,
+                "elapsed_s": time.time() - self.t0,
+                "stages": self.trace.stages(),
+            })
+        self.analysisFinished.emit(self.area_ha)
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+Núcleo del algoritmo de inundaciones (independiente de QGIS).
+
+Importar el paquete no importa ``ee`` ni NumPy ni hace llamadas a Earth
+Engine; cada submódulo carga sus dependencias al importarse.
+"""
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""
+Ejecución por lotes sin QGIS: lee un manifiesto CSV/JSON de eventos/AOIs y
+los analiza en paralelo, escribiendo áreas y máscaras en un directorio.
+
+Cada fila del manifiesto define ``id``, ``date``, ``days_before``,
+``days_after``, ``polarization``, ``orbit`` y el AOI como ``bbox``
+(``xmin,ymin,xmax,ymax`` en EPSG:4326) o columnas ``xmin``...``ymax``.
+Las filas con ``inputs`` (JSON: {capa: ruta o lista de rutas}) se procesan
+en local con el motor NumPy en lugar de Earth Engine.
+
+Con ``--cog`` se escriben además FloodedBin (1 bit) y las pertenencias
+FM_FV, FM_OW, FM_HD y FM3 (``uint8``) como Cloud-Optimized GeoTIFF
+(ver ``model.cog``); ``mask`` apunta entonces al COG de FloodedBin. Con
+``--gpkg`` las zonas inundadas se vectorizan en ``<id>_FloodedBin.gpkg``
+(ver ``model.polygonize``). ``--area-mode`` elige cómo calcula Earth
+Engine el área (por defecto, estimador adaptativo en AOIs grandes; ver
+``model.area``).
+
+Uso:
+    python -m model.batch manifiesto.csv -o salida/ --workers 8 --masks
+    python -m model.batch manifiesto.csv -o salida/ --cog --gpkg
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+
+from .area import AREA_MODES
+from .engine import FloodParams, GraphCache
+
+# Valores por defecto del diálogo del plugin
+DEFAULTS = {"days_before": 30, "days_after": 10, "polarization": "VH", "orbit": "DESCENDING"}
+
+# StageGraph de los últimos trabajos locales ajustados con ``tune_local_job``
+LOCAL_GRAPHS = GraphCache(size=2)
+
+SUMMARY_FIELDS = ("id", "status", "area_ha", "area_error_ha", "elapsed_s", "mask", "polygons",
+                  "error")
+
+
+@dataclass
+class BatchJob:
+    """Un análisis del manifiesto."""
+    id: str
+    date: str
+    days_before: int = DEFAULTS["days_before"]
+    days_after: int = DEFAULTS["days_after"]
+    polarization: str = DEFAULTS["polarization"]
+    orbit: str = DEFAULTS["orbit"]
+    bbox: tuple = None
+    inputs: dict = None        # rasters locales => motor NumPy
+    pixel_size: float = None   # m, sólo motor NumPy
+
+
+@dataclass
+class BatchResult:
+    id: str
+    status: str = "ok"
+    area_ha: float = None
+    area_error_ha: float = None  # cota (95 %) si el área es adaptativa
+    elapsed_s: float = None
+    mask: str = None
+    polygons: str = None         # GeoPackage de las zonas inundadas
+    error: str = None
+
+
+def _parse_bbox(row):
+    bbox = row.get("bbox")
+    if bbox in (None, ""):
+        keys = ("xmin", "ymin", "xmax", "ymax")
+        if not all(row.get(k) not in (None, "") for k in keys):
+            return None
+        bbox = [row[k] for k in keys]
+    elif isinstance(bbox, str):
+        bbox = bbox.replace(";", ",").split(",")
+    bbox = tuple(float(v) for v in bbox)
+    if len(bbox) != 4:
+        raise ValueError(f"bbox debe tener 4 valores: {bbox}")
+    xmin, ymin, xmax, ymax = bbox
+    if abs(xmax - xmin) < 1e-12 or abs(ymax - ymin) < 1e-12:
+        raise ValueError(f"bbox sin área: {bbox}")
+    return bbox
+
+
+def _field(row, key):
+    """Valor de ``key`` o su valor por defecto si falta o está vacío (``0`` es válido)."""
+    value = row.get(key)
+    return DEFAULTS[key] if value is None or value == "" else value
+
+
+def _job_from_row(index, row):
+    if not row.get("date"):
+        raise ValueError(f"Fila {index}: falta 'date'.")
+    inputs = row.get("inputs")
+    if isinstance(inputs, str) and inputs:
+        inputs = json.loads(inputs)
+    job = BatchJob(
+        id=str(row.get("id") or f"job{index:04d}"),
+        date=str(row["date"]),
+        days_before=int(_field(row, "days_before")),
+        days_after=int(_field(row, "days_after")),
+        polarization=str(_field(row, "polarization")).upper(),
+        orbit=str(_field(row, "orbit")).upper(),
+        bbox=_parse_bbox(row),
+        inputs=inputs or None,
+        pixel_size=float(row["pixel_size"]) if row.get("pixel_size") else None,
+    )
+    if job.bbox is None and job.inputs is None:
+        raise ValueError(f"Fila {index} ({job.id}): falta el AOI (bbox) o 'inputs'.")
+    return job
+
+
+def read_manifest(path):
+    """Lee un manifiesto ``.csv`` o ``.json`` (lista u objeto con ``jobs``)."""
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as fh:
+            rows = json.load(fh)
+        if isinstance(rows, dict):
+            rows = rows.get("jobs", [])
+    else:
+        with open(path, newline="", encoding="utf-8") as fh:
+            rows = list(csv.DictReader(fh))
+    jobs = [_job_from_row(i, row) for i, row in enumerate(rows, 1)]
+    ids = [job.id for job in jobs]
+    if len(set(ids)) != len(ids):
+        raise ValueError("El manifiesto tiene identificadores repetidos.")
+    return jobs
+
+
+def download(url, path):
+    """Descarga ``url`` en ``path`` por bloques."""
+    with urllib.request.urlopen(url) as response, open(path, "wb") as fh:
+        while True:
+            chunk = response.read(1 << 20)
+            if not chunk:
+                break
+            fh.write(chunk)
+
+
+def run_ee_job(job, out_dir, params, masks=False, mask_scale=30, session=None, cogs=False,
+               polygons=False, area_mode="auto"):
+    """
+    Analiza ``job`` con Earth Engine; devuelve (área ha, cota ha, ruta de
+    la máscara, ruta GPKG). ``area_mode`` como en ``analyze``.
+    """
+    from .cog import download_cogs
+    from .ee_engine import analyze, download_urls
+    from .polygonize import polygonize_raster, require_ogr
+    from .session import get_session
+
+    session = session or get_session()
+    if polygons:
+        require_ogr()
+
+    def _evaluate():
+        import ee
+        geometry = ee.Geometry.Rectangle(list(job.bbox), proj=None, geodesic=False)
+        area_ha, result = analyze(job.date, job.days_before, job.days_after,
+                                  job.polarization, job.orbit, geometry, params,
+                                  area_mode=area_mode)
+        mask_path = None
+        if cogs:
+            paths = download_cogs(download_urls(result, geometry, mask_scale), out_dir,
+                                  prefix=f"{job.id}_")
+            mask_path = paths["FloodedBin"]
+        elif masks or polygons:
+            url = result.flooded_bin.unmask(0).toByte().getDownloadURL({
+                "region": geometry, "scale": mask_scale, "format": "GEO_TIFF",
+            })
+            mask_path = os.path.join(out_dir, f"{job.id}_FloodedBin.tif")
+            download(url, mask_path)
+        return area_ha, result.area_error_ha, mask_path
+
+    area_ha, area_error_ha, mask_path = session.call(_evaluate)
+    gpkg_path = None
+    if polygons:
+        gpkg_path = os.path.join(out_dir, f"{job.id}_FloodedBin.gpkg")
+        polygonize_raster(mask_path, gpkg_path)
+        if not (masks or cogs):
+            os.remove(mask_path)  # sólo se descargó para vectorizar
+            mask_path = None
+    return area_ha, area_error_ha, mask_path, gpkg_path
+
+
+def run_local_job(job, out_dir, params, masks=False, tile_size=1024, cogs=False,
+                  polygons=False):
+    """
+    Analiza ``job`` con el motor NumPy sobre sus rasters locales (área
+    exacta). Devuelve (área ha, cota ha, ruta de la máscara, ruta GPKG).
+    """
+    import numpy as np
+    from .cog import BINARY_LAYERS, EXPORT_LAYERS, export_cogs, require_gdal
+    from .polygonize import polygonize, require_ogr
+    from .readers import RasterSource
+    from .tiling import TiledProcessor
+
+    source = RasterSource(**job.inputs)
+    pixel_size = job.pixel_size or source.pixel_size
+    if not pixel_size:
+        raise ValueError(f"{job.id}: indique 'pixel_size' (m) o use rasters georreferenciados.")
+
+    def _memmap(path, name):
+        return np.lib.format.open_memmap(
+            path, mode="w+", dtype=np.uint8 if name in BINARY_LAYERS else np.float32,
+            shape=source.shape)
+
+    # Capas completas en memmaps; las temporales se borran al final
+    out, temporary, mask_path, gpkg_path = {}, [], None, None
+    if cogs:
+        require_gdal()
+        temporary = list(EXPORT_LAYERS)
+    elif polygons and not masks:
+        temporary = ["FloodedBin"]
+    if polygons:
+        require_ogr()
+    if masks and not cogs:
+        mask_path = os.path.join(out_dir, f"{job.id}_FloodedBin.npy")
+        out["FloodedBin"] = _memmap(mask_path, "FloodedBin")
+    for name in temporary:
+        out[name] = _memmap(os.path.join(out_dir, f"{job.id}_{name}.tmp.npy"), name)
+    try:
+        area_ha = TiledProcessor(pixel_size, params=params, tile_size=tile_size).run(source, out=out)
+        if cogs:
+            paths = export_cogs(out, out_dir, source.geotransform, source.projection,
+                                prefix=f"{job.id}_")
+            mask_path = paths["FloodedBin"]
+        if polygons:
+            gpkg_path = os.path.join(out_dir, f"{job.id}_FloodedBin.gpkg")
+            polygonize(out["FloodedBin"], gpkg_path, source.geotransform, source.projection)
+        if masks and not cogs:
+            out["FloodedBin"].flush()
+    finally:
+        filenames = [out[name].filename for name in temporary if name in out]
+        out.clear()  # suelta los mapeos antes de borrar (Windows)
+        for filename in filenames:
+            os.remove(filename)
+    return area_ha, 0.0, mask_path, gpkg_path
+
+
+def tune_local_job(job, params=None, step=None, graphs=LOCAL_GRAPHS):
+    """
+    Analiza ``job`` con el motor NumPy sobre el AOI completo en memoria y
+    devuelve el ``FloodResult`` (área exacta). La primera llamada de cada
+    trabajo lee y compone las entradas (medianas S1, NDBI, suma CHIRPS); las
+    siguientes, con otros ``params``, sólo rehacen las etapas afectadas
+    (``StageGraph``). Pensado para ajustar umbrales en AOIs que caben en
+    memoria; para los grandes, ``run_local_job`` procesa por teselas.
+    """
+    if not job.inputs:
+        raise ValueError(f"{job.id}: el ajuste incremental necesita 'inputs' locales.")
+
+    def _load():
+        from .numpy_engine import NumpyEngine
+        from .readers import RasterSource
+        from .tiling import read_inputs
+
+        source = RasterSource(**job.inputs)
+        pixel_size = job.pixel_size or source.pixel_size
+        if not pixel_size:
+            raise ValueError(f"{job.id}: indique 'pixel_size' (m) o use rasters georreferenciados.")
+        height, width = source.shape
+        return NumpyEngine(pixel_size), read_inputs(source, slice(0, height), slice(0, width))
+
+    key = (json.dumps(job.inputs, sort_keys=True, default=str), job.pixel_size)
+    return graphs.get(key, _load).run(params or FloodParams(), step)
+
+
+def run_batch(jobs, out_dir, workers=4, params=None, masks=False, mask_scale=30,
+              progress=None, cogs=False, polygons=False, area_mode="auto"):
+    """
+    Ejecuta ``jobs`` con ``workers`` hilos (las llamadas a EE son de E/S).
+    Escribe ``<id>.json`` al terminar cada trabajo y ``summary.csv`` al
+    final; devuelve la lista de ``BatchResult``.
+    """
+    params = params or FloodParams()
+    os.makedirs(out_dir, exist_ok=True)
+    results = []
+
+    def _run(job):
+        t0 = time.time()
+        res = BatchResult(id=job.id)
+        try:
+            if job.inputs:
+                res.area_ha, res.area_error_ha, res.mask, res.polygons = run_local_job(
+                    job, out_dir, params, masks, cogs=cogs, polygons=polygons)
+            else:
+                res.area_ha, res.area_error_ha, res.mask, res.polygons = run_ee_job(
+                    job, out_dir, params, masks, mask_scale, cogs=cogs, polygons=polygons,
+                    area_mode=area_mode)
+        except Exception as e:
+            res.status, res.error = "error", str(e)
+        res.elapsed_s = round(time.time() - t0, 3)
+        with open(os.path.join(out_dir, f"{job.id}.json"), "w", encoding="utf-8") as fh:
+            json.dump({"job": asdict(job), "result": asdict(res)}, fh, ensure_ascii=False, indent=2)
+        return res
+
+    with ThreadPoolExecutor(max_workers=max(1, int(workers))) as pool:
+        futures = [pool.submit(_run, job) for job in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            res = future.result()
+            results.append(res)
+            if progress is not None:
+                progress(done, len(jobs), res)
+
+    order = {job.id: i for i, job in enumerate(jobs)}
+    results.sort(key=lambda r: order[r.id])
+    with open(os.path.join(out_dir, "summary.csv"), "w", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, fieldnames=SUMMARY_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for res in results:
+            writer.writerow(asdict(res))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Análisis de inundaciones por lotes a partir de un manifiesto CSV/JSON.")
+    parser.add_argument("manifest", help="manifiesto .csv o .json")
+    parser.add_argument("-o", "--out-dir", required=True, help="directorio de salida")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="trabajos simultáneos")
+    parser.add_argument("--masks", action="store_true", help="guarda la máscara FloodedBin")
+    parser.add_argument("--cog", action="store_true",
+                        help="escribe FloodedBin y las pertenencias como COG")
+    parser.add_argument("--gpkg", action="store_true",
+                        help="vectoriza FloodedBin en un GeoPackage")
+    parser.add_argument("--mask-scale", type=float, default=30,
+                        help="resolución (m) de las máscaras descargadas de EE")
+    parser.add_argument("--area-mode", choices=AREA_MODES, default="auto",
+                        help="área en Earth Engine: estimador adaptativo en AOIs grandes "
+                             "(auto), suma exacta a 10 m o siempre el estimador")
+    parser.add_argument("--project", default=None, help="proyecto de Earth Engine")
+    args = parser.parse_args(argv)
+
+    jobs = read_manifest(args.manifest)
+    if args.project:
+        from .session import EarthEngineSession, set_session
+        set_session(EarthEngineSession(project=args.project))
+
+    def _progress(done, total, res):
+        area = "" if res.area_ha is None else f"{res.area_ha:.2f} ha"
+        print(f"[{done}/{total}] {res.id}: {res.status} {area} {res.error or ''}".rstrip(),
+              flush=True)
+
+    results = run_batch(jobs, args.out_dir, args.workers, masks=args.masks,
+                        mask_scale=args.mask_scale, progress=_progress, cogs=args.cog,
+                        polygons=args.gpkg, area_mode=args.area_mode)
+    failed = sum(res.status != "ok" for res in results)
+    print(f"{len(results) - failed} correctos, {failed} con error -> "
+          f"{os.path.join(args.out_dir, 'summary.csv')}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Caché persistente de resultados direccionada por contenido.
+
+La clave es el SHA-256 de una serialización canónica de los parámetros del
+análisis (fecha, ventanas, polarización, órbita, AOI y umbrales). Cada
+entrada guarda un registro JSON (área en ha, referencia de teselas,
+estadísticas) y, opcionalmente, arreglos ``.npy`` (p. ej. la máscara).
+El tamaño total está acotado y se expulsan primero las entradas usadas
+hace más tiempo (LRU por fecha de último acceso).
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import asdict, is_dataclass
+
+import numpy as np
+
+# Cambiar al modificar el algoritmo para invalidar resultados antiguos
+CACHE_VERSION = 1
+
+
+def _canonical(value):
+    if is_dataclass(value):
+        return _canonical(asdict(value))
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (np.integer, np.floating)):
+        value = value.item()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return round(float(value), 9)  # 3 == 3.0 == 3.0000000001
+    return value
+
+
+def cache_key(**params):
+    """Hash estable de los parámetros, independiente del orden y de la representación."""
+    payload = json.dumps(_canonical({"version": CACHE_VERSION, **params}),
+                         sort_keys=True, separators=(",", ":"), ensure_ascii=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Caché en ``directory`` con un máximo de ``max_bytes`` en disco."""
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry_dir(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """Devuelve el registro de ``key`` o ``None``; marca la entrada como usada."""
+        entry = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry, "record.json"), encoding="utf-8") as fh:
+                record = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        now = time.time()
+        os.utime(entry, (now, now))
+        return record
+
+    def get_array(self, key, name, mmap_mode="r"):
+        """Arreglo ``name`` guardado con la entrada (mapeado en memoria) o ``None``."""
+        path = os.path.join(self._entry_dir(key), f"{name}.npy")
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode=mmap_mode)
+
+    def put(self, key, record, arrays=None):
+        """Guarda atómicamente ``record`` (JSON) y ``arrays`` ({nombre: ndarray})."""
+        entry = self._entry_dir(key)
+        parent = os.path.dirname(entry)
+        os.makedirs(parent, exist_ok=True)
+
+        tmp = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+        try:
+            for name, arr in (arrays or {}).items():
+                np.save(os.path.join(tmp, f"{name}.npy"), np.asarray(arr))
+            with open(os.path.join(tmp, "record.json"), "w", encoding="utf-8") as fh:
+                json.dump(_canonical(record), fh, ensure_ascii=False, sort_keys=True)
+            if os.path.isdir(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp, entry)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self.evict()
+
+    def _entries(self):
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_dir() and not entry.name.startswith(".tmp-"):
+                    size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+                    yield entry.stat().st_mtime, size, entry.path
+
+    def size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Elimina las entradas menos usadas hasta quedar por debajo de ``max_bytes``."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Exportación de las capas del modelo como Cloud-Optimized GeoTIFF.
+
+``FloodedBin`` se escribe con 1 bit por píxel (0 = nodata, como el
+``selfMask`` de Earth Engine) y las pertenencias ``FM_FV``, ``FM_OW``,
+``FM_HD`` y ``FM3`` cuantizadas a ``uint8`` (0..``UINT8_SCALE``, nodata
+``UINT8_NODATA``, ver ``model.kernels``). Cada fichero va en teselas
+internas comprimidas con vistas generales internas, así que QGIS lo
+dibuja a cualquier escala leyendo sólo los bloques necesarios. Las capas
+se escriben en paralelo (GDAL libera el GIL al comprimir) pasando por un
+GeoTIFF temporal en disco, con memoria acotada por bloques de filas.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .kernels import UINT8_NODATA, quantize
+
+try:
+    from osgeo import gdal
+except ImportError:  # GDAL viene con QGIS; fuera de QGIS es opcional
+    gdal = None
+
+BINARY_LAYERS = ("FloodedBin",)
+MEMBERSHIP_LAYERS = ("FM_FV", "FM_OW", "FM_HD", "FM3")
+EXPORT_LAYERS = BINARY_LAYERS + MEMBERSHIP_LAYERS
+
+BLOCK_SIZE = 512
+_ROWS = 1024  # filas por bloque al cuantizar/copiar (menos si el raster es muy ancho)
+_BYTES_PER_PX = 12  # bloque float32 + temporales de ``nan_to_num``/``quantize``
+BLOCK_BYTES = 64 * 1024 * 1024  # por escritura
+MAX_MEMORY = 512 * 1024 * 1024  # bloques en vuelo entre todas las escrituras
+
+
+def require_gdal():
+    if gdal is None:
+        raise RuntimeError("Se necesita GDAL (osgeo) para escribir GeoTIFF.")
+
+
+def overview_factors(shape, block_size=BLOCK_SIZE):
+    """Factores 2, 4, 8, ... hasta que la vista cabe en una tesela."""
+    factors, f = [], 2
+    while max(shape) / (f // 2) > block_size:
+        factors.append(f)
+        f *= 2
+    return factors
+
+
+def _block_rows(width, block_bytes=BLOCK_BYTES):
+    return max(1, min(_ROWS, block_bytes // max(1, width * _BYTES_PER_PX)))
+
+
+def _finish(dataset, path, binary, block_size, compress):
+    """
+    Añade las vistas generales a ``dataset`` (un GeoTIFF temporal en disco:
+    GDAL las calcula por bloques) y lo copia a ``path`` con la disposición
+    COG: teselas con las vistas a continuación.
+    """
+    band = dataset.GetRasterBand(1)
+    band.SetNoDataValue(0 if binary else UINT8_NODATA)
+    factors = overview_factors((dataset.RasterYSize, dataset.RasterXSize), block_size)
+    if factors:
+        dataset.BuildOverviews("NEAREST" if binary else "AVERAGE", factors)
+    options = [
+        "TILED=YES", f"BLOCKXSIZE={block_size}", f"BLOCKYSIZE={block_size}",
+        f"COMPRESS={compress}", "COPY_SRC_OVERVIEWS=YES", "BIGTIFF=IF_SAFER",
+        "NBITS=1" if binary else "PREDICTOR=2",
+    ]
+    out = gdal.GetDriverByName("GTiff").CreateCopy(path, dataset, options=options)
+    if out is None:
+        raise RuntimeError(f"No se pudo escribir el GeoTIFF: {path}")
+    out.FlushCache()
+    out = None
+    return path
+
+
+def _remove(path):
+    for name in (path, path + ".ovr", path + ".aux.xml"):
+        try:
+            os.remove(name)
+        except OSError:
+            pass
+
+
+def write_cog(path, array, geotransform=None, projection=None, binary=False,
+              block_size=BLOCK_SIZE, compress="DEFLATE"):
+    """
+    Escribe ``array`` (H, W) como COG en ``path``. Con ``binary`` se guarda
+    ``> 0`` en 1 bit; si no, ``array`` es una pertenencia 0..1 (NaN =
+    enmascarado) o ya cuantizada a ``uint8``. ``array`` puede ser un
+    memmap: se recorre por bloques de filas (``BLOCK_BYTES`` como mucho) y
+    la copia intermedia va a un GeoTIFF temporal en disco junto a ``path``.
+    """
+    require_gdal()
+    height, width = np.shape(array)[-2:]
+
+    # 1) Copia uint8 en disco, por bloques de filas
+    tmp = path + ".tmp.tif"
+    dataset = gdal.GetDriverByName("GTiff").Create(
+        tmp, width, height, 1, gdal.GDT_Byte,
+        options=["TILED=YES", f"BLOCKXSIZE={block_size}", f"BLOCKYSIZE={block_size}",
+                 "BIGTIFF=IF_SAFER"])
+    if dataset is None:
+        raise RuntimeError(f"No se pudo crear el GeoTIFF temporal: {tmp}")
+    try:
+        if geotransform is not None:
+            dataset.SetGeoTransform(geotransform)
+        if projection:
+            dataset.SetProjection(projection)
+        band = dataset.GetRasterBand(1)
+        rows = _block_rows(width)
+        for r in range(0, height, rows):
+            block = np.asarray(array[r:r + rows])
+            if binary:
+                with np.errstate(invalid="ignore"):
+                    block = (np.nan_to_num(block) > 0).astype(np.uint8)
+            elif block.dtype != np.uint8:
+                block = quantize(block)
+            band.WriteArray(block, 0, r)
+        band = None
+
+        # 2-3) Vistas generales y GeoTIFF final
+        return _finish(dataset, path, binary, block_size, compress)
+    finally:
+        dataset = None
+        _remove(tmp)
+
+
+def geotiff_to_cog(src, dst=None, binary=False, block_size=BLOCK_SIZE, compress="DEFLATE"):
+    """
+    Reescribe como COG un GeoTIFF ``uint8`` ya codificado como
+    ``ee_engine.export_images`` (p. ej. de ``getDownloadURL``). ``src`` se
+    modifica (recibe las vistas generales) y, si ``dst`` es otro fichero,
+    se puede borrar después. Sin leer el raster entero en memoria.
+    """
+    require_gdal()
+    dst = dst or src
+    work = src
+    if os.path.abspath(dst) == os.path.abspath(src):
+        work = src + ".src.tif"
+        os.replace(src, work)
+    try:
+        dataset = gdal.Open(work, gdal.GA_Update)
+        if dataset is None:
+            raise RuntimeError(f"No se pudo abrir el raster: {src}")
+        try:
+            return _finish(dataset, dst, binary, block_size, compress)
+        finally:
+            dataset = None
+    finally:
+        if work != src:
+            _remove(work)
+
+
+def _writers(shape, count, workers=None, max_memory=MAX_MEMORY):
+    """Escrituras simultáneas: las que caben en ``max_memory`` con un bloque de filas cada una."""
+    height, width = shape[-2:]
+    per_writer = min(_block_rows(width), height) * width * _BYTES_PER_PX
+    limit = max(1, int(max_memory // max(1, per_writer)))
+    return max(1, min(count, limit, workers or os.cpu_count() or 1))
+
+
+def export_cogs(layers, out_dir, geotransform=None, projection=None, names=EXPORT_LAYERS,
+                prefix="", workers=None, max_memory=MAX_MEMORY):
+    """
+    Escribe en paralelo las capas ``names`` de ``layers`` ({nombre: arreglo})
+    como ``<out_dir>/<prefix><nombre>.tif``. El número de escrituras
+    simultáneas lo limita ``max_memory``. Devuelve {nombre: ruta}.
+    """
+    require_gdal()
+    os.makedirs(out_dir, exist_ok=True)
+    names = [name for name in names if layers.get(name) is not None]
+    if not names:
+        return {}
+
+    def _write(name):
+        path = os.path.join(out_dir, f"{prefix}{name}.tif")
+        return write_cog(path, layers[name], geotransform, projection,
+                         binary=name in BINARY_LAYERS)
+
+    shape = np.shape(layers[names[0]])
+    with ThreadPoolExecutor(max_workers=_writers(shape, len(names), workers, max_memory)) as pool:
+        return dict(zip(names, pool.map(_write, names)))
+
+
+def download_cogs(urls, out_dir, prefix="", workers=None):
+    """
+    Descarga en paralelo los GeoTIFF ``urls`` ({nombre: URL}) y los reescribe
+    como COG en ``<out_dir>/<prefix><nombre>.tif``. Devuelve {nombre: ruta}.
+    """
+    from .batch import download
+
+    require_gdal()
+    os.makedirs(out_dir, exist_ok=True)
+
+    def _fetch(name):
+        path = os.path.join(out_dir, f"{prefix}{name}.tif")
+        tmp = path + ".download"
+        download(urls[name], tmp)
+        try:
+            return geotiff_to_cog(tmp, path, binary=name in BINARY_LAYERS)
+        finally:
+            _remove(tmp)
+
+    names = list(urls)
+    with ThreadPoolExecutor(max_workers=workers or len(names) or 1) as pool:
+        return dict(zip(names, pool.map(_fetch, names)))
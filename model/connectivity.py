@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Conectividad hidráulica de las zonas inundadas con el agua permanente.
+
+FM_HD sólo mira la pendiente, así que un charco aislado lejos de cualquier
+río cuenta igual que la llanura de inundación. Aquí se etiquetan las
+componentes conexas de (inundado ∪ agua permanente) y las zonas inundadas
+cuya componente no contiene agua permanente (GSW con ocurrencia
+``>= perm_occ`` o la máscara ``extra_water``) se ponderan con
+``isolated_weight``: 1 las conserva (etapa desactivada), 0 las descarta.
+
+El etiquetado es el de ``model.components`` (tramos + union-find), lineal
+en el número de tramos. Para AOIs por teselas, ``TiledConnectivity`` etiqueta
+cada núcleo por separado y sólo guarda, por componente, si toca agua
+permanente, más las etiquetas de las costuras; la ponderación se aplica
+después tesela a tesela.
+
+FloodedBin es ``flooded > 0``, así que un peso ``0 < isolated_weight < 1``
+sólo rebaja ``flooded``: FloodedBin y el área no cambian. Sólo ``0`` los
+modifica.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from .components import UnionFind, label
+
+
+def permanent_water(occurrence, params, extra_water=None):
+    """Semillas de conectividad: ocurrencia GSW ``>= perm_occ`` (%) o ``extra_water``."""
+    with np.errstate(invalid="ignore"):
+        permanent = np.asarray(occurrence) >= params.perm_occ
+    if extra_water is not None:
+        permanent |= np.asarray(extra_water, dtype=bool)
+    return permanent
+
+
+def connected_to_water(flooded_bin, permanent, connectivity=8, tile_size=None, workers=None):
+    """
+    Máscara de los píxeles inundados cuya componente conexa (junto con el
+    agua permanente) toca agua permanente. Con ``tile_size`` se resuelve
+    con ``TiledConnectivity`` en ``workers`` hilos.
+    """
+    if tile_size:
+        return _connected_tiled(flooded_bin, permanent, connectivity, tile_size, workers)
+    flooded = np.asarray(flooded_bin) > 0
+    labels, n, seeded = _label_seeded(flooded, permanent, connectivity)
+    return seeded[labels] & flooded
+
+
+def _label_seeded(flooded, permanent, connectivity):
+    """Etiquetas de (inundado ∪ permanente), n y qué etiquetas tocan agua permanente."""
+    labels, n = label(flooded | permanent, connectivity)
+    seeded = np.zeros(n + 1, dtype=bool)
+    seeded[labels[permanent]] = True
+    seeded[0] = False
+    return labels, n, seeded
+
+
+@dataclass
+class TileScan:
+    """
+    Resumen de una tesela para la conectividad global: por etiqueta local
+    (índice 0 = fondo) si toca agua permanente y sus píxeles y área (ha)
+    inundados, más las etiquetas de sus bordes. Nada del tamaño de la tesela.
+    """
+    n: int
+    seeded: np.ndarray
+    counts: np.ndarray
+    area_ha: np.ndarray
+    top: np.ndarray
+    bottom: np.ndarray
+    left: np.ndarray
+    right: np.ndarray
+
+
+def scan_tile(flooded, permanent, pixel_area=None, connectivity=8):
+    """
+    ``TileScan`` del núcleo de una tesela. ``pixel_area`` (m²) es un escalar
+    o un arreglo del tamaño del núcleo; sin él el área queda a 0.
+    """
+    flooded = np.asarray(flooded) > 0
+    permanent = np.asarray(permanent, dtype=bool)
+    labels, n, seeded = _label_seeded(flooded, permanent, connectivity)
+    flooded_labels = labels[flooded]
+    counts = np.bincount(flooded_labels, minlength=n + 1)
+    if pixel_area is None:
+        area_ha = np.zeros(n + 1)
+    elif np.ndim(pixel_area) == 0:
+        area_ha = counts * (float(pixel_area) / 10000)
+    else:
+        area_ha = np.bincount(flooded_labels, minlength=n + 1,
+                              weights=np.asarray(pixel_area, dtype=np.float64)[flooded]) / 10000
+    return TileScan(n, seeded, counts, area_ha,
+                    labels[0].copy(), labels[-1].copy(), labels[:, 0].copy(), labels[:, -1].copy())
+
+
+class TiledConnectivity:
+    """
+    Conectividad global a partir de los ``TileScan`` de cada núcleo
+    (ventanas de ``model.tiling``, sin solapes):
+
+     1) ``add`` guarda el resumen de cada tesela (etiquetas locales),
+     2) ``resolve`` une en un union-find global las etiquetas que se tocan
+        en las costuras y propaga a cada raíz la marca de agua permanente,
+     3) ``connected`` vuelve a etiquetar (igual que en el paso 1) sólo las
+        teselas con componentes aisladas y devuelve su máscara conectada.
+
+    La memoria es la de una tesela por hilo más un valor por componente y
+    dos filas/columnas por costura; ningún arreglo cubre todo el AOI.
+    """
+
+    def __init__(self, shape, connectivity=8):
+        self.shape = tuple(shape)
+        self.connectivity = connectivity
+        self.scans = {}
+        self.offsets = None
+        self.connected_labels = None
+
+    def add(self, win, scan):
+        self.scans[win] = scan
+
+    def resolve(self):
+        height, width = self.shape
+        windows = sorted(self.scans, key=lambda w: (w.row, w.col))
+        self.offsets, total = {}, 0
+        for win in windows:
+            self.offsets[win] = total
+            total += self.scans[win].n
+
+        # Etiquetas globales a ambos lados de cada costura
+        above, below, left, right = {}, {}, {}, {}
+
+        def put(seams, key, size, span, edge, offset):
+            seams.setdefault(key, np.zeros(size, dtype=np.int64))[span] = np.where(
+                edge > 0, edge.astype(np.int64) + offset, 0)
+
+        for win in windows:
+            scan, offset = self.scans[win], self.offsets[win]
+            r1, c1 = win.row + win.height, win.col + win.width
+            if win.row > 0:
+                put(below, win.row, width, win.cols, scan.top, offset)
+            if r1 < height:
+                put(above, r1, width, win.cols, scan.bottom, offset)
+            if win.col > 0:
+                put(right, win.col, height, win.rows, scan.left, offset)
+            if c1 < width:
+                put(left, c1, height, win.rows, scan.right, offset)
+
+        shifts = (-1, 0, 1) if self.connectivity == 8 else (0,)
+        a, b = [], []
+        for first, second in ((above, below), (left, right)):
+            for key, x in first.items():
+                y = second[key]
+                for s in shifts:
+                    lo, hi = max(-s, 0), len(x) - max(s, 0)
+                    a.append(x[lo:hi])
+                    b.append(y[lo + s:hi + s])
+        a = np.concatenate(a) if a else np.zeros(0, np.int64)
+        b = np.concatenate(b) if b else np.zeros(0, np.int64)
+        both = (a > 0) & (b > 0)
+        uf = UnionFind(total + 1)
+        uf.union(a[both], b[both])
+        roots = uf.roots()
+
+        seeded = np.concatenate([[False]] + [self.scans[w].seeded[1:] for w in windows])
+        root_seeded = np.zeros(total + 1, dtype=bool)
+        root_seeded[roots[seeded]] = True
+        self.connected_labels = root_seeded[roots]
+        self.connected_labels[0] = False
+        return self
+
+    def _local(self, win):
+        """Marca de conexión de las etiquetas locales 0..n de ``win``."""
+        offset = self.offsets[win]
+        local = self.connected_labels[offset:offset + self.scans[win].n + 1].copy()
+        local[0] = False
+        return local
+
+    def isolated_counts(self, win):
+        """Píxeles inundados aislados del núcleo ``win``."""
+        return int(self.scans[win].counts[~self._local(win)].sum())
+
+    def isolated_area_ha(self):
+        """Área (ha) inundada aislada en todo el AOI."""
+        return float(sum(self.scans[win].area_ha[~self._local(win)].sum() for win in self.scans))
+
+    def connected(self, win, flooded, permanent):
+        """Máscara conectada del núcleo ``win`` (las mismas capas que en ``scan_tile``)."""
+        flooded = np.asarray(flooded) > 0
+        if not self.isolated_counts(win):
+            return flooded
+        labels, n, _ = _label_seeded(flooded, np.asarray(permanent, dtype=bool),
+                                     self.connectivity)
+        return self._local(win)[labels] & flooded
+
+
+def _connected_tiled(flooded_bin, permanent, connectivity, tile_size, workers):
+    from .tiling import iter_windows  # tiling -> connectivity
+
+    shape = tuple(np.shape(flooded_bin))
+    windows = list(iter_windows(shape, tile_size))
+    graph = TiledConnectivity(shape, connectivity)
+
+    def _read(win):
+        return flooded_bin[win.rows, win.cols], permanent[win.rows, win.cols]
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        for win, scan in zip(windows, pool.map(
+                lambda w: scan_tile(*_read(w), connectivity=connectivity), windows)):
+            graph.add(win, scan)
+        graph.resolve()
+        out = np.zeros(shape, dtype=bool)
+
+        def _apply(win):
+            out[win.rows, win.cols] = graph.connected(win, *_read(win))
+
+        list(pool.map(_apply, windows))
+    return out
+
+
+def apply_connectivity(flooded, flooded_bin, connected, weight):
+    """
+    Pondera ``flooded`` fuera de ``connected`` con ``weight`` y devuelve
+    (flooded nuevo, FloodedBin). FloodedBin sólo se recalcula (``> 0``) con
+    ``weight == 0``; con otro peso es el mismo ``flooded_bin``.
+    """
+    isolated = (np.asarray(flooded_bin) > 0) & ~connected
+    flooded = np.array(flooded, dtype=np.float32, copy=True)
+    flooded[isolated] *= np.float32(weight)
+    if weight > 0:
+        return flooded, flooded_bin
+    with np.errstate(invalid="ignore"):
+        return flooded, (flooded > 0).astype(np.uint8)
@@ -1,6 +1,9 @@
-import ee
 # CONSTANTES GLOBALES
-geoemtry_gsw = [
+# Las geometrías de Earth Engine se construyen al pedirlas por primera vez
+# (no al importar) y se memorizan; importar ``model`` no requiere EE.
+import threading
+
+geometry_gsw_coords = [
     [-9.997846154141579, 36.126099901780215],
     [3.1637749396084214, 36.126099901780215],
     [3.1637749396084214, 43.79229580945271],
@@ -17,11 +20,73 @@ geometry_coords = [
     [-2.3428081194314876,38.963040572874135]
 ]
 
-geometry_pp = ee.Geometry.Polygon(geometry_coords)
+
+# ---------------- Registro de regiones ----------------
+
+_REGIONS = {}   # nombre -> función que construye el objeto EE
+_BUILT = {}     # nombre -> objeto EE ya construido
+_lock = threading.Lock()
+
+
+def register_region(name, builder):
+    """Registra ``builder()`` (sin argumentos) como constructor de la región ``name``."""
+    with _lock:
+        _REGIONS[name] = builder
+        _BUILT.pop(name, None)
+
+
+def get_region(name):
+    """Devuelve la región ``name``, construyéndola en el primer acceso."""
+    with _lock:
+        if name not in _BUILT:
+            if name not in _REGIONS:
+                raise KeyError(f"Región desconocida: {name}")
+            _BUILT[name] = _REGIONS[name]()
+        return _BUILT[name]
+
+
+def region_names():
+    return sorted(_REGIONS)
+
+
+def clear_regions():
+    """Olvida las regiones construidas (p. ej. tras reinicializar EE)."""
+    with _lock:
+        _BUILT.clear()
+
+
+def register_polygon_region(name, coords):
+    """Región poligonal a partir de un anillo de coordenadas lon/lat."""
+    def builder():
+        import ee
+        return ee.Geometry.Polygon(coords)
+    register_region(name, builder)
+
+
+def register_admin_region(name, adm0_name, adm2_name, collection='FAO/GAUL/2015/level2'):
+    """Región administrativa (nivel 2 de GAUL) filtrada por país y nombre."""
+    def builder():
+        import ee
+        return (
+            ee.FeatureCollection(collection)
+            .filter(ee.Filter.eq('ADM0_NAME', adm0_name))
+            .filter(ee.Filter.eq('ADM2_NAME', adm2_name))
+        )
+    register_region(name, builder)
+
+
+# Geometria de la extension de GSW (España peninsular)
+register_polygon_region('geometry_gsw', geometry_gsw_coords)
+
+# Geometria para precipitaciones
+register_polygon_region('geometry_pp', geometry_coords)
 
 # Geometria para analisis de inundaciones
-geometry_admin= (
-    ee.FeatureCollection('FAO/GAUL/2015/level2')
-    .filter(ee.Filter.eq('ADM0_NAME', 'Spain'))
-    .filter(ee.Filter.eq('ADM2_NAME', 'Valencia/València'))
-)
\ No newline at end of file
+register_admin_region('geometry_admin', 'Spain', 'Valencia/València')
+
+
+def __getattr__(name):
+    # Compatibilidad: ``constants.geometry_pp`` y ``constants.geometry_admin``
+    if name in _REGIONS:
+        return get_region(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
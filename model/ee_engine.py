@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+"""Motor Earth Engine: las etapas del modelo como grafo de expresiones EE."""
+import ee
+
+from .area import (ADAPTIVE_COARSE_SCALE, ADAPTIVE_MIN_HA, ADAPTIVE_SAMPLES, AREA_MODES,
+                   BOUND_FACTOR)
+from .cog import BINARY_LAYERS, EXPORT_LAYERS
+from .ee_fuzzy import FuzzyExpressionBuilder
+from .engine import FloodEngine, FloodInputs, FloodParams, run_pipeline
+from .kernels import UINT8_NODATA, UINT8_SCALE
+from .trace import request
+from .utils import mask_s2_clouds
+
+
+def load_inputs(date_str, days_before, days_after, polarization, orbit_dir, ee_geometry):
+    """
+    Filtra las colecciones (pasos 2 y 3 de ``_run_analysis``) y devuelve
+    (entradas recortadas al AOI, recuentos de escenas S1). Los recuentos son
+    ``ee.Number`` sin evaluar; ``evaluate_summary`` los comprueba junto con
+    el área en una única petición.
+    """
+    # 2) Fechas
+    event_date   = ee.Date(date_str)
+    before_start = event_date.advance(-days_before, 'day')
+    before_end   = event_date
+    after_start  = event_date
+    after_end    = event_date.advance(days_after, 'day')
+
+    # 3) Colecciones
+    col_s1 = (
+        ee.ImageCollection("COPERNICUS/S1_GRD")
+        .filter(ee.Filter.eq("instrumentMode", "IW"))
+        .filter(ee.Filter.listContains("transmitterReceiverPolarisation", polarization))
+        .filter(ee.Filter.eq("orbitProperties_pass", orbit_dir))
+        .filter(ee.Filter.eq("resolution_meters", 10))
+        .filterBounds(ee_geometry)
+        .select(polarization)
+    )
+
+    col_before = col_s1.filterDate(before_start, before_end)
+    col_after  = col_s1.filterDate(after_start, after_end)
+    counts = {"before_count": col_before.size(), "after_count": col_after.size()}
+
+    s2_sr = (
+        ee.ImageCollection("COPERNICUS/S2_SR_HARMONIZED")
+        .filterDate('2024-08-10', '2024-09-20')
+        .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 20))
+        .filterBounds(ee_geometry)
+        .map(mask_s2_clouds)
+        .median()
+        .clip(ee_geometry)
+    )
+
+    chirps = (
+        ee.ImageCollection("UCSB-CHG/CHIRPS/DAILY")
+        .filterDate(event_date, event_date.advance(1, "day"))
+        .filterBounds(ee_geometry)
+        .select("precipitation")
+    )
+
+    gsw = ee.Image("JRC/GSW1_4/GlobalSurfaceWater")
+    dem = ee.Image('WWF/HydroSHEDS/03VFDEM')
+
+    # Mezcla T=500 si aplica
+    extra_water = None
+    if date_str == '2024-10-29':
+        q500_v = ee.FeatureCollection('projects/tidop-424613/assets/TIDOP/T500_v')
+        q500_m = ee.FeatureCollection('projects/tidop-424613/assets/TIDOP/T500_m')
+        q500_v_img = ee.Image().byte().paint(featureCollection=q500_v, color=1).rename('Q500_v').selfMask()
+        q500_m_img = ee.Image().byte().paint(featureCollection=q500_m, color=1).rename('Q500_m').selfMask()
+        extra_water = q500_v_img.blend(q500_m_img)
+
+    inputs = FloodInputs(
+        before=col_before.median().clip(ee_geometry),
+        after=col_after.median().clip(ee_geometry),
+        ndbi=s2_sr.normalizedDifference(["B11", "B8"]).rename("NDBI"),
+        precip=chirps.sum().clip(ee_geometry),
+        occurrence=gsw.select("occurrence"),  # 0..100
+        dem=dem,
+        extra_water=extra_water,
+    )
+    return inputs, counts
+
+
+def evaluate_summary(counts, area_ha=None, area_error_ha=0):
+    """
+    Evalúa en una sola petición los recuentos de escenas y, si se pide, el
+    área y su cota de error. El área sólo se calcula en el servidor cuando
+    hay escenas antes y después (``If`` no evalúa la rama descartada); el
+    error se decide aquí.
+    """
+    n_before = ee.Number(counts["before_count"])
+    n_after  = ee.Number(counts["after_count"])
+    summary = {"before_count": n_before, "after_count": n_after}
+    if area_ha is not None:
+        summary["area"] = ee.Algorithms.If(
+            n_before.gt(0).And(n_after.gt(0)),
+            ee.Dictionary({"area_ha": area_ha, "area_error_ha": area_error_ha}),
+            ee.Dictionary({"area_ha": 0, "area_error_ha": 0}),
+        )
+
+    dictionary = ee.Dictionary(summary)
+    with request("getInfo", dictionary) as req:
+        values = req.response = dictionary.getInfo()
+    values.update(values.pop("area", None) or {})
+    if values["before_count"] == 0:
+        raise RuntimeError("No hay imágenes 'before' para esa fecha y área.")
+    if values["after_count"] == 0:
+        raise RuntimeError("No hay imágenes 'after' para esa fecha y área.")
+    return values
+
+
+def analyze(date_str, days_before, days_after, polarization, orbit_dir, ee_geometry,
+            params=None, step=None, with_area=True, area_mode="auto"):
+    """
+    Construye el grafo completo y lo evalúa con una única petición
+    ``getInfo`` (ninguna si ``with_area`` es falso). Devuelve (área en ha o
+    ``None``, ``FloodResult``); la cota de error queda en
+    ``result.area_error_ha``.
+
+    ``area_mode``: ``"auto"`` (por defecto: ``area_estimate`` si el AOI
+    supera ``ADAPTIVE_MIN_HA``, decidido en el servidor; si no, la suma
+    exacta), ``"exact"`` (suma a 10 m) o ``"adaptive"`` (siempre el
+    estimador). ``benchmarks/bench_area_ee.py`` cronometra ambos en Earth
+    Engine.
+    """
+    if area_mode not in AREA_MODES:
+        raise ValueError(f"area_mode debe ser uno de {AREA_MODES}.")
+    inputs, counts = load_inputs(date_str, days_before, days_after,
+                                 polarization, orbit_dir, ee_geometry)
+    backend = EarthEngineBackend(ee_geometry)
+    result = run_pipeline(backend, inputs, params or FloodParams(), step=step)
+    if not with_area:
+        # Resultado ya conocido (caché): basta con el grafo para publicar teselas
+        return None, result
+
+    if area_mode == "exact":
+        area_ha, area_error_ha = result.area_ha, 0
+    else:
+        estimate = backend.area_estimate(result.flooded_bin)
+        if area_mode == "auto":
+            estimate = ee.Dictionary(ee.Algorithms.If(
+                ee_geometry.area(1).gt(ADAPTIVE_MIN_HA * 10000),
+                estimate,
+                ee.Dictionary({"area_ha": result.area_ha, "error_ha": 0}),
+            ))
+        area_ha, area_error_ha = estimate.get("area_ha"), estimate.get("error_ha")
+
+    values = evaluate_summary(counts, area_ha, area_error_ha)
+    result.area_error_ha = float(values["area_error_ha"] or 0)
+    return float(values["area_ha"]), result
+
+
+def export_images(result, names=EXPORT_LAYERS):
+    """
+    Capas de ``result`` codificadas como en ``model.cog`` para descargarlas:
+    FloodedBin 0/1 y pertenencias ``uint8`` (nodata ``UINT8_NODATA``).
+    """
+    images = {}
+    for name in names:
+        img = result.layers[name]
+        if name in BINARY_LAYERS:
+            images[name] = img.unmask(0).toByte()
+        else:
+            images[name] = img.multiply(UINT8_SCALE).round().unmask(UINT8_NODATA).toByte()
+    return images
+
+
+def download_urls(result, ee_geometry, scale, names=EXPORT_LAYERS):
+    """URLs de descarga GeoTIFF de ``export_images`` recortadas a ``ee_geometry``."""
+    return {
+        name: img.getDownloadURL({"region": ee_geometry, "scale": scale, "format": "GEO_TIFF"})
+        for name, img in export_images(result, names).items()
+    }
+
+
+class EarthEngineBackend(FloodEngine):
+    """
+    Construye el grafo EE de cada etapa, recortado a ``ee_geometry``.
+    ``fuzzy`` aporta las pertenencias ``s``/``z`` (por defecto, la forma
+    compacta de ``ee_fuzzy``).
+    """
+
+    name = "earthengine"
+
+    def __init__(self, ee_geometry, fuzzy=None):
+        self.geometry = ee_geometry
+        self.fuzzy = fuzzy or FuzzyExpressionBuilder()
+
+    def difference(self, before, after, params):
+        before_f = before.focal_mean(params.smoothing_radius, "circle", "meters")
+        after_f  = after .focal_mean(params.smoothing_radius, "circle", "meters")
+        return after_f.divide(before_f).rename("difference")
+
+    def fm_fv(self, difference, ndbi, precip, params):
+        FM_FV = self.fuzzy.s(difference, params.s1_thr, params.s2_thr).rename("FM_FV").updateMask(ee.Image(1))
+        # Excluir urbano
+        FM_FV = FM_FV.updateMask(ndbi.gt(params.ndbi_thr).Not())
+        # Lluvia mínima
+        return FM_FV.updateMask(precip.gt(params.rain_thr))
+
+    def fm_ow(self, occurrence, params, extra_water=None):
+        low_occ_mask = occurrence.lt(params.occ_low)
+        occ_norm = occurrence.divide(100)
+
+        stats = occ_norm.updateMask(occ_norm.gt(0)).reduceRegion(
+            reducer=ee.Reducer.mean().combine(reducer2=ee.Reducer.stdDev(), sharedInputs=True),
+            geometry=self.geometry, scale=30, bestEffort=True
+        )
+        # Si no hay píxeles de GSW en el AOI, usa defaults
+        mu = ee.Number(ee.Algorithms.If(stats.contains('occurrence_mean'),
+                                        stats.get('occurrence_mean'), 0))
+        sigma = ee.Number(ee.Algorithms.If(stats.contains('occurrence_stdDev'),
+                                           stats.get('occurrence_stdDev'), 0))
+        z1_default = ee.Number(params.z1_default)
+        z2_default = ee.Number(params.z2_default)
+        z1_ow = ee.Number(ee.Algorithms.If(mu.add(sigma).eq(0), z1_default, mu))
+        z2_ow = ee.Number(ee.Algorithms.If(mu.add(sigma).eq(0),
+                                           z2_default,
+                                           mu.add(sigma.multiply(2))))
+        z1_ow = z1_ow.max(0).min(1)
+        z2_ow = z2_ow.max(0).min(1)
+
+        FM_OW = self.fuzzy.z(occ_norm, z1_ow, z2_ow).updateMask(low_occ_mask).rename("FM_OW").clip(self.geometry)
+        if extra_water is not None:
+            FM_OW = FM_OW.blend(extra_water).clip(self.geometry)
+        return FM_OW
+
+    def fm_hd(self, dem, params):
+        slope = ee.Algorithms.Terrain(dem).select('slope')
+        return (self.fuzzy.z(slope, params.slope_z1, params.slope_z2)
+                .clip(self.geometry).rename('FM_HD').updateMask(ee.Image(1)))
+
+    def fuse(self, fm_fv, fm_ow, fm_hd, params):
+        FM1 = fm_fv.max(fm_ow).rename('FM1')
+        w1, w2 = params.w1, params.w2
+        FM2 = (FM1.updateMask(FM1.gt(params.fm1_thr)).multiply(w1).add(fm_hd.multiply(w2))).divide(w1 + w2).rename('FM2')
+        return FM1, FM2
+
+    def context(self, fm2, params):
+        kernel = ee.Kernel.square(radius=params.context_radius)
+        mean_context = fm2.reduceNeighborhood(reducer=ee.Reducer.mean(), kernel=kernel)
+        D = fm2.subtract(mean_context).rename('D')
+        FM3 = self.fuzzy.z(D, params.d_z1, params.d_z2).multiply(fm2).rename('FM3')
+        return D, FM3
+
+    def flooded(self, fm3, fm_fv):
+        flooded = fm3.multiply(fm_fv).rename('flooded')
+        return flooded, flooded.gt(0).selfMask().rename('FloodedBin')
+
+    def connectivity(self, flooded, flooded_bin, occurrence, params, extra_water=None):
+        """
+        Sin etiquetado global en EE: los píxeles alcanzables desde el agua
+        permanente a través de píxeles inundados se obtienen con
+        ``cumulativeCost`` (coste 1, hasta ``connect_distance`` m).
+        """
+        permanent = occurrence.gte(params.perm_occ).unmask(0)
+        if extra_water is not None:
+            permanent = permanent.Or(extra_water.unmask(0))
+        passable = flooded_bin.unmask(0).Or(permanent)
+        reach = ee.Image.constant(1).updateMask(passable).cumulativeCost(
+            source=permanent, maxDistance=params.connect_distance)
+        factor = ee.Image.constant(params.isolated_weight).where(reach.mask(), 1)
+        flooded = flooded.multiply(factor).rename('flooded')
+        if params.isolated_weight > 0:
+            return flooded, flooded_bin  # FloodedBin (> 0) no cambia: el área no depende del coste
+        return flooded, flooded.gt(0).selfMask().rename('FloodedBin')
+
+    def area_ha(self, flooded_bin):
+        """Devuelve un ``ee.Number`` (sin ``getInfo``)."""
+        flooded_area_img = flooded_bin.multiply(ee.Image.pixelArea())
+        flooded_dict = flooded_area_img.reduceRegion(
+            reducer=ee.Reducer.sum(), geometry=self.geometry, scale=10, maxPixels=1e13
+        )
+        raw_area = flooded_dict.get('FloodedBin')
+        return ee.Number(ee.Algorithms.If(raw_area, ee.Number(raw_area).divide(10000), 0))
+
+    def area_estimate(self, flooded_bin, coarse_scale=ADAPTIVE_COARSE_SCALE, fine_scale=10,
+                      samples=ADAPTIVE_SAMPLES, seed=0):
+        """
+        Área adaptativa (ver ``model.area``): el modelo se evalúa a
+        ``coarse_scale`` (las entradas salen de las pirámides) y sólo se
+        evalúa a ``fine_scale`` en la huella de las celdas de borde y de las
+        celdas interiores muestreadas. Devuelve un ``ee.Dictionary`` con
+        ``area_ha``, ``error_ha``, ``refined_fraction`` y ``samples``.
+        """
+        coarse_proj = ee.Projection('EPSG:3857').atScale(coarse_scale)
+        pixel_area = ee.Image.pixelArea()
+
+        # 1) Binario a escala gruesa: ``reproject`` fija la escala de todo el grafo previo
+        fine = flooded_bin.unmask(0).rename('f')
+        coarse = fine.reproject(coarse_proj)
+
+        # 2) Celdas de borde, refinadas a resolución completa sólo en su huella
+        minmax = coarse.reduceNeighborhood(
+            reducer=ee.Reducer.minMax(), kernel=ee.Kernel.square(1)
+        ).reproject(coarse_proj)
+        mixed = minmax.select('f_max').neq(minmax.select('f_min'))
+        interior = mixed.Not()
+        border = mixed.selfMask().reduceToVectors(
+            geometry=self.geometry, scale=coarse_scale, geometryType='polygon',
+            eightConnected=True, maxPixels=1e13, bestEffort=True
+        ).geometry()
+        refined = fine.multiply(pixel_area).updateMask(mixed).reduceRegion(
+            reducer=ee.Reducer.sum(), geometry=border, scale=fine_scale, maxPixels=1e13
+        ).get('f')
+
+        # 3) Estratos interiores (celda gruesa seca/inundada): áreas y nº de celdas
+        dry, wet = interior.And(coarse.Not()), interior.And(coarse)
+        cells = ee.Image.cat([
+            dry.multiply(pixel_area).rename('dry_area'),
+            wet.multiply(pixel_area).rename('wet_area'),
+            dry.rename('dry_n'), wet.rename('wet_n'), mixed.rename('mixed_n'),
+        ]).reduceRegion(reducer=ee.Reducer.sum(), geometry=self.geometry,
+                        scale=coarse_scale, crs=coarse_proj, maxPixels=1e13)
+
+        # 4) Celdas interiores muestreadas: fracción inundada a resolución completa
+        points = coarse.updateMask(interior).sample(
+            region=self.geometry, projection=coarse_proj, scale=coarse_scale,
+            numPixels=samples, seed=seed, geometries=True
+        )
+        sampled = fine.reduceRegions(
+            collection=points.map(lambda point: point.buffer(coarse_scale / 2).bounds()),
+            reducer=ee.Reducer.mean(), scale=fine_scale
+        )
+
+        def stratum(name, value):
+            """(corrección m², varianza acotada, cota sin muestras) del estrato."""
+            area = ee.Number(cells.get(f'{name}_area'))
+            n_cells = ee.Number(cells.get(f'{name}_n')).max(1)
+            subset = sampled.filter(ee.Filter.eq('f', value))
+            k = subset.size()
+            mean = ee.Number(ee.Algorithms.If(
+                k.gt(0), subset.aggregate_mean('mean'), value)).subtract(value)
+            sd = ee.Number(ee.Algorithms.If(k.gt(1), subset.aggregate_sample_sd('mean'), 0))
+            fpc = ee.Number(1).subtract(k.divide(n_cells)).max(0).sqrt()
+            error = sd.multiply(BOUND_FACTOR).multiply(area).multiply(fpc).divide(k.max(1).sqrt())
+            unsampled = area.multiply(ee.Number(1).subtract(k.divide(n_cells)).max(0))
+            return (area.multiply(mean),
+                    ee.Number(ee.Algorithms.If(k.gt(1), error.pow(2), 0)),
+                    ee.Number(ee.Algorithms.If(k.gt(1), 0, unsampled)))
+
+        dry_fix, dry_var, dry_bound = stratum('dry', 0)
+        wet_fix, wet_var, wet_bound = stratum('wet', 1)
+        interior_flooded = ee.Number(cells.get('wet_area'))
+        error = dry_var.add(wet_var).sqrt().add(dry_bound).add(wet_bound)
+        n_total = (ee.Number(cells.get('dry_n')).add(cells.get('wet_n'))
+                   .add(cells.get('mixed_n')).max(1))
+        return ee.Dictionary({
+            'area_ha': interior_flooded.add(ee.Number(ee.Algorithms.If(refined, refined, 0)))
+                       .add(dry_fix).add(wet_fix).divide(10000),
+            'error_ha': error.divide(10000),
+            'refined_fraction': ee.Number(cells.get('mixed_n')).divide(n_total),
+            'samples': sampled.size(),
+        })
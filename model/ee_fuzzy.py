@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Funciones de pertenencia difusa compactas para el grafo de Earth Engine.
+
+``utils.fuzzyS``/``fuzzyZ`` crean dos ``ee.Image.constant`` y una decena
+de operaciones por llamada (comparaciones, ``And``, sumas de tramos). Aquí
+cada función es una rampa saturada::
+
+    S(x) = clamp((x - s1) / w, 0, 1)          w = max(s2 - s1, EPS)
+    Z(x) = clamp((x - (z1 + w)) / -w, 0, 1)   w = max(z2 - z1, EPS)
+
+que da los mismos valores (también en los extremos y con umbrales
+iguales, donde se reduce al escalón ``x > s1`` / ``x <= z1``) con tres
+operaciones de imagen. Las constantes se crean una sola vez por valor y
+se comparten entre llamadas. Los umbrales pueden ser números de Python o
+``ee.Number`` (p. ej. los adaptativos de FM_OW).
+"""
+import ee
+
+EPS = 1e-9
+
+
+class FuzzyExpressionBuilder:
+    """Construye las pertenencias S/Z de un grafo reutilizando constantes."""
+
+    def __init__(self):
+        self._constants = {}
+
+    def constant(self, value):
+        """``ee.Image.constant`` compartida para cada número de Python."""
+        if not isinstance(value, (int, float)):
+            return value
+        key = float(value)
+        if key not in self._constants:
+            self._constants[key] = ee.Image.constant(key)
+        return self._constants[key]
+
+    @staticmethod
+    def _width(lo, hi):
+        if isinstance(lo, (int, float)) and isinstance(hi, (int, float)):
+            return max(float(hi) - float(lo), EPS)
+        return ee.Number(hi).subtract(lo).max(EPS)
+
+    def s(self, img, s1, s2):
+        """Pertenencia S (creciente) de ``img`` entre ``s1`` y ``s2``."""
+        width = self._width(s1, s2)
+        return img.subtract(self.constant(s1)).divide(self.constant(width)).clamp(0, 1)
+
+    def z(self, img, z1, z2):
+        """Pertenencia Z (decreciente) de ``img`` entre ``z1`` y ``z2``."""
+        width = self._width(z1, z2)
+        if isinstance(width, float):
+            top, neg_width = float(z1) + width, -width
+        else:
+            top, neg_width = ee.Number(z1).add(width), width.multiply(-1)
+        return img.subtract(self.constant(top)).divide(self.constant(neg_width)).clamp(0, 1)
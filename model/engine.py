@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+Interfaz de motores de ejecución del algoritmo de inundaciones.
+
+Cada motor (Earth Engine, NumPy local, ...) implementa las mismas etapas
+que ``flood_analysis._run_analysis``; ``STAGES`` las describe (entradas,
+parámetros y salidas) y ``run_pipeline``/``StageGraph`` las encadenan en
+el mismo orden y con los mismos hitos de progreso, sea cual sea el backend.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
+
+
+@dataclass(frozen=True)
+class FloodParams:
+    """Umbrales y pesos del modelo difuso (valores por defecto del plugin)."""
+    smoothing_radius: float = 50.0   # m, focal_mean circular sobre S1
+    s1_thr: float = 1.05             # fuzzyS de la razón after/before
+    s2_thr: float = 1.20
+    ndbi_thr: float = 0.2            # exclusión urbana (NDBI > thr)
+    rain_thr: float = 5.0            # mm acumulados mínimos (CHIRPS)
+    occ_low: float = 30.0            # % ocurrencia GSW considerada permanente
+    z1_default: float = 0.05         # fuzzyZ de FM_OW si el AOI no tiene GSW
+    z2_default: float = 0.30
+    slope_z1: float = 0.0            # fuzzyZ de la pendiente (grados)
+    slope_z2: float = 5.0
+    w1: float = 6.0                  # peso de FM1
+    w2: float = 1.0                  # peso de FM_HD
+    fm1_thr: float = 0.8             # FM1 mínimo para entrar en FM2
+    context_radius: int = 5          # px, kernel cuadrado del contexto
+    d_z1: float = -0.2               # fuzzyZ de D = FM2 - media local
+    d_z2: float = 0.2
+    perm_occ: float = 80.0           # % ocurrencia GSW tomada como agua permanente
+    isolated_weight: float = 1.0     # peso de zonas no conectadas al agua permanente (1 = sin efecto;
+                                     # sólo 0 cambia FloodedBin y el área, el resto sólo ``flooded``)
+    connect_distance: float = 20000.0  # m, alcance de la conectividad en Earth Engine
+
+    @property
+    def connectivity_enabled(self):
+        return self.isolated_weight < 1
+
+    def as_dict(self):
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+
+@dataclass
+class FloodInputs:
+    """
+    Entradas del algoritmo ya recortadas al AOI. El tipo de cada capa
+    depende del motor (``ee.Image`` o ``numpy.ndarray``).
+    """
+    before: object          # composición S1 antes del evento
+    after: object           # composición S1 después del evento
+    ndbi: object            # NDBI de S2 (B11, B8)
+    precip: object          # precipitación acumulada del día del evento (mm)
+    occurrence: object      # ocurrencia GSW 0..100
+    dem: object             # elevación (m)
+    extra_water: object = None  # máscara opcional de agua adicional (T500)
+
+
+@dataclass
+class FloodResult:
+    """Capas intermedias, binario final y área inundada (ha)."""
+    layers: dict = field(default_factory=dict)
+    area_ha: object = None
+    area_error_ha: float = None  # cota de error del área evaluada (0 si es exacta)
+
+    @property
+    def flooded_bin(self):
+        return self.layers.get("FloodedBin")
+
+
+class FloodEngine:
+    """
+    Contrato común de los motores. Las imágenes que entran y salen de cada
+    etapa son del tipo nativo del motor; los píxeles enmascarados siguen la
+    semántica de Earth Engine (una operación binaria enmascara si cualquiera
+    de sus operandos está enmascarado).
+    """
+
+    name = None
+
+    def difference(self, before, after, params):
+        """Razón after/before tras el suavizado circular (paso 4)."""
+        raise NotImplementedError
+
+    def fm_fv(self, difference, ndbi, precip, params):
+        """fuzzyS de la razón con exclusión urbana y lluvia mínima (paso 5)."""
+        raise NotImplementedError
+
+    def fm_ow(self, occurrence, params, extra_water=None):
+        """fuzzyZ de la ocurrencia GSW con umbrales adaptativos (paso 6)."""
+        raise NotImplementedError
+
+    def fm_hd(self, dem, params):
+        """fuzzyZ de la pendiente derivada del DEM (paso 7)."""
+        raise NotImplementedError
+
+    def fuse(self, fm_fv, fm_ow, fm_hd, params):
+        """Devuelve (FM1, FM2) (paso 7)."""
+        raise NotImplementedError
+
+    def context(self, fm2, params):
+        """Devuelve (D, FM3) a partir de la media local de FM2 (paso 8)."""
+        raise NotImplementedError
+
+    def flooded(self, fm3, fm_fv):
+        """Devuelve (flooded, FloodedBin) (paso 9)."""
+        raise NotImplementedError
+
+    def connectivity(self, flooded, flooded_bin, occurrence, params, extra_water=None):
+        """
+        Devuelve (flooded, FloodedBin) con las zonas no conectadas al agua
+        permanente ponderadas por ``params.isolated_weight`` (paso 9b).
+        """
+        raise NotImplementedError
+
+    def area_ha(self, flooded_bin):
+        """Área inundada en hectáreas (paso 10)."""
+        raise NotImplementedError
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    Etapa del grafo: lee las capas ``inputs`` (de ``FloodInputs`` o de
+    etapas anteriores) y los campos ``params`` de ``FloodParams`` y produce
+    ``outputs``. ``when(params)`` decide si la etapa se aplica.
+    """
+    name: str
+    outputs: tuple
+    inputs: tuple
+    params: tuple
+    compute: object          # compute(engine, params, *inputs) -> tupla de salidas
+    step: tuple = None       # hito de progreso (valor, texto)
+    when: object = None
+
+
+STAGES = (
+    Stage("difference", ("difference",), ("before", "after"), ("smoothing_radius",),
+          lambda e, p, before, after: (e.difference(before, after, p),),
+          (35, "Compuestas before/after y razón…")),
+    Stage("FM_FV", ("FM_FV",), ("difference", "ndbi", "precip"),
+          ("s1_thr", "s2_thr", "ndbi_thr", "rain_thr"),
+          lambda e, p, difference, ndbi, precip: (e.fm_fv(difference, ndbi, precip, p),),
+          (50, "Variación SAR (FM_FV) y filtros…")),
+    Stage("FM_OW", ("FM_OW",), ("occurrence", "extra_water"),
+          ("occ_low", "z1_default", "z2_default"),
+          lambda e, p, occurrence, extra_water: (e.fm_ow(occurrence, p, extra_water),),
+          (65, "Agua histórica (GSW)…")),
+    Stage("FM_HD", ("FM_HD",), ("dem",), ("slope_z1", "slope_z2"),
+          lambda e, p, dem: (e.fm_hd(dem, p),),
+          (78, "Conectividad hidráulica y fusión…")),
+    Stage("fuse", ("FM1", "FM2"), ("FM_FV", "FM_OW", "FM_HD"), ("w1", "w2", "fm1_thr"),
+          lambda e, p, fm_fv, fm_ow, fm_hd: e.fuse(fm_fv, fm_ow, fm_hd, p)),
+    Stage("context", ("D", "FM3"), ("FM2",), ("context_radius", "d_z1", "d_z2"),
+          lambda e, p, fm2: e.context(fm2, p),
+          (85, "Contexto espacial…")),
+    Stage("flooded", ("flooded", "FloodedBin"), ("FM3", "FM_FV"), (),
+          lambda e, p, fm3, fm_fv: e.flooded(fm3, fm_fv)),
+    Stage("connectivity", ("flooded", "FloodedBin"),
+          ("flooded", "FloodedBin", "occurrence", "extra_water"),
+          ("perm_occ", "isolated_weight", "connect_distance"),
+          lambda e, p, flooded, flooded_bin, occurrence, extra_water: e.connectivity(
+              flooded, flooded_bin, occurrence, p, extra_water),
+          (88, "Conectividad con agua permanente…"),
+          when=lambda p: p.connectivity_enabled),
+    Stage("area", ("area_ha",), ("FloodedBin",), (),
+          lambda e, p, flooded_bin: (e.area_ha(flooded_bin),),
+          (92, "Calculando área…")),
+)
+
+_INPUT_NAMES = tuple(f.name for f in fields(FloodInputs))
+# Campos que ninguna etapa declara: por prudencia invalidan todas
+_UNCLAIMED = tuple(sorted({f.name for f in fields(FloodParams)}
+                          - {name for stage in STAGES for name in stage.params}))
+
+
+class StageGraph:
+    """
+    Etapas 4-10 con memoización: cada etapa guarda su último resultado con
+    una clave formada por sus parámetros y las versiones de sus entradas,
+    así que al cambiar un umbral sólo se recalculan las etapas afectadas y
+    las que dependen de ellas (p. ej. ``w1`` rehace fusión, contexto y
+    área, pero no la razón SAR, FM_OW ni FM_HD). Las entradas (compuestas
+    S1, NDBI, precipitación acumulada, GSW, DEM) se preparan una sola vez.
+
+    Las capas devueltas se comparten con la caché: no deben modificarse.
+    Con Earth Engine se reutilizan los objetos del grafo, no el cálculo del
+    servidor, así que el ajuste interactivo es el del motor NumPy (ver
+    ``GraphCache`` y ``model.batch.tune_local_job``).
+    """
+
+    def __init__(self, engine, inputs):
+        self.engine = engine
+        self.inputs = inputs
+        self._memo = {}          # etapa -> (clave, salidas)
+        self.computed = []       # etapas recalculadas en la última ejecución
+        self.reused = []
+
+    def run(self, params=None, step=None):
+        """Devuelve el ``FloodResult`` de ``params``."""
+        params = params or FloodParams()
+        values = {name: getattr(self.inputs, name) for name in _INPUT_NAMES}
+        versions = dict.fromkeys(_INPUT_NAMES, "input")
+        unclaimed = tuple(getattr(params, name) for name in _UNCLAIMED)
+        self.computed, self.reused = [], []
+
+        for stage in STAGES:
+            if stage.when is not None and not stage.when(params):
+                continue
+            if step is not None and stage.step is not None:
+                step(*stage.step)
+            key = (tuple(getattr(params, name) for name in stage.params), unclaimed,
+                   tuple(versions[name] for name in stage.inputs))
+            memo = self._memo.get(stage.name)
+            if memo is not None and memo[0] == key:
+                outputs = memo[1]
+                self.reused.append(stage.name)
+            else:
+                outputs = tuple(stage.compute(self.engine, params,
+                                              *(values[name] for name in stage.inputs)))
+                self._memo[stage.name] = (key, outputs)
+                self.computed.append(stage.name)
+            for name, value in zip(stage.outputs, outputs):
+                values[name] = value
+                versions[name] = (stage.name, key)
+
+        layers = {name: value for name, value in values.items()
+                  if name not in _INPUT_NAMES and name != "area_ha"}
+        return FloodResult(layers=layers, area_ha=values["area_ha"])
+
+    def clear(self):
+        self._memo.clear()
+
+
+class GraphCache:
+    """
+    ``StageGraph`` (con sus ``FloodInputs`` ya cargadas y compuestas) por
+    AOI/fecha; guarda los ``size`` usados más recientemente. ``load()``
+    devuelve (motor, entradas) y sólo se llama la primera vez de cada clave.
+    """
+
+    def __init__(self, size=2):
+        self.size = int(size)
+        self._graphs = OrderedDict()
+
+    def get(self, key, load):
+        graph = self._graphs.pop(key, None)
+        if graph is None:
+            graph = StageGraph(*load())
+        self._graphs[key] = graph
+        while len(self._graphs) > self.size:
+            self._graphs.popitem(last=False)
+        return graph
+
+    @property
+    def latest(self):
+        """Último ``StageGraph`` usado (``None`` si no hay ninguno)."""
+        return next(reversed(self._graphs.values()), None)
+
+    def clear(self):
+        self._graphs.clear()
+
+
+def run_pipeline(engine, inputs, params=None, step=None):
+    """
+    Ejecuta las etapas 4-10 de ``_run_analysis`` con ``engine``.
+
+    ``step(value, text)`` es opcional y recibe los mismos hitos de progreso
+    que el diálogo del plugin. Para reevaluar con otros umbrales sin
+    repetir las etapas no afectadas, use ``StageGraph`` (o ``GraphCache``).
+    """
+    return StageGraph(engine, inputs).run(params, step)
@@ -0,0 +1,932 @@
+# -*- coding: utf-8 -*-
+"""
+Sustituto de ``ee`` para medir sin conexión: registra el grafo de
+expresiones y cuenta las peticiones bloqueantes al servidor
+(``getInfo``/``getMapId``/``getDownloadURL``), los nodos del grafo y el
+tamaño de cada petición serializada.
+
+    from model import fake_ee
+    with fake_ee.installed(responses={"size": 3}) as session:
+        from model.ee_engine import analyze
+        analyze(...)
+    session.round_trips, session.request_bytes
+
+Sin ``catalog``, los valores que devuelve ``getInfo`` se resuelven con una
+pequeña evaluación escalar (``Number``, comparaciones, ``If``,
+``Dictionary``); el resto de nodos toma su valor de ``responses`` por
+nombre de método.
+
+Con ``catalog`` el grafo se ejecuta de verdad sobre arreglos NumPy
+pequeños (NaN = enmascarado), con el subconjunto de la API que usa el
+plugin: colecciones (``filter*``, ``select``, ``map``, ``median``,
+``sum``...), álgebra de imágenes, ``focal_mean``, ``reduceNeighborhood``,
+``Terrain``, ``reduceRegion``, ``Number``/``Dictionary``/``Date``::
+
+    catalog = {
+        "pixel_size": 10,
+        "COPERNICUS/S1_GRD": [{"properties": {...}, "bands": {"VH": arr}}, ...],
+        "JRC/GSW1_4/GlobalSurfaceWater": {"occurrence": arr},
+    }
+
+Todas las capas comparten una malla; geometrías y ``scale`` se ignoran.
+"""
+import contextlib
+import datetime
+import json
+import math
+import operator
+import sys
+import types
+
+_SCALAR_OPS = {
+    "add": operator.add, "subtract": operator.sub, "multiply": operator.mul,
+    "divide": lambda a, b: a / b if b else 0, "max": max, "min": min,
+    "gt": lambda a, b: int(a > b), "gte": lambda a, b: int(a >= b),
+    "lt": lambda a, b: int(a < b), "lte": lambda a, b: int(a <= b),
+    "eq": lambda a, b: int(a == b), "neq": lambda a, b: int(a != b),
+    "And": lambda a, b: int(bool(a) and bool(b)), "Or": lambda a, b: int(bool(a) or bool(b)),
+}
+
+
+class Session:
+    """Contadores de una instalación del sustituto."""
+
+    def __init__(self, responses=None, catalog=None):
+        self.responses = dict(responses or {})
+        self.catalog = catalog
+        self.nodes = 0
+        self.round_trips = 0
+        self.initializations = 0
+        self.requests = []       # (tipo, nodo) de cada petición bloqueante
+        self.request_bytes = []  # tamaño serializado de cada petición
+        self.graph_nodes = []    # nodos distintos enviados en cada petición
+
+    @property
+    def getinfo_calls(self):
+        return sum(kind == "getInfo" for kind, _ in self.requests)
+
+    def record(self, kind, node):
+        values, result = _encode_graph(node)
+        self.round_trips += 1
+        self.requests.append((kind, node))
+        self.request_bytes.append(len(_to_json(values, result).encode("utf-8")))
+        self.graph_nodes.append(len(values))
+
+    def evaluate(self, value):
+        if isinstance(value, Node):
+            return value._evaluate()
+        if isinstance(value, dict):
+            return {k: self.evaluate(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self.evaluate(v) for v in value]
+        return value
+
+    def compute(self, value):
+        """Valor evaluado (``FakeImage``, número...) sin contar petición."""
+        if self.catalog is None:
+            return self.evaluate(value)
+        return Interpreter(self).value(value)
+
+
+class Node:
+    """Nodo del grafo: cualquier método devuelve un nodo hijo."""
+
+    __slots__ = ("_session", "_name", "_args", "_kwargs", "_parent")
+
+    def __init__(self, session, name, args=(), kwargs=None, parent=None):
+        self._session = session
+        self._name = name
+        self._args = args
+        self._kwargs = kwargs or {}
+        self._parent = parent
+        session.nodes += 1
+
+    def __getattr__(self, attr):
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        if attr == "map":
+            return self._map
+
+        def method(*args, **kwargs):
+            return Node(self._session, attr, args, kwargs, parent=self)
+        return method
+
+    def _map(self, fn):
+        # Como el cliente real: ``fn`` se traza una vez sobre una variable
+        element = Node(self._session, "_element")
+        return Node(self._session, "map", (element, fn(element)), parent=self)
+
+    def __repr__(self):
+        return f"<fake ee {self._name}>"
+
+    def getInfo(self):
+        self._session.record("getInfo", self)
+        return self._evaluate()
+
+    def getMapId(self, vis_params=None):
+        self._session.record("getMapId", self)
+        url = "http://localhost/fake-ee/{z}/{x}/{y}"
+        return {"mapid": "fake", "token": "", "tile_fetcher": types.SimpleNamespace(url_format=url)}
+
+    def getDownloadURL(self, params=None):
+        self._session.record("getDownloadURL", self)
+        return "http://localhost/fake-ee/download"
+
+    def _evaluate(self):
+        session = self._session
+        if session.catalog is not None:
+            return _to_info(Interpreter(session).evaluate(self))
+        name = self._name
+        if name == "Dictionary":
+            return session.evaluate(self._args[0] if self._args else {})
+        if name == "Number":
+            return session.evaluate(self._args[0])
+        if name == "Algorithms.If":
+            cond, true_case, false_case = (list(self._args) + [None, None, None])[:3]
+            return session.evaluate(true_case if session.evaluate(cond) else false_case)
+        if name in _SCALAR_OPS and self._parent is not None:
+            left = session.evaluate(self._parent)
+            right = session.evaluate(self._args[0]) if self._args else None
+            if isinstance(left, (int, float)) and isinstance(right, (int, float)):
+                return _SCALAR_OPS[name](left, right)
+        if name == "Not" and self._parent is not None:
+            return int(not session.evaluate(self._parent))
+        return session.responses.get(name, 0)
+
+
+# ---------------- Serialización del grafo ----------------
+
+def _encode_graph(obj):
+    """({referencia: nodo codificado}, valor raíz); los nodos iguales se comparten."""
+    values, by_text, by_id = {}, {}, {}
+
+    def encode(value):
+        if isinstance(value, Node):
+            if id(value) in by_id:
+                return {"valueReference": by_id[id(value)]}
+            arguments = {}
+            if value._parent is not None:
+                arguments["input"] = encode(value._parent)
+            for i, arg in enumerate(value._args):
+                arguments[f"arg{i}"] = encode(arg)
+            for key, arg in value._kwargs.items():
+                arguments[key] = encode(arg)
+            encoded = {"functionInvocationValue": {"functionName": value._name,
+                                                   "arguments": arguments}}
+            text = json.dumps(encoded, sort_keys=True)
+            ref = by_text.get(text)
+            if ref is None:
+                ref = by_text[text] = str(len(values))
+                values[ref] = encoded
+            by_id[id(value)] = ref
+            return {"valueReference": ref}
+        if isinstance(value, dict):
+            return {"dictionaryValue": {"values": {str(k): encode(v) for k, v in value.items()}}}
+        if isinstance(value, (list, tuple)):
+            return {"arrayValue": {"values": [encode(v) for v in value]}}
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return {"constantValue": value}
+        return {"constantValue": repr(value)}
+
+    return values, encode(obj)
+
+
+def _to_json(values, result):
+    root = result.get("valueReference", result)
+    return json.dumps({"result": root, "values": values}, separators=(",", ":"))
+
+
+def serialize(obj):
+    """Petición de ``obj`` en JSON (formato similar al de ``ee.serializer``)."""
+    return _to_json(*_encode_graph(obj))
+
+
+def graph_size(obj):
+    """Número de nodos distintos del grafo de ``obj``."""
+    return len(_encode_graph(obj)[0])
+
+
+# ---------------- Ejecución sobre NumPy ----------------
+
+class FakeImage:
+    """Imagen evaluada: bandas {nombre: arreglo}, NaN = enmascarado."""
+
+    def __init__(self, bands, properties=None):
+        self.bands = dict(bands)
+        self.properties = dict(properties or {})
+
+    @property
+    def names(self):
+        return list(self.bands)
+
+    def array(self, band=None):
+        return self.bands[band if band is not None else self.names[0]]
+
+    def __repr__(self):
+        return f"<FakeImage {self.names}>"
+
+
+class FakeCollection(list):
+    """Colección evaluada: lista de ``FakeImage``."""
+
+
+class _Geometry:
+    """Geometría: la malla del catálogo es el AOI, así que no recorta."""
+
+
+class _Reducer:
+    def __init__(self, outputs):
+        self.outputs = list(outputs)
+
+
+class _Kernel:
+    def __init__(self, shape, radius, units="pixels"):
+        self.shape = shape
+        self.radius = radius
+        self.units = units
+
+
+def _as_array(value):
+    import numpy as np
+    return np.asarray(value, dtype=np.float64)
+
+
+def _constant(value, name="constant"):
+    return FakeImage({name: _as_array(value)})
+
+
+def _as_image(value):
+    if isinstance(value, FakeImage):
+        return value
+    if isinstance(value, (list, tuple)):
+        return FakeImage({f"constant_{i}" if i else "constant": _as_array(v)
+                          for i, v in enumerate(value)})
+    return _constant(value)
+
+
+def _names(value):
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v) for v in value]
+    return [str(value)]
+
+
+def _to_datetime(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+    if isinstance(value, (int, float)):
+        return datetime.datetime(1970, 1, 1) + datetime.timedelta(milliseconds=value)
+    return datetime.datetime.fromisoformat(str(value))
+
+
+def _to_info(value):
+    """Convierte un valor evaluado a lo que devolvería ``getInfo``."""
+    import numpy as np
+    if isinstance(value, FakeImage):
+        return {"type": "Image", "bands": [{"id": n} for n in value.names],
+                "properties": _to_info(value.properties)}
+    if isinstance(value, FakeCollection):
+        return {"type": "ImageCollection", "features": [_to_info(img) for img in value]}
+    if isinstance(value, datetime.datetime):
+        epoch = datetime.datetime(1970, 1, 1)
+        return {"type": "Date", "value": int((value - epoch).total_seconds() * 1000)}
+    if isinstance(value, dict):
+        return {k: _to_info(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_info(v) for v in value]
+    if isinstance(value, np.generic) or (isinstance(value, np.ndarray) and value.ndim == 0):
+        return value.item()
+    if isinstance(value, _Geometry):
+        return {"type": "Geometry"}
+    return value
+
+
+def _elementwise(op):
+    """Operación binaria: NaN si cualquiera de las entradas está enmascarada."""
+    import numpy as np
+
+    def fn(x, y):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out = np.asarray(op(x, y), dtype=np.float64)
+        return np.where(np.isnan(x) | np.isnan(y), np.nan, out)
+    return fn
+
+
+def _divide(x, y):
+    # Como ``ee.Image.divide``: la división por 0 da 0
+    import numpy as np
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(y == 0, np.where(np.isnan(x), np.nan, 0.0), x / y)
+
+
+def _bitwise_and(x, y):
+    import numpy as np
+    ints = np.nan_to_num(x).astype(np.int64) & np.nan_to_num(y).astype(np.int64)
+    return np.where(np.isnan(x) | np.isnan(y), np.nan, ints)
+
+
+def _image_binary_ops():
+    import numpy as np
+    return {
+        "add": np.add, "subtract": np.subtract, "multiply": np.multiply,
+        "divide": _divide, "pow": np.power, "max": np.maximum, "min": np.minimum,
+        "gt": _elementwise(np.greater), "gte": _elementwise(np.greater_equal),
+        "lt": _elementwise(np.less), "lte": _elementwise(np.less_equal),
+        "eq": _elementwise(np.equal), "neq": _elementwise(np.not_equal),
+        "And": _elementwise(lambda a, b: (a != 0) & (b != 0)),
+        "Or": _elementwise(lambda a, b: (a != 0) | (b != 0)),
+        "bitwiseAnd": _bitwise_and,
+    }
+
+
+def _binary(left, right, fn):
+    """Aplica ``fn`` banda a banda con las reglas de EE (una banda se difunde)."""
+    right = _as_image(right)
+    a, b = left.bands, right.bands
+    if len(b) == 1:
+        (rb,) = b.values()
+        return FakeImage({n: fn(arr, rb) for n, arr in a.items()}, left.properties)
+    if len(a) == 1:
+        (la,) = a.values()
+        return FakeImage({n: fn(la, arr) for n, arr in b.items()}, left.properties)
+    if len(a) != len(b):
+        raise ValueError(f"Número de bandas distinto: {len(a)} y {len(b)}.")
+    return FakeImage({n: fn(x, y) for (n, x), y in zip(a.items(), b.values())},
+                     left.properties)
+
+
+def _unary(image, fn):
+    return FakeImage({n: fn(arr) for n, arr in image.bands.items()}, image.properties)
+
+
+def _reduce_stack(collection, reducer):
+    """Reduce la colección banda a banda; los píxeles sin datos quedan en NaN."""
+    import warnings
+    import numpy as np
+    names = []
+    for img in collection:
+        names += [n for n in img.names if n not in names]
+    bands = {}
+    for name in names:
+        stack = np.stack(np.broadcast_arrays(*[img.bands[name] for img in collection
+                                               if name in img.bands]))
+        any_valid = ~np.isnan(stack).all(axis=0)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            out = np.asarray(reducer(stack, axis=0), dtype=np.float64)
+        bands[name] = np.where(any_valid, out, np.nan)
+    return FakeImage(bands)
+
+
+class Interpreter:
+    """Evalúa un grafo de ``Node`` con los datos de ``session.catalog``."""
+
+    def __init__(self, session):
+        self.session = session
+        self.catalog = session.catalog
+        self.pixel_size = float(self.catalog.get("pixel_size", 10))
+        self.memo = {}
+        self.bindings = {}
+        self._shape = None
+
+    @property
+    def shape(self):
+        """Malla común: ``catalog["shape"]`` o la del primer arreglo."""
+        import numpy as np
+        if self._shape is None:
+            shape = self.catalog.get("shape")
+            if shape is None:
+                for entry in self.catalog.values():
+                    images = entry if isinstance(entry, list) else [entry]
+                    for image in images:
+                        if isinstance(image, dict):
+                            bands = image.get("bands", image)
+                            arrays = [a for a in bands.values() if np.ndim(a) >= 2]
+                            if arrays:
+                                shape = np.shape(arrays[0])[-2:]
+                                break
+                    if shape is not None:
+                        break
+            self._shape = tuple(shape) if shape is not None else ()
+        return self._shape
+
+    def value(self, obj):
+        if isinstance(obj, Node):
+            return self.evaluate(obj)
+        if isinstance(obj, dict):
+            return {k: self.value(v) for k, v in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [self.value(v) for v in obj]
+        return obj
+
+    def evaluate(self, node):
+        key = (id(node), tuple(sorted((k, id(v)) for k, v in self.bindings.items())))
+        if key not in self.memo:
+            self.memo[key] = self._evaluate(node)
+        return self.memo[key]
+
+    def _evaluate(self, node):
+        name = node._name
+        if name == "_element":
+            return self.bindings[id(node)]
+        if name == "Algorithms.If":
+            cond, true_case, false_case = (list(node._args) + [None, None, None])[:3]
+            return self.value(true_case if self.value(cond) else false_case)
+        if node._parent is None:
+            handler = _STATICS.get(name)
+            if handler is None:
+                raise NotImplementedError(f"fake ee: '{name}' no está soportado.")
+            return handler(self, *self.value(list(node._args)), **self.value(node._kwargs))
+
+        parent = self.evaluate(node._parent)
+        if name == "map":
+            element, body = node._args
+            out = FakeCollection()
+            for image in parent:
+                previous = dict(self.bindings)
+                self.bindings[id(element)] = image
+                try:
+                    out.append(self.evaluate(body))
+                finally:
+                    self.bindings = previous
+            return out
+
+        args = self.value(list(node._args))
+        kwargs = self.value(node._kwargs)
+        if isinstance(parent, FakeImage):
+            return self._image_method(parent, name, args, kwargs)
+        if isinstance(parent, FakeCollection):
+            handler = _COLLECTION_METHODS.get(name)
+        elif isinstance(parent, dict):
+            handler = _DICTIONARY_METHODS.get(name)
+        elif isinstance(parent, datetime.datetime):
+            handler = _DATE_METHODS.get(name)
+        elif isinstance(parent, _Reducer):
+            handler = _REDUCER_METHODS.get(name)
+        elif isinstance(parent, _Geometry):
+            handler = _GEOMETRY_METHODS.get(name, _identity)
+        else:
+            handler = _number_method(name)
+        if handler is None:
+            raise NotImplementedError(
+                f"fake ee: '{name}' no está soportado sobre {type(parent).__name__}.")
+        return handler(self, parent, *args, **kwargs)
+
+    def _image_method(self, image, name, args, kwargs):
+        binary = _image_binary_ops().get(name)
+        if binary is not None:
+            return _binary(image, args[0] if args else kwargs.get("image2"), binary)
+        handler = _IMAGE_METHODS.get(name)
+        if handler is None:
+            raise NotImplementedError(f"fake ee: 'Image.{name}' no está soportado.")
+        return handler(self, image, *args, **kwargs)
+
+    def grid(self, arr):
+        """``arr`` difundido a la malla común (para reducciones)."""
+        import numpy as np
+        return np.broadcast_to(arr, self.shape) if self.shape else np.asarray(arr)
+
+    def radius_px(self, radius, units):
+        return radius / self.pixel_size if units == "meters" else radius
+
+    def asset(self, asset_id):
+        try:
+            return self.catalog[asset_id]
+        except KeyError:
+            raise KeyError(f"fake ee: el catálogo no tiene '{asset_id}'.") from None
+
+
+# ----- Constructores y métodos estáticos -----
+
+def _load_image(entry):
+    if isinstance(entry, FakeImage):
+        return entry
+    bands = entry.get("bands", entry) if isinstance(entry, dict) else {"b1": entry}
+    properties = entry.get("properties", {}) if isinstance(entry, dict) else {}
+    return FakeImage({n: _as_array(a) for n, a in bands.items() if n != "properties"},
+                     properties)
+
+
+def _image(self, value=None, *args, **kwargs):
+    import numpy as np
+    if value is None:
+        return _constant(np.nan)
+    if isinstance(value, FakeImage):
+        return value
+    if isinstance(value, str):
+        return _load_image(self.asset(value))
+    return _as_image(value)
+
+
+def _image_collection(self, value):
+    if isinstance(value, FakeCollection):
+        return value
+    if isinstance(value, str):
+        value = self.asset(value)
+    return FakeCollection(_load_image(entry) for entry in value)
+
+
+def _feature_collection(self, value, *args, **kwargs):
+    # En el catálogo, una colección de entidades es su máscara rasterizada
+    return _as_array(self.asset(value)) if isinstance(value, str) else _as_array(value)
+
+
+def _filter(test):
+    def build(self, name=None, value=None, leftField=None, rightValue=None):
+        name = leftField if name is None else name
+        value = rightValue if value is None else value
+
+        def predicate(image):
+            if name not in image.properties:
+                return False
+            return bool(test(image.properties[name], value))
+        return predicate
+    return build
+
+
+def _terrain(self, dem):
+    from .numpy_engine import slope_degrees
+    elevation = dem.array()
+    return FakeImage({"elevation": elevation,
+                      "slope": slope_degrees(elevation, self.pixel_size).astype("float64")})
+
+
+def _kernel(shape):
+    def build(self, radius=1, units="pixels", normalize=True, magnitude=1):
+        return _Kernel(shape, radius, units)
+    return build
+
+
+_STATICS = {
+    "Image": _image,
+    "Image.constant": lambda self, value: _as_image(value),
+    "Image.pixelArea": lambda self: _constant(self.pixel_size ** 2, "area"),
+    "ImageCollection": _image_collection,
+    "FeatureCollection": _feature_collection,
+    "Number": lambda self, value: value,
+    "String": lambda self, value: str(value),
+    "List": lambda self, value: list(value),
+    "Dictionary": lambda self, value=None: dict(value or {}),
+    "Date": lambda self, value, *args: _to_datetime(value),
+    "Filter.eq": _filter(operator.eq),
+    "Filter.neq": _filter(operator.ne),
+    "Filter.lt": _filter(lambda a, b: a < b),
+    "Filter.lte": _filter(lambda a, b: a <= b),
+    "Filter.gt": _filter(lambda a, b: a > b),
+    "Filter.gte": _filter(lambda a, b: a >= b),
+    "Filter.listContains": _filter(lambda a, b: b in a),
+    "Filter.And": lambda self, *filters: lambda image: all(f(image) for f in filters),
+    "Filter.Or": lambda self, *filters: lambda image: any(f(image) for f in filters),
+    "Reducer.mean": lambda self: _Reducer(["mean"]),
+    "Reducer.sum": lambda self: _Reducer(["sum"]),
+    "Reducer.stdDev": lambda self: _Reducer(["stdDev"]),
+    "Reducer.min": lambda self: _Reducer(["min"]),
+    "Reducer.max": lambda self: _Reducer(["max"]),
+    "Reducer.median": lambda self: _Reducer(["median"]),
+    "Reducer.count": lambda self: _Reducer(["count"]),
+    "Kernel.square": _kernel("square"),
+    "Kernel.circle": _kernel("circle"),
+    "Algorithms.Terrain": _terrain,
+    "Terrain.slope": lambda self, dem: FakeImage({"slope": _terrain(self, dem).array("slope")}),
+}
+for _name in ("Rectangle", "Point", "Polygon", "MultiPolygon", "BBox"):
+    _STATICS[f"Geometry.{_name}"] = lambda self, *args, **kwargs: _Geometry()
+_STATICS["Geometry"] = lambda self, *args, **kwargs: _Geometry()
+
+# La malla del catálogo es el AOI: su área es la de todos los píxeles
+_GEOMETRY_METHODS = {
+    "area": lambda self, geometry, *args, **kwargs: float(math.prod(self.shape)) * self.pixel_size ** 2,
+}
+
+
+# ----- Métodos de imagen -----
+
+def _select(self, image, *selectors, **kwargs):
+    names = []
+    for selector in selectors or [kwargs.get("bandSelectors")]:
+        names += _names(selector)
+    missing = [n for n in names if n not in image.bands]
+    if missing:
+        raise ValueError(f"Image.select: Pattern '{missing[0]}' did not match any bands.")
+    new_names = _names(kwargs.get("newNames")) or names
+    return FakeImage({new: image.bands[old] for old, new in zip(names, new_names)},
+                     image.properties)
+
+
+def _rename(self, image, *names):
+    names = [n for name in names for n in _names(name)]
+    return FakeImage(dict(zip(names, image.bands.values())), image.properties)
+
+
+def _update_mask(self, image, mask):
+    import numpy as np
+    return _binary(image, mask, lambda arr, m: np.where(np.isnan(m) | (m == 0), np.nan, arr))
+
+
+def _unmask(self, image, value=0, sameFootprint=True):
+    import numpy as np
+    return _unary(image, lambda arr: np.where(np.isnan(arr), float(value), arr))
+
+
+def _clamp(self, image, low, high):
+    import numpy as np
+    return _unary(image, lambda arr: np.clip(arr, low, high))
+
+
+def _blend(self, image, top):
+    import numpy as np
+    return _binary(image, top, lambda bottom, over: np.where(np.isnan(over), bottom, over))
+
+
+def _paint(self, image, featureCollection, color=0, width=None):
+    import numpy as np
+    return _unary(image, lambda arr: np.where(self.grid(featureCollection) > 0,
+                                              float(color), self.grid(arr)))
+
+
+def _normalized_difference(self, image, bandNames=None):
+    names = _names(bandNames) or image.names[:2]
+    a, b = image.bands[names[0]], image.bands[names[1]]
+    return FakeImage({"nd": _divide(a - b, a + b)}, image.properties)
+
+
+def _focal(self, arr, kernel_shape, radius):
+    from .focal import box_mean, circle_mean
+    import numpy as np
+    if np.ndim(arr) < 2:
+        return arr
+    if kernel_shape == "square":
+        return box_mean(arr, int(round(radius)))
+    return circle_mean(arr, radius)
+
+
+def _focal_mean(self, image, radius=1, kernelType="circle", units="pixels",
+                iterations=1, kernel=None):
+    if kernel is not None:
+        kernelType, radius, units = kernel.shape, kernel.radius, kernel.units
+    radius = self.radius_px(radius, units)
+    out = image
+    for _ in range(int(iterations)):
+        out = _unary(out, lambda arr: _focal(self, arr, kernelType, radius))
+    return out
+
+
+def _reduce_neighborhood(self, image, reducer, kernel, inputWeight="kernel",
+                         skipMasked=True, optimization=None):
+    if reducer.outputs != ["mean"]:
+        raise NotImplementedError("fake ee: reduceNeighborhood sólo admite Reducer.mean().")
+    radius = self.radius_px(kernel.radius, kernel.units)
+    return FakeImage({f"{n}_mean": _focal(self, arr, kernel.shape, radius)
+                      for n, arr in image.bands.items()}, image.properties)
+
+
+def _reduce_region(self, image, reducer, geometry=None, scale=None, crs=None,
+                   crsTransform=None, bestEffort=False, maxPixels=None, tileScale=1):
+    import numpy as np
+    functions = {
+        "mean": np.mean, "sum": np.sum, "min": np.min, "max": np.max,
+        "median": np.median, "stdDev": np.std, "count": np.size,
+    }
+    out = {}
+    for name, arr in image.bands.items():
+        arr = self.grid(arr)
+        values = arr[~np.isnan(arr)]
+        for output in reducer.outputs:
+            key = name if len(reducer.outputs) == 1 else f"{name}_{output}"
+            if values.size == 0 and output not in ("sum", "count"):
+                continue  # sin píxeles válidos EE no da valor
+            out[key] = float(functions[output](values)) if values.size else 0
+    return out
+
+
+def _image_mask(self, image):
+    import numpy as np
+    return _unary(image, lambda arr: (~np.isnan(arr)).astype(np.float64))
+
+
+def _image_not(self, image):
+    import numpy as np
+    return _unary(image, lambda arr: np.where(np.isnan(arr), np.nan, (arr == 0) * 1.0))
+
+
+def _identity(self, image, *args, **kwargs):
+    return image
+
+
+_IMAGE_METHODS = {
+    "select": _select,
+    "rename": _rename,
+    "updateMask": _update_mask,
+    "selfMask": lambda self, image: _update_mask(self, image, image),
+    "unmask": _unmask,
+    "mask": _image_mask,
+    "Not": _image_not,
+    "abs": lambda self, image: _unary(image, abs),
+    "clamp": _clamp,
+    "blend": _blend,
+    "paint": _paint,
+    "normalizedDifference": _normalized_difference,
+    "focal_mean": _focal_mean,
+    "focalMean": _focal_mean,
+    "reduceNeighborhood": _reduce_neighborhood,
+    "reduceRegion": _reduce_region,
+    "clip": _identity, "clipToCollection": _identity, "reproject": _identity,
+    "toByte": _identity, "byte": _identity, "toFloat": _identity, "float": _identity,
+    "toInt": _identity, "int": _identity, "set": _identity,
+    "bandNames": lambda self, image: image.names,
+    "get": lambda self, image, prop: image.properties.get(prop),
+}
+
+
+# ----- Métodos de colección, diccionario, fecha, reductor y número -----
+
+def _filter_date(self, collection, start, end=None):
+    start = _to_datetime(start)
+    end = _to_datetime(end) if end is not None else start + datetime.timedelta(milliseconds=1)
+
+    def inside(image):
+        stamp = image.properties.get("system:time_start")
+        return stamp is not None and start <= _to_datetime(stamp) < end
+    return FakeCollection(img for img in collection if inside(img))
+
+
+def _collection_reducer(fn):
+    def reduce(self, collection):
+        return _reduce_stack(collection, fn)
+    return reduce
+
+
+def _mosaic(self, collection):
+    import numpy as np
+    out = None
+    for image in collection:
+        out = image if out is None else _binary(
+            out, image, lambda bottom, top: np.where(np.isnan(top), bottom, top))
+    return out or FakeImage({})
+
+
+def _collection_methods():
+    import numpy as np
+    return {
+        "filter": lambda self, c, f: FakeCollection(img for img in c if f(img)),
+        "filterDate": _filter_date,
+        "filterBounds": lambda self, c, geometry: c,
+        "select": lambda self, c, *names, **kw: FakeCollection(
+            _select(self, img, *names, **kw) for img in c),
+        "size": lambda self, c: len(c),
+        "first": lambda self, c: c[0] if c else None,
+        "median": _collection_reducer(np.nanmedian),
+        "mean": _collection_reducer(np.nanmean),
+        "sum": _collection_reducer(np.nansum),
+        "min": _collection_reducer(np.nanmin),
+        "max": _collection_reducer(np.nanmax),
+        "mosaic": _mosaic,
+    }
+
+
+_COLLECTION_METHODS = _collection_methods()
+
+_DICTIONARY_METHODS = {
+    "contains": lambda self, d, key: key in d,
+    "get": lambda self, d, key, default=None: d.get(key, default),
+    "keys": lambda self, d: list(d),
+    "values": lambda self, d, keys=None: [d[k] for k in (keys or d)],
+    "set": lambda self, d, key, value: {**d, key: value},
+    "combine": lambda self, d, other, overwrite=True: {**d, **other} if overwrite else {**other, **d},
+}
+
+_DATE_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400, "week": 7 * 86400}
+
+_DATE_METHODS = {
+    "advance": lambda self, date, delta, unit, timeZone=None: date + datetime.timedelta(
+        seconds=delta * _DATE_UNITS[unit]),
+    "millis": lambda self, date: _to_info(date)["value"],
+    "format": lambda self, date, fmt=None, timeZone=None: date.isoformat(),
+}
+
+_REDUCER_METHODS = {
+    "combine": lambda self, reducer, reducer2, outputPrefix="", sharedInputs=False: _Reducer(
+        reducer.outputs + [outputPrefix + o for o in reducer2.outputs]),
+}
+
+
+def _number_method(name):
+    if name == "Not":
+        return lambda self, value: int(not value)
+    op = _SCALAR_OPS.get(name)
+    if op is None:
+        return None
+    return lambda self, left, right: op(left, right)
+
+
+# ---------------- Instalación ----------------
+
+class _Namespace:
+    """``ee.Image``, ``ee.Filter``...: invocable y con métodos estáticos."""
+
+    def __init__(self, session, name):
+        self._session = session
+        self._name = name
+
+    def __call__(self, *args, **kwargs):
+        return Node(self._session, self._name, args, kwargs)
+
+    def __getattr__(self, attr):
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+
+        def static(*args, **kwargs):
+            return Node(self._session, f"{self._name}.{attr}", args, kwargs)
+        return static
+
+
+NAMESPACES = (
+    "Algorithms", "Date", "Dictionary", "Feature", "FeatureCollection", "Filter",
+    "Geometry", "Image", "ImageCollection", "Kernel", "List", "Number", "Projection",
+    "Reducer", "String", "Terrain",
+)
+
+
+def make_module(session):
+    module = types.ModuleType("ee")
+    module.__fake__ = True
+    module.session = session
+    for name in NAMESPACES:
+        setattr(module, name, _Namespace(session, name))
+
+    def Initialize(*args, **kwargs):
+        session.initializations += 1
+    module.Initialize = Initialize
+    module.Authenticate = lambda *args, **kwargs: None
+    module.serializer = types.SimpleNamespace(toJSON=serialize)
+    return module
+
+
+_PACKAGE = __name__.split(".")[0]
+
+
+def _own_modules():
+    """Módulos ya importados del propio plugin (nunca los de terceros)."""
+    for name, module in list(sys.modules.items()):
+        if module is not None and (name == _PACKAGE or name.startswith(_PACKAGE + ".")):
+            yield module
+
+
+def _rebind(old, new):
+    """
+    Apunta a ``new`` la variable global ``ee`` de los módulos del plugin que
+    ya lo importaron. Devuelve {módulo: ``ee`` anterior} para deshacerlo.
+    """
+    rebound = {}
+    for module in _own_modules():
+        current = getattr(module, "__dict__", {}).get("ee")
+        if current is not None and current is not new and (
+                current is old or getattr(current, "__fake__", False)):
+            rebound[module] = current
+            module.ee = new
+    return rebound
+
+
+def install(responses=None, catalog=None):
+    """Sustituye ``ee`` en ``sys.modules`` y en los módulos que ya lo importaron."""
+    session = Session(responses, catalog)
+    fake = make_module(session)
+    session._fake = fake
+    session._previous = sys.modules.get("ee")
+    sys.modules["ee"] = fake
+    session._rebound = _rebind(session._previous, fake)
+    return session
+
+
+def uninstall(session):
+    """
+    Restaura ``sys.modules["ee"]`` y exactamente los módulos que ``install``
+    redirigió. Los que importaron ``ee`` durante la sesión pasan al ``ee``
+    real si lo había; si no, conservan el sustituto hasta la próxima
+    instalación.
+    """
+    previous, fake = session._previous, session._fake
+    if previous is None:
+        sys.modules.pop("ee", None)
+    else:
+        sys.modules["ee"] = previous
+    for module, value in session._rebound.items():
+        if module.__dict__.get("ee") is fake:
+            module.ee = value
+    if previous is not None:
+        for module in _own_modules():
+            if module not in session._rebound and module.__dict__.get("ee") is fake:
+                module.ee = previous
+    session._rebound = {}
+
+
+@contextlib.contextmanager
+def installed(responses=None, catalog=None):
+    session = install(responses, catalog)
+    try:
+        yield session
+    finally:
+        uninstall(session)
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Operaciones de vecindad locales sobre arreglos NumPy.
+
+Convención de máscaras: NaN = píxel enmascarado. Como ``focal_mean`` y
+``reduceNeighborhood`` de Earth Engine, la media ignora los vecinos
+enmascarados (y los de fuera del arreglo) y la salida queda enmascarada
+donde el píxel central lo está.
+"""
+import numpy as np
+
+
+def disk_offsets(radius_px):
+    """Desplazamientos (dy, dx) de un kernel circular de radio ``radius_px``."""
+    r = int(np.floor(radius_px))
+    offsets = []
+    for dy in range(-r, r + 1):
+        for dx in range(-r, r + 1):
+            if dy * dy + dx * dx <= radius_px * radius_px + 1e-9:
+                offsets.append((dy, dx))
+    return offsets
+
+
+def square_offsets(radius_px):
+    """Desplazamientos de un kernel cuadrado de lado ``2 * radius_px + 1``."""
+    r = int(radius_px)
+    return [(dy, dx) for dy in range(-r, r + 1) for dx in range(-r, r + 1)]
+
+
+def neighborhood_mean(img, offsets):
+    """
+    Media enmascarada de ``img`` sobre los desplazamientos ``offsets``.
+    Coste O(len(offsets)) por píxel.
+    """
+    img = np.asarray(img)
+    valid = ~np.isnan(img)
+    r = max((max(abs(dy), abs(dx)) for dy, dx in offsets), default=0)
+
+    data = np.pad(np.where(valid, img, 0).astype(np.float64), r)
+    count = np.pad(valid.astype(np.int32), r)
+    h, w = img.shape
+
+    acc = np.zeros((h, w), dtype=np.float64)
+    cnt = np.zeros((h, w), dtype=np.int32)
+    for dy, dx in offsets:
+        acc += data[r + dy:r + dy + h, r + dx:r + dx + w]
+        cnt += count[r + dy:r + dy + h, r + dx:r + dx + w]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = (acc / cnt).astype(img.dtype if img.dtype.kind == "f" else np.float32)
+    out[~valid] = np.nan
+    return out
+
+
+def _integral(a, radius, dtype):
+    """Tabla de áreas sumadas de ``a`` rellenado con ``radius`` ceros (más fila/columna 0)."""
+    h, w = a.shape
+    table = np.zeros((h + 2 * radius + 1, w + 2 * radius + 1), dtype=dtype)
+    inner = table[radius + 1:radius + 1 + h, radius + 1:radius + 1 + w]
+    inner[...] = a
+    np.cumsum(table, axis=0, out=table)
+    np.cumsum(table, axis=1, out=table)
+    return table
+
+
+def _window_sum(table, size, h, w):
+    """Suma de cada ventana ``size`` x ``size`` a partir de la tabla integral."""
+    out = table[size:size + h, size:size + w].copy()
+    out -= table[:h, size:size + w]
+    out -= table[size:size + h, :w]
+    out += table[:h, :w]
+    return out
+
+
+def box_mean(img, radius):
+    """
+    Media enmascarada sobre un kernel cuadrado de radio ``radius`` con tablas
+    integrales de suma y de recuento: coste constante por píxel sea cual sea
+    el radio. Equivale a ``neighborhood_mean(img, square_offsets(radius))``.
+    """
+    img = np.asarray(img)
+    valid = ~np.isnan(img)
+    h, w = img.shape
+    r = int(radius)
+    size = 2 * r + 1
+
+    count_dtype = np.int32 if valid.size < 2 ** 31 else np.int64
+    sums = _window_sum(_integral(np.where(valid, img, 0), r, np.float64), size, h, w)
+    counts = _window_sum(_integral(valid, r, count_dtype), size, h, w)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = (sums / counts).astype(img.dtype if img.dtype.kind == "f" else np.float32)
+    out[~valid] = np.nan
+    return out
+
+
+# Por encima de este radio (px) la convolución FFT supera a las filas de la
+# descomposición del disco (medido con benchmarks/bench_focal.py).
+FFT_RADIUS_THRESHOLD = 12
+
+
+def _disk_run_sum(a, radius, dtype):
+    """Suma sobre el disco como unión de tramos horizontales con sumas prefijas por fila."""
+    h, w = a.shape
+    r = int(np.floor(radius))
+    prefix = np.zeros((h + 2 * r, w + 2 * r + 1), dtype=dtype)
+    prefix[r:r + h, r + 1:r + 1 + w] = a
+    np.cumsum(prefix, axis=1, out=prefix)
+
+    out = np.zeros((h, w), dtype=dtype)
+    for dy in range(-r, r + 1):
+        half = int(np.floor(np.sqrt(max(radius * radius - dy * dy, 0) + 1e-9)))
+        rows = slice(r + dy, r + dy + h)
+        np.add(out, prefix[rows, r + half + 1:r + half + 1 + w], out=out)
+        np.subtract(out, prefix[rows, r - half:r - half + w], out=out)
+    return out
+
+
+def _fast_len(n):
+    """Menor longitud >= n factorizable en 2, 3 y 5 (rápida para la FFT)."""
+    while True:
+        m = n
+        for p in (2, 3, 5):
+            while m % p == 0:
+                m //= p
+        if m == 1:
+            return n
+        n += 1
+
+
+def _fft_sums(arrays, radius):
+    """Convolución FFT de cada arreglo con el disco de radio ``radius``."""
+    h, w = arrays[0].shape
+    r = int(np.floor(radius))
+    shape = (_fast_len(h + 2 * r), _fast_len(w + 2 * r))
+
+    kernel = np.zeros((2 * r + 1, 2 * r + 1))
+    for dy, dx in disk_offsets(radius):
+        kernel[dy + r, dx + r] = 1
+    kernel_f = np.fft.rfft2(kernel, shape)
+
+    return [np.fft.irfft2(np.fft.rfft2(a, shape) * kernel_f, shape)[r:r + h, r:r + w]
+            for a in arrays]
+
+
+def circle_mean(img, radius, method="auto"):
+    """
+    Media enmascarada sobre un disco de radio ``radius`` px (``focal_mean``
+    circular). ``method`` elige entre ``"runs"`` (sumas prefijas por filas,
+    O(r) por píxel) y ``"fft"`` (independiente del radio); ``"auto"`` usa
+    la FFT a partir de ``FFT_RADIUS_THRESHOLD``. Equivale a
+    ``neighborhood_mean(img, disk_offsets(radius))``.
+    """
+    img = np.asarray(img)
+    valid = ~np.isnan(img)
+    data = np.where(valid, img, 0).astype(np.float64)
+    if method == "auto":
+        method = "fft" if radius > FFT_RADIUS_THRESHOLD else "runs"
+
+    if method == "runs":
+        count_dtype = np.int32 if valid.size < 2 ** 31 else np.int64
+        sums = _disk_run_sum(data, radius, np.float64)
+        counts = _disk_run_sum(valid, radius, count_dtype)
+    elif method == "fft":
+        sums, counts = _fft_sums([data, valid.astype(np.float64)], radius)
+        counts = np.rint(counts)
+    else:
+        raise ValueError(f"Método de media focal desconocido: {method}")
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = (sums / counts).astype(img.dtype if img.dtype.kind == "f" else np.float32)
+    out[~valid] = np.nan
+    return out
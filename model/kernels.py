@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Funciones de pertenencia difusa locales (S, Z, trapezoidal y gaussiana).
+
+Cada función recorre la entrada por bloques de filas que caben en caché y
+evalúa la pertenencia con ufuncs ``out=`` sobre el propio bloque de salida,
+de modo que no se crean temporales del tamaño del AOI. La salida puede ser
+``float32`` (NaN = enmascarado) o ``uint8`` cuantizado: 0..``UINT8_SCALE``
+representa 0..1 y ``UINT8_NODATA`` marca los píxeles enmascarados.
+"""
+import numpy as np
+
+UINT8_SCALE = 254
+UINT8_NODATA = 255
+
+_CHUNK = 1 << 16  # elementos por bloque (~256 KiB en float32)
+
+
+def _ramp(x, lo, hi, out):
+    """(x - lo) / (hi - lo) saturado a [0, 1]; escalón en ``lo`` si hi <= lo."""
+    if hi <= lo:
+        nan = np.isnan(x)  # antes de escribir: ``out`` puede ser el propio ``x``
+        np.greater(x, lo, out=out, casting="unsafe")
+        np.copyto(out, np.nan, where=nan)
+        return out
+    np.subtract(x, lo, out=out, casting="unsafe")
+    np.multiply(out, 1.0 / (hi - lo), out=out, casting="unsafe")
+    return np.clip(out, 0, 1, out=out)
+
+
+def _evaluate(kernel, x, out, dtype, needs_tmp=False):
+    x = np.asarray(x)
+    if out is None:
+        out = np.empty(x.shape, dtype=dtype)
+    elif out.shape != x.shape:
+        raise ValueError(f"out tiene forma {out.shape}, se esperaba {x.shape}")
+
+    quantize = out.dtype == np.uint8
+    if not quantize and out.dtype.kind != "f":
+        raise TypeError(f"dtype de salida no soportado: {out.dtype}")
+
+    x2 = x.reshape(len(x), -1) if x.ndim >= 2 else x.reshape(1, -1)
+    o2 = out.reshape(x2.shape)
+    rows = max(1, _CHUNK // max(1, x2.shape[1]))
+    n = min(rows, x2.shape[0]) * x2.shape[1]
+    work_dtype = np.float32 if quantize else out.dtype
+    scratch = np.empty(n, dtype=work_dtype) if quantize else None
+    tmp = np.empty(n, dtype=work_dtype) if needs_tmp else None
+
+    for r in range(0, x2.shape[0], rows):
+        xs = x2[r:r + rows]
+        os_ = o2[r:r + rows]
+        buf = scratch[:xs.size].reshape(xs.shape) if quantize else os_
+        t = tmp[:xs.size].reshape(xs.shape) if needs_tmp else None
+        kernel(xs, buf, t)
+        if quantize:
+            np.multiply(buf, UINT8_SCALE, out=buf)
+            np.rint(buf, out=buf)
+            np.copyto(buf, UINT8_NODATA, where=np.isnan(buf))
+            np.copyto(os_, buf, casting="unsafe")
+    return out
+
+
+def fuzzy_s(x, s1, s2, out=None, dtype=np.float32):
+    """Pertenencia S (creciente): 0 si x < s1, 1 si x > s2, lineal entre ambos."""
+    return _evaluate(lambda xs, o, _: _ramp(xs, s1, s2, o), x, out, dtype)
+
+
+def fuzzy_z(x, z1, z2, out=None, dtype=np.float32):
+    """Pertenencia Z (decreciente): 1 si x < z1, 0 si x > z2, lineal entre ambos."""
+    def kernel(xs, o, _):
+        _ramp(xs, z1, z2, o)
+        np.subtract(1, o, out=o)
+    return _evaluate(kernel, x, out, dtype)
+
+
+def fuzzy_trapezoid(x, a, b, c, d, out=None, dtype=np.float32):
+    """Pertenencia trapezoidal: sube en [a, b], vale 1 en [b, c] y baja en [c, d]."""
+    if not a <= b <= c <= d:
+        raise ValueError("Se requiere a <= b <= c <= d.")
+
+    def kernel(xs, o, t):
+        # Primero la rampa c..d: ``o`` puede ser el propio ``xs`` (out=x)
+        _ramp(xs, c, d, t)
+        np.subtract(1, t, out=t)
+        _ramp(xs, a, b, o)
+        np.fmin(o, t, out=o)
+        np.copyto(o, np.nan, where=np.isnan(t))
+    return _evaluate(kernel, x, out, dtype, needs_tmp=True)
+
+
+def fuzzy_gaussian(x, mean, sigma, out=None, dtype=np.float32):
+    """Pertenencia gaussiana exp(-0.5 * ((x - mean) / sigma) ** 2)."""
+    if sigma <= 0:
+        raise ValueError("sigma debe ser positivo.")
+
+    def kernel(xs, o, _):
+        np.subtract(xs, mean, out=o, casting="unsafe")
+        np.multiply(o, 1.0 / sigma, out=o)
+        np.square(o, out=o)
+        np.multiply(o, -0.5, out=o)
+        np.exp(o, out=o)
+    return _evaluate(kernel, x, out, dtype)
+
+
+def quantize(x, out=None):
+    """Cuantiza una pertenencia ``float`` 0..1 a ``uint8`` (NaN -> ``UINT8_NODATA``)."""
+    return _evaluate(lambda xs, o, _: np.copyto(o, xs, casting="unsafe"), x, out, np.uint8)
+
+
+def dequantize(q, out=None):
+    """Convierte una pertenencia ``uint8`` a ``float32`` (NaN en ``UINT8_NODATA``)."""
+    q = np.asarray(q)
+    if out is None:
+        out = np.empty(q.shape, dtype=np.float32)
+    np.multiply(q, 1.0 / UINT8_SCALE, out=out, casting="unsafe")
+    np.copyto(out, np.nan, where=q == UINT8_NODATA)
+    return out
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Motor NumPy: ejecuta las etapas del modelo sobre arreglos locales float32.
+
+Todas las capas son 2D y comparten la malla del AOI; NaN representa un
+píxel enmascarado. ``FloodedBin`` se devuelve como ``uint8`` (1 = inundado,
+0 = equivalente al ``selfMask`` de Earth Engine).
+"""
+import warnings
+
+import numpy as np
+
+from .connectivity import apply_connectivity, connected_to_water, permanent_water
+from .engine import FloodEngine, FloodInputs
+from .focal import box_mean, circle_mean
+from .kernels import fuzzy_s, fuzzy_z
+
+
+def _composite(stack, reducer):
+    """Reduce una pila (n, H, W) ignorando NaN; las capas 2D pasan tal cual."""
+    arr = np.asarray(stack, dtype=np.float32)
+    if arr.ndim == 2:
+        return arr
+    any_valid = ~np.isnan(arr).all(axis=0)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        out = reducer(arr, axis=0).astype(np.float32, copy=False)
+    out[~any_valid] = np.nan
+    return out
+
+
+def make_inputs(before, after, ndbi, precip, occurrence, dem, extra_water=None):
+    """
+    Prepara ``FloodInputs`` a partir de arreglos locales. ``before``/``after``
+    pueden ser pilas (n, H, W) de escenas S1 (se usa la mediana) y ``precip``
+    una pila de días CHIRPS (se suma), igual que en Earth Engine.
+    """
+    return FloodInputs(
+        before=_composite(before, np.nanmedian),
+        after=_composite(after, np.nanmedian),
+        ndbi=np.asarray(ndbi, dtype=np.float32),
+        precip=_composite(precip, np.nansum),
+        occurrence=np.asarray(occurrence, dtype=np.float32),
+        dem=np.asarray(dem, dtype=np.float32),
+        extra_water=None if extra_water is None else np.asarray(extra_water, dtype=bool),
+    )
+
+
+def slope_degrees(dem, pixel_size):
+    """Pendiente en grados por diferencias centrales (como ``ee.Terrain``)."""
+    if min(dem.shape) < 2:
+        return np.zeros_like(dem, dtype=np.float32)
+    gy, gx = np.gradient(dem.astype(np.float32, copy=False), pixel_size)
+    return np.degrees(np.arctan(np.hypot(gx, gy))).astype(np.float32, copy=False)
+
+
+def occurrence_stats(occurrence):
+    """(n, suma, suma de cuadrados) de la ocurrencia normalizada > 0."""
+    occ_norm = occurrence[occurrence > 0].astype(np.float64) / 100
+    return occ_norm.size, float(occ_norm.sum()), float(np.square(occ_norm).sum())
+
+
+def ow_thresholds(count, total, total_sq, params):
+    """(z1, z2) de FM_OW a partir de las estadísticas acumuladas de GSW."""
+    mu = total / count if count else 0.0
+    sigma = float(np.sqrt(max(total_sq / count - mu * mu, 0.0))) if count else 0.0
+    if mu + sigma == 0:
+        z1_ow, z2_ow = params.z1_default, params.z2_default
+    else:
+        z1_ow, z2_ow = mu, mu + 2 * sigma
+    return min(max(z1_ow, 0.0), 1.0), min(max(z2_ow, 0.0), 1.0)
+
+
+class NumpyEngine(FloodEngine):
+    """
+    Backend local. ``pixel_size`` (m) convierte los radios en metros a
+    píxeles; ``pixel_area`` (m², escalar o arreglo) se usa para el área.
+    ``ow_thresholds`` fija (z1, z2) de FM_OW cuando las estadísticas de GSW
+    se han calculado sobre todo el AOI y el motor sólo ve una tesela.
+    """
+
+    name = "numpy"
+
+    def __init__(self, pixel_size=10.0, pixel_area=None, ow_thresholds=None):
+        self.pixel_size = float(pixel_size)
+        self.pixel_area = self.pixel_size ** 2 if pixel_area is None else pixel_area
+        self.ow_thresholds = ow_thresholds
+
+    def difference(self, before, after, params):
+        radius_px = params.smoothing_radius / self.pixel_size
+        before_f = circle_mean(before, radius_px)
+        after_f  = circle_mean(after, radius_px)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return after_f / before_f
+
+    def fm_fv(self, difference, ndbi, precip, params):
+        FM_FV = fuzzy_s(difference, params.s1_thr, params.s2_thr)
+        # Excluir urbano y exigir lluvia mínima (NaN en las máscaras => fuera)
+        keep = (ndbi <= params.ndbi_thr) & (precip > params.rain_thr)
+        FM_FV[~keep] = np.nan
+        return FM_FV
+
+    def fm_ow(self, occurrence, params, extra_water=None):
+        occ_norm = occurrence / np.float32(100)
+
+        # Umbrales adaptativos a partir de la ocurrencia > 0 del AOI
+        if self.ow_thresholds is not None:
+            z1_ow, z2_ow = self.ow_thresholds
+        else:
+            z1_ow, z2_ow = ow_thresholds(*occurrence_stats(occurrence), params)
+
+        FM_OW = fuzzy_z(occ_norm, z1_ow, z2_ow, out=occ_norm)
+        FM_OW[~(occurrence < params.occ_low)] = np.nan
+        if extra_water is not None:
+            FM_OW[extra_water] = 1
+        return FM_OW
+
+    def fm_hd(self, dem, params):
+        slope = slope_degrees(dem, self.pixel_size)
+        return fuzzy_z(slope, params.slope_z1, params.slope_z2, out=slope)
+
+    def fuse(self, fm_fv, fm_ow, fm_hd, params):
+        FM1 = np.maximum(fm_fv, fm_ow)
+        w1, w2 = params.w1, params.w2
+        with np.errstate(invalid="ignore"):
+            FM2 = ((FM1 * w1 + fm_hd * w2) / (w1 + w2)).astype(np.float32, copy=False)
+            FM2[~(FM1 > params.fm1_thr)] = np.nan
+        return FM1, FM2
+
+    def context(self, fm2, params):
+        mean_context = box_mean(fm2, params.context_radius)
+        D = fm2 - mean_context
+        FM3 = fuzzy_z(D, params.d_z1, params.d_z2)
+        np.multiply(FM3, fm2, out=FM3)
+        return D, FM3
+
+    def flooded(self, fm3, fm_fv):
+        flooded = fm3 * fm_fv
+        return flooded, (flooded > 0).astype(np.uint8)
+
+    def connectivity(self, flooded, flooded_bin, occurrence, params, extra_water=None):
+        permanent = permanent_water(occurrence, params, extra_water)
+        connected = connected_to_water(flooded_bin, permanent)
+        return apply_connectivity(flooded, flooded_bin, connected, params.isolated_weight)
+
+    def area_ha(self, flooded_bin):
+        flooded = flooded_bin.astype(bool, copy=False)
+        if np.ndim(self.pixel_area) == 0:
+            return float(np.count_nonzero(flooded)) * float(self.pixel_area) / 10000
+        return float(np.sum(self.pixel_area, where=flooded, dtype=np.float64)) / 10000
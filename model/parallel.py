@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Ejecución de teselas en un pool de procesos con entradas en memoria compartida.
+
+Las capas de entrada y las de salida viven en bloques
+``multiprocessing.shared_memory``; cada proceso las adjunta una sola vez al
+arrancar y a partir de ahí sólo recibe ventanas (``Window``) y devuelve el
+área de la tesela (y su ``TileScan`` si hay conectividad), sin serializar
+arreglos del tamaño de la tesela.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .tiling import LAYER_NAMES, TiledProcessor, iter_windows, source_ow_thresholds
+
+
+class SharedArray:
+    """
+    Arreglo NumPy sobre un bloque de memoria compartida. Al serializarse
+    sólo viaja (nombre, forma, dtype) y el receptor adjunta el mismo bloque.
+    """
+
+    def __init__(self, shape, dtype, name=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        nbytes = max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._owner = True
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def __reduce__(self):
+        return SharedArray, (self.shape, self.dtype.str, self.name)
+
+    def close(self):
+        self.array = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+class SharedArraySource:
+    """Fuente de teselas (ver ``model.tiling``) respaldada por ``SharedArray``."""
+
+    def __init__(self, shared, shape):
+        self.shared = shared  # {capa: SharedArray}
+        self.shape = tuple(shape)
+
+    @classmethod
+    def from_source(cls, source, block_size=2048):
+        """Copia una fuente cualquiera a memoria compartida por bloques."""
+        shared = {}
+        height, width = source.shape
+        try:
+            for name in LAYER_NAMES:
+                probe = source.read(name, slice(0, 1), slice(0, 1))
+                if probe is None:
+                    continue
+                probe = np.asarray(probe)
+                dst = SharedArray(probe.shape[:-2] + (height, width), probe.dtype)
+                shared[name] = dst
+                for win in iter_windows(source.shape, block_size):
+                    dst.array[..., win.rows, win.cols] = source.read(name, win.rows, win.cols)
+        except BaseException:
+            for arr in shared.values():
+                arr.close()
+            raise
+        return cls(shared, source.shape)
+
+    def read(self, name, rows, cols):
+        arr = self.shared.get(name)
+        if arr is None:
+            return None
+        return arr.array[..., rows, cols]
+
+    def close(self):
+        for arr in self.shared.values():
+            arr.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Estado de cada proceso del pool (se rellena en _init_worker)
+_WORKER = {}
+
+
+def _init_worker(processor, source, outputs, thresholds, connect):
+    if isinstance(processor.pixel_area, SharedArray):
+        processor.pixel_area = processor.pixel_area.array
+    _WORKER.update(processor=processor, source=source,
+                   outputs={name: arr.array for name, arr in outputs.items()},
+                   thresholds=thresholds, connect=connect)
+
+
+def _run_window(win):
+    processor, source = _WORKER["processor"], _WORKER["source"]
+    layers, area_ha = processor.process_window(source, win, _WORKER["thresholds"])
+    for name, dst in _WORKER["outputs"].items():
+        dst[win.rows, win.cols] = layers[name]
+    scan = None
+    if _WORKER["connect"]:
+        scan = processor.scan_window(source, win, layers["FloodedBin"])
+    return win, area_ha, scan
+
+
+class ParallelTiledProcessor(TiledProcessor):
+    """
+    ``TiledProcessor`` repartido entre ``workers`` procesos (por defecto uno
+    por núcleo). Los resultados por tesela son idénticos a los secuenciales.
+    """
+
+    def __init__(self, pixel_size=10.0, pixel_area=None, params=None,
+                 tile_size=1024, workers=None):
+        super().__init__(pixel_size, pixel_area, params, tile_size)
+        self.workers = workers or os.cpu_count() or 1
+
+    def run(self, source, out=None, progress=None):
+        out = out or {}
+        connect = self.needs_connectivity(out)
+        owned = []
+        try:
+            if not isinstance(source, SharedArraySource):
+                source = SharedArraySource.from_source(source)
+                owned.append(source)
+            thresholds = source_ow_thresholds(source, self.params)
+
+            outputs = {}
+            for name, dst in out.items():
+                outputs[name] = SharedArray(source.shape, np.asarray(dst[:1, :1]).dtype)
+                owned.append(outputs[name])
+
+            processor = TiledProcessor(self.pixel_size, self.pixel_area,
+                                       self.params, self.tile_size)
+            if np.ndim(self.pixel_area) != 0:
+                processor.pixel_area = SharedArray(np.shape(self.pixel_area), np.float64)
+                processor.pixel_area.array[...] = self.pixel_area
+                owned.append(processor.pixel_area)
+
+            windows = self.windows(source.shape)
+            area_ha, scans = 0.0, {}
+            with ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker,
+                initargs=(processor, source, outputs, thresholds, connect),
+            ) as pool:
+                futures = [pool.submit(_run_window, win) for win in windows]
+                for done, future in enumerate(as_completed(futures), 1):
+                    win, tile_area, scan = future.result()
+                    area_ha += tile_area
+                    if scan is not None:
+                        scans[win] = scan
+                    if progress is not None:
+                        progress(done, len(windows))
+
+            for name, dst in out.items():
+                dst[...] = outputs[name].array
+            if connect:
+                area_ha = self.connect(source, out, scans, area_ha)
+            return area_ha
+        finally:
+            for item in owned:
+                item.close()
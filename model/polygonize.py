@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Polígonos de las zonas inundadas a partir de ``FloodedBin``.
+
+ 1) Las componentes conexas se etiquetan por teselas en paralelo y se
+    cosen en las costuras (``model.components.label_tiled``), así cada
+    zona tiene una etiqueta única en todo el AOI.
+ 2) Cada tesela de etiquetas se vectoriza con ``gdal.Polygonize`` en
+    paralelo; los trozos de una misma etiqueta en teselas vecinas se unen
+    en un único polígono.
+ 3) Los polígonos se simplifican (por defecto, tolerancia de un píxel) y
+    se escriben en un GeoPackage con índice espacial, con la etiqueta, el
+    número de píxeles y el área (ha) de cada zona.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .components import label_tiled
+from .tiling import iter_windows
+
+try:
+    from osgeo import gdal, ogr, osr
+except ImportError:  # GDAL viene con QGIS; fuera de QGIS es opcional
+    gdal = ogr = osr = None
+
+EQUAL_AREA_EPSG = 6933  # WGS 84 / NSIDC EASE-Grid 2.0 Global, para áreas en CRS geográficos
+
+
+def require_ogr():
+    if ogr is None:
+        raise RuntimeError("Se necesita GDAL/OGR (osgeo) para escribir polígonos.")
+
+
+def _tile_pieces(labels, win, geotransform, connectivity):
+    """[(etiqueta, geometría WKB)] de la tesela ``win`` de ``labels``."""
+    block = np.asarray(labels[win.rows, win.cols], dtype=np.int32)
+    if not block.any():
+        return []
+    gt = geotransform
+    mem = gdal.GetDriverByName("MEM").Create("", win.width, win.height, 1, gdal.GDT_Int32)
+    mem.SetGeoTransform((gt[0] + win.col * gt[1] + win.row * gt[2], gt[1], gt[2],
+                         gt[3] + win.col * gt[4] + win.row * gt[5], gt[4], gt[5]))
+    band = mem.GetRasterBand(1)
+    band.WriteArray(block)
+
+    layer = ogr.GetDriverByName("Memory").CreateDataSource("").CreateLayer("pieces")
+    layer.CreateField(ogr.FieldDefn("label", ogr.OFTInteger))
+    options = ["8CONNECTED=8"] if connectivity == 8 else []
+    # La propia banda hace de máscara: la etiqueta 0 (fondo) no se vectoriza
+    gdal.Polygonize(band, band, layer, 0, options)
+    return [(feature.GetField(0), feature.GetGeometryRef().ExportToWkb()) for feature in layer]
+
+
+def _merge(wkbs):
+    if len(wkbs) == 1:
+        return ogr.CreateGeometryFromWkb(wkbs[0])
+    multi = ogr.Geometry(ogr.wkbMultiPolygon)
+    for wkb in wkbs:
+        geom = ogr.CreateGeometryFromWkb(wkb)
+        if geom.GetGeometryType() == ogr.wkbMultiPolygon:
+            for i in range(geom.GetGeometryCount()):
+                multi.AddGeometry(geom.GetGeometryRef(i))
+        else:
+            multi.AddGeometry(geom)
+    return multi.UnionCascaded()
+
+
+def polygonize(flooded, path, geotransform, projection=None, layer_name="FloodedBin",
+               tile_size=2048, connectivity=8, simplify=None, min_pixels=1, workers=None):
+    """
+    Vectoriza ``flooded`` (H, W; ``> 0`` = inundado, admite ``np.memmap``)
+    en el GeoPackage ``path``. ``simplify`` es la tolerancia en unidades
+    del CRS (``None`` => tamaño de píxel, 0 => sin simplificar); las zonas
+    de menos de ``min_pixels`` píxeles se descartan. Devuelve el número de
+    polígonos escritos.
+    """
+    require_ogr()
+    workers = workers or os.cpu_count() or 1
+
+    # 1) Etiquetas globales
+    labels, n = label_tiled(flooded, tile_size, connectivity, workers)
+    pixels = np.zeros(n + 1, dtype=np.int64)
+    windows = list(iter_windows(labels.shape, tile_size))
+    for win in windows:
+        pixels += np.bincount(labels[win.rows, win.cols].ravel(), minlength=n + 1)
+
+    # 2) Vectorización por teselas y unión de los trozos de cada etiqueta
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        tiles = pool.map(lambda win: _tile_pieces(labels, win, geotransform, connectivity),
+                         windows)
+        pieces = {}
+        for tile in tiles:
+            for lab, wkb in tile:
+                pieces.setdefault(lab, []).append(wkb)
+
+    # 3) GeoPackage
+    srs = None
+    if projection:
+        srs = osr.SpatialReference()
+        srs.ImportFromWkt(projection)
+        srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    to_area = None
+    if srs is not None and srs.IsGeographic():
+        equal_area = osr.SpatialReference()
+        equal_area.ImportFromEPSG(EQUAL_AREA_EPSG)
+        equal_area.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        to_area = osr.CoordinateTransformation(srs, equal_area)
+    pixel_area = abs(geotransform[1] * geotransform[5] - geotransform[2] * geotransform[4])
+    tolerance = abs(geotransform[1]) if simplify is None else simplify
+
+    driver = ogr.GetDriverByName("GPKG")
+    if os.path.exists(path):
+        driver.DeleteDataSource(path)
+    dataset = driver.CreateDataSource(path)
+    if dataset is None:
+        raise RuntimeError(f"No se pudo crear el GeoPackage: {path}")
+    layer = dataset.CreateLayer(layer_name, srs, ogr.wkbMultiPolygon,
+                                options=["SPATIAL_INDEX=YES", "FID=fid"])
+    for name, kind in (("label", ogr.OFTInteger64), ("pixels", ogr.OFTInteger64),
+                       ("area_ha", ogr.OFTReal)):
+        layer.CreateField(ogr.FieldDefn(name, kind))
+
+    written = 0
+    layer.StartTransaction()
+    for lab in sorted(pieces):
+        if pixels[lab] < min_pixels:
+            continue
+        geom = _merge(pieces[lab])
+        if tolerance:
+            geom = geom.SimplifyPreserveTopology(tolerance)
+        if geom is None or geom.IsEmpty():
+            continue
+        geom = ogr.ForceToMultiPolygon(geom)
+        if to_area is not None:
+            projected = geom.Clone()
+            projected.Transform(to_area)
+            area_ha = projected.GetArea() / 10000
+        else:
+            area_ha = pixels[lab] * pixel_area / 10000
+        feature = ogr.Feature(layer.GetLayerDefn())
+        feature.SetField("label", int(lab))
+        feature.SetField("pixels", int(pixels[lab]))
+        feature.SetField("area_ha", float(area_ha))
+        feature.SetGeometry(geom)
+        layer.CreateFeature(feature)
+        written += 1
+    layer.CommitTransaction()
+    dataset = None
+    return written
+
+
+def polygonize_raster(src, path, **kwargs):
+    """``polygonize`` de la banda 1 de un raster GDAL (p. ej. una máscara descargada)."""
+    require_ogr()
+    dataset = gdal.Open(src, gdal.GA_ReadOnly)
+    if dataset is None:
+        raise RuntimeError(f"No se pudo abrir el raster: {src}")
+    flooded = dataset.GetRasterBand(1).ReadAsArray()
+    geotransform, projection = dataset.GetGeoTransform(), dataset.GetProjection()
+    dataset = None
+    return polygonize(flooded, path, geotransform, projection, **kwargs)
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Lectura por ventanas de los espejos locales de las entradas del modelo
+(S1 GRD, S2 SR, CHIRPS diario, JRC GSW y HydroSHEDS DEM).
+
+Los ``.npy`` se abren como ``np.memmap`` y el resto con GDAL, leyendo sólo
+la ventana pedida, de modo que la memoria de pico sigue al tamaño de la
+tesela y no al de la escena. Todas las capas deben compartir la malla del
+AOI (mismo tamaño y georreferenciación). Los valores *nodata* se devuelven
+como NaN.
+"""
+import os
+
+import numpy as np
+
+try:
+    from osgeo import gdal
+except ImportError:  # GDAL viene con QGIS; fuera de QGIS es opcional
+    gdal = None
+
+
+class NpyRaster:
+    """Raster ``.npy`` (H, W) o pila (n, H, W) mapeado en memoria."""
+
+    def __init__(self, path, nodata=None, geotransform=None, projection=None):
+        self.path = path
+        self.data = np.load(path, mmap_mode="r")
+        self.nodata = nodata
+        self.geotransform = geotransform
+        self.projection = projection
+
+    @property
+    def shape(self):
+        return self.data.shape[-2:]
+
+    def read(self, rows, cols):
+        arr = np.array(self.data[..., rows, cols], dtype=np.float32)
+        if self.nodata is not None:
+            arr[arr == self.nodata] = np.nan
+        return arr
+
+
+class GdalRaster:
+    """Banda de un raster GDAL (GeoTIFF, VRT, ...) leída por ventanas."""
+
+    def __init__(self, path, band=1):
+        if gdal is None:
+            raise RuntimeError("Se necesita GDAL (osgeo) para leer rasters que no son .npy.")
+        self.path = path
+        self.dataset = gdal.Open(path, gdal.GA_ReadOnly)
+        if self.dataset is None:
+            raise RuntimeError(f"No se pudo abrir el raster: {path}")
+        self.band = self.dataset.GetRasterBand(band)
+        self.nodata = self.band.GetNoDataValue()
+        self.geotransform = self.dataset.GetGeoTransform()
+        self.projection = self.dataset.GetProjection()
+
+    @property
+    def shape(self):
+        return self.dataset.RasterYSize, self.dataset.RasterXSize
+
+    def read(self, rows, cols):
+        # Mismas ventanas que un arreglo: extremos abiertos o negativos
+        height, width = self.shape
+        r0, r1, _ = rows.indices(height)
+        c0, c1, _ = cols.indices(width)
+        arr = self.band.ReadAsArray(
+            c0, r0, max(c1 - c0, 0), max(r1 - r0, 0)
+        ).astype(np.float32, copy=False)
+        if self.nodata is not None:
+            arr[arr == self.nodata] = np.nan
+        return arr
+
+
+def open_raster(path, **kwargs):
+    """Abre ``path`` con el lector adecuado según su extensión."""
+    if os.path.splitext(path)[1].lower() == ".npy":
+        return NpyRaster(path, **kwargs)
+    return GdalRaster(path, **kwargs)
+
+
+class RasterStack:
+    """Varias escenas de la misma malla leídas como pila (n, h, w)."""
+
+    def __init__(self, rasters):
+        if not rasters:
+            raise ValueError("La pila de rasters está vacía.")
+        self.rasters = [open_raster(r) if isinstance(r, str) else r for r in rasters]
+        shapes = {tuple(r.shape) for r in self.rasters}
+        if len(shapes) != 1:
+            raise ValueError(f"Las escenas no comparten malla: {sorted(shapes)}")
+
+    @property
+    def shape(self):
+        return self.rasters[0].shape
+
+    @property
+    def geotransform(self):
+        return self.rasters[0].geotransform
+
+    @property
+    def projection(self):
+        return self.rasters[0].projection
+
+    def read(self, rows, cols):
+        return np.stack([r.read(rows, cols) for r in self.rasters])
+
+
+class NDBIRaster:
+    """
+    NDBI = (B11 - B8) / (B11 + B8) calculado por ventana a partir de la
+    mediana de escenas S2 SR. ``qa60`` (opcional, una por escena) aplica la
+    misma máscara de nubes y cirros que ``mask_s2_clouds``.
+    """
+
+    def __init__(self, b11, b8, qa60=None):
+        self.b11 = RasterStack(b11 if isinstance(b11, (list, tuple)) else [b11])
+        self.b8 = RasterStack(b8 if isinstance(b8, (list, tuple)) else [b8])
+        self.qa60 = None
+        if qa60 is not None:
+            self.qa60 = RasterStack(qa60 if isinstance(qa60, (list, tuple)) else [qa60])
+
+    @property
+    def shape(self):
+        return self.b11.shape
+
+    @property
+    def geotransform(self):
+        return self.b11.geotransform
+
+    @property
+    def projection(self):
+        return self.b11.projection
+
+    def read(self, rows, cols):
+        b11 = self.b11.read(rows, cols)
+        b8 = self.b8.read(rows, cols)
+        if self.qa60 is not None:
+            qa = np.nan_to_num(self.qa60.read(rows, cols)).astype(np.uint16)
+            cloudy = (qa & (1 << 10)) | (qa & (1 << 11))
+            b11[cloudy != 0] = np.nan
+            b8[cloudy != 0] = np.nan
+        with np.errstate(invalid="ignore", divide="ignore"):
+            b11 = np.nanmedian(b11, axis=0) if len(b11) > 1 else b11[0]
+            b8 = np.nanmedian(b8, axis=0) if len(b8) > 1 else b8[0]
+            return ((b11 - b8) / (b11 + b8)).astype(np.float32, copy=False)
+
+
+class RasterSource:
+    """
+    Fuente de teselas (ver ``model.tiling``) sobre rasters locales.
+
+    ``before``, ``after`` y ``precip`` aceptan una ruta o una lista de rutas
+    (escenas S1 / días CHIRPS, se leen como pila); ``ndbi`` puede ser una
+    ruta a un NDBI ya calculado o un ``NDBIRaster``.
+    """
+
+    def __init__(self, before, after, ndbi, precip, occurrence, dem, extra_water=None):
+        def _layer(value):
+            if value is None or hasattr(value, "read"):
+                return value
+            if isinstance(value, (list, tuple)):
+                return RasterStack(list(value))
+            return open_raster(value)
+
+        self.layers = {
+            "before": _layer(before), "after": _layer(after), "ndbi": _layer(ndbi),
+            "precip": _layer(precip), "occurrence": _layer(occurrence),
+            "dem": _layer(dem), "extra_water": _layer(extra_water),
+        }
+        shapes = {name: tuple(layer.shape) for name, layer in self.layers.items() if layer is not None}
+        if len(set(shapes.values())) != 1:
+            raise ValueError(f"Las capas no comparten malla: {shapes}")
+        self.shape = shapes["dem"]
+
+    @property
+    def geotransform(self):
+        return self.layers["dem"].geotransform
+
+    @property
+    def projection(self):
+        return self.layers["dem"].projection
+
+    @property
+    def pixel_size(self):
+        """Tamaño de píxel según la georreferenciación del DEM (m si la malla es proyectada)."""
+        gt = self.geotransform
+        return None if gt is None else abs(gt[1])
+
+    def read(self, name, rows, cols):
+        layer = self.layers.get(name)
+        if layer is None:
+            return None
+        arr = layer.read(rows, cols)
+        if name == "extra_water":
+            return np.nan_to_num(arr) > 0
+        return arr
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Sesión de Earth Engine compartida por todas las ejecuciones del plugin.
+
+``ee.Initialize`` se llama una sola vez, de forma perezosa y protegida
+por un cerrojo (las tareas pueden arrancar en paralelo). Si una petición
+falla por credenciales caducadas, la sesión se reinicializa y la
+operación se reintenta una vez. ``set_session`` permite sustituirla por
+otra (p. ej. sobre ``model.fake_ee``) en pruebas.
+"""
+import threading
+import time
+
+DEFAULT_PROJECT = 'tidop-424613'
+
+# Fragmentos de los mensajes de error de autenticación de EE/Google
+_AUTH_ERRORS = ("401", "unauthenticated", "invalid_grant", "credentials",
+                "reauthenticat", "token has expired", "access token")
+
+
+def is_auth_error(exc):
+    """``True`` si ``exc`` parece un fallo de credenciales caducadas."""
+    message = str(exc).lower()
+    return any(fragment in message for fragment in _AUTH_ERRORS)
+
+
+class EarthEngineSession:
+    """Inicialización única y reutilizable de Earth Engine."""
+
+    def __init__(self, project=DEFAULT_PROJECT, initialize=None):
+        self.project = project
+        self._initialize = initialize
+        self._lock = threading.Lock()
+        self.initialized_at = None
+        self.initializations = 0
+
+    @property
+    def initialized(self):
+        return self.initialized_at is not None
+
+    def _do_initialize(self):
+        if self._initialize is not None:
+            self._initialize()
+            return
+        import ee
+        ee.Initialize(project=self.project)
+
+    def ensure(self):
+        """Inicializa si hace falta. Lanza ``RuntimeError`` si no es posible."""
+        if self.initialized:
+            return
+        with self._lock:
+            if self.initialized:
+                return
+            try:
+                self._do_initialize()
+            except Exception as ee_err:
+                raise RuntimeError(f"No se pudo inicializar Earth Engine:\n{ee_err}")
+            self.initialized_at = time.time()
+            self.initializations += 1
+
+    def invalidate(self):
+        """Fuerza una nueva inicialización en el próximo uso."""
+        with self._lock:
+            self.initialized_at = None
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Ejecuta ``fn`` con la sesión inicializada; ante un error de
+        credenciales reinicializa y reintenta una vez.
+        """
+        self.ensure()
+        try:
+            return fn(*args, **kwargs)
+        except Exception as exc:
+            if not is_auth_error(exc):
+                raise
+        self.invalidate()
+        self.ensure()
+        return fn(*args, **kwargs)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Sesión compartida del proceso (se crea al primer uso)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = EarthEngineSession()
+        return _session
+
+
+def set_session(session):
+    """Sustituye la sesión compartida y devuelve la anterior."""
+    global _session
+    with _session_lock:
+        previous, _session = _session, session
+        return previous
@@ -0,0 +1,432 @@
+# -*- coding: utf-8 -*-
+"""
+Caché local de teselas y servidor XYZ en localhost.
+
+Las capas publicadas con ``getMapId`` apuntan a Earth Engine: cada
+desplazamiento o zoom vuelve a pedir teselas y la URL caduca con el token.
+Aquí cada resultado se guarda en un fichero MBTiles (SQLite) y QGIS pide
+las teselas a un servidor HTTP local:
+
+    server = TileServer(directorio)
+    url = server.publish(clave, xyz_url_de_ee, bbox)   # URL local para la capa
+    server.prefetch(clave)                             # precarga del AOI
+
+Una tesela ausente se descarga de Earth Engine (si la URL sigue siendo
+válida), se guarda y se sirve; las ya guardadas siguen disponibles aunque
+el token haya caducado.
+
+El servidor escucha en un puerto fijo (``DEFAULT_PORT`` o el configurado),
+así que las capas guardadas en un proyecto siguen funcionando en otra
+sesión: cualquier MBTiles del directorio se sirve aunque no se haya
+publicado en ésta. Si el puerto está ocupado, ``TileServer`` falla
+(``PortInUseError``) salvo con ``fallback``: entonces prueba los
+siguientes y ``moved`` lo indica, para que quien lo arranca avise y guarde
+el puerto nuevo (las capas publicadas llevan el puerto en su URL).
+``local_ports`` da los puertos del servidor que usan unas capas.
+El directorio se limita a ``max_bytes`` expulsando los MBTiles usados hace
+más tiempo.
+"""
+import math
+import os
+import re
+import sqlite3
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MAX_PREFETCH_TILES = 2000   # por capa
+MAX_PREFETCH_ZOOM  = 16
+FETCH_TIMEOUT      = 30     # s
+DEFAULT_PORT       = 47615
+PORT_ATTEMPTS      = 10     # con ``fallback``: el puerto pedido, +1, ..., +9
+MAX_CACHE_BYTES    = 1024 * 1024 * 1024
+
+
+# ---------------- Malla XYZ ----------------
+
+def lonlat_to_tile(lon, lat, zoom):
+    """Tesela XYZ (x, y) que contiene (lon, lat) en el nivel ``zoom``."""
+    lat = max(min(lat, 85.05112878), -85.05112878)
+    n = 2 ** zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_range(bbox, zoom):
+    """(x0, x1, y0, y1) inclusivos de las teselas que cubren ``bbox`` (EPSG:4326)."""
+    xmin, ymin, xmax, ymax = bbox
+    x0, y0 = lonlat_to_tile(xmin, ymax, zoom)
+    x1, y1 = lonlat_to_tile(xmax, ymin, zoom)
+    return x0, x1, y0, y1
+
+
+def count_tiles(bbox, zoom):
+    x0, x1, y0, y1 = tile_range(bbox, zoom)
+    return (x1 - x0 + 1) * (y1 - y0 + 1)
+
+
+def iter_tiles(bbox, zooms):
+    for zoom in zooms:
+        x0, x1, y0, y1 = tile_range(bbox, zoom)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield zoom, x, y
+
+
+def prefetch_zooms(bbox, max_tiles=MAX_PREFETCH_TILES, max_zoom=MAX_PREFETCH_ZOOM):
+    """
+    Niveles útiles para precargar: desde el primero en que el AOI ocupa
+    más de una tesela hasta donde el total acumulado cabe en ``max_tiles``.
+    """
+    zooms, total = [], 0
+    for zoom in range(max_zoom + 1):
+        n = count_tiles(bbox, zoom)
+        if n == 1 and zoom < max_zoom:
+            zooms = [zoom]
+            total = 1
+            continue
+        if total + n > max_tiles:
+            break
+        zooms.append(zoom)
+        total += n
+    return zooms
+
+
+# ---------------- MBTiles ----------------
+
+class MBTilesCache:
+    """Fichero MBTiles (esquema TMS) seguro entre hilos."""
+
+    def __init__(self, path, name="FloodedBin", bounds=None):
+        self.path = path
+        self.closed = False
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, "
+                "tile_row INTEGER, tile_data BLOB, "
+                "PRIMARY KEY (zoom_level, tile_column, tile_row))")
+            meta = {"name": name, "format": "png", "type": "overlay", "version": "1"}
+            if bounds is not None:
+                meta["bounds"] = ",".join(f"{v:.6f}" for v in bounds)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO metadata (name, value) VALUES (?, ?)", meta.items())
+
+    @staticmethod
+    def _tms_row(z, y):
+        return (2 ** z - 1) - y
+
+    def get(self, z, x, y):
+        with self._lock:
+            if self.closed:
+                return None
+            row = self._conn.execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                (z, x, self._tms_row(z, y))).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def has(self, z, x, y):
+        with self._lock:
+            if self.closed:
+                return False
+            return self._conn.execute(
+                "SELECT 1 FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                (z, x, self._tms_row(z, y))).fetchone() is not None
+
+    def put(self, z, x, y, data):
+        with self._lock:
+            if self.closed:
+                return
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data) "
+                    "VALUES (?, ?, ?, ?)", (z, x, self._tms_row(z, y), sqlite3.Binary(data)))
+
+    def count(self):
+        with self._lock:
+            if self.closed:
+                return 0
+            return self._conn.execute("SELECT COUNT(*) FROM tiles").fetchone()[0]
+
+    def metadata(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT name, value FROM metadata"))
+
+    def set_metadata(self, **values):
+        with self._lock:
+            if self.closed:
+                return
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)",
+                    [(k, str(v)) for k, v in values.items()])
+
+    def close(self):
+        with self._lock:
+            if not self.closed:
+                self.closed = True
+                self._conn.close()
+
+
+# ---------------- Servidor ----------------
+
+class _Layer:
+    def __init__(self, key, cache, upstream=None, bbox=None):
+        self.key = key
+        self.cache = cache
+        self.upstream = upstream
+        self.bbox = bbox
+        self.fetched = 0
+        self.failed = 0
+
+
+_LAYER_URL = re.compile(r"127\.0\.0\.1:(?P<port>\d+)/[\w-]+/\{z\}/\{x\}/\{y\}")
+
+
+def local_ports(sources):
+    """
+    Puertos del servidor de teselas a los que apuntan las fuentes ``sources``
+    (la URL de una capa XYZ puede venir codificada: ``%7Bz%7D``).
+    """
+    return {int(m.group("port")) for source in sources
+            for m in _LAYER_URL.finditer(urllib.parse.unquote(source or ""))}
+
+
+class PortInUseError(OSError):
+    """El puerto del servidor de teselas está ocupado."""
+
+
+class TileServer:
+    """
+    Servidor XYZ en ``host`` (sólo localhost) que sirve teselas desde
+    MBTiles y completa las ausentes desde la URL de Earth Engine. Con
+    ``port=0`` el sistema elige el puerto (sólo para pruebas: las capas
+    guardadas no lo encontrarán en otra sesión). Si ``port`` está ocupado
+    lanza ``PortInUseError``, o con ``fallback`` usa uno de los
+    ``PORT_ATTEMPTS - 1`` siguientes (``moved`` es entonces verdadero).
+    """
+
+    _PATH = re.compile(r"^/(?P<key>[\w-]+)/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)(\.png)?$")
+
+    def __init__(self, directory, host="127.0.0.1", port=DEFAULT_PORT, workers=4, fetch=None,
+                 max_bytes=MAX_CACHE_BYTES, fallback=False):
+        self.directory = directory
+        self.requested_port = int(port)
+        self.max_bytes = int(max_bytes)
+        self.layers = {}
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+        self._fetch = fetch or self._download
+        self._httpd = self._bind(host, self.requested_port, fallback)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tile-prefetch")
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True,
+                                        name="tile-server")
+        self._thread.start()
+
+    def _bind(self, host, port, fallback):
+        """Escucha en ``port`` o, con ``fallback``, en el primero libre de los siguientes."""
+        candidates = [port + i for i in range(PORT_ATTEMPTS)] if port and fallback else [port]
+        for candidate in candidates:
+            try:
+                return ThreadingHTTPServer((host, candidate), self._handler())
+            except OSError:
+                continue
+        last = candidates[-1]
+        span = f"{port}" if last == port else f"{port}-{last}"
+        raise PortInUseError(f"El puerto del servidor de teselas ({span}) está ocupado.")
+
+    @property
+    def port(self):
+        return self._httpd.server_address[1]
+
+    @property
+    def moved(self):
+        """Si escucha en otro puerto que el pedido (``fallback``)."""
+        return bool(self.requested_port) and self.port != self.requested_port
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def xyz_url(self, key):
+        return f"{self.url}/{key}/{{z}}/{{x}}/{{y}}.png"
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.mbtiles")
+
+    def publish(self, key, upstream=None, bbox=None):
+        """
+        Registra (o actualiza la URL de origen de) la capa ``key`` y
+        devuelve la URL XYZ local para QGIS.
+        """
+        with self._lock:
+            layer = self.layers.get(key)
+            if layer is None:
+                path = self._path(key)
+                cache = MBTilesCache(path, bounds=bbox)
+                os.utime(path)  # uso reciente para ``evict``
+                layer = self.layers[key] = _Layer(key, cache, upstream, bbox)
+            if upstream:
+                layer.upstream = upstream
+            if bbox is not None:
+                layer.bbox = bbox
+        self.evict()
+        return self.xyz_url(key)
+
+    def has_tiles(self, key):
+        """``True`` si ya hay teselas guardadas de ``key`` (de esta u otra sesión)."""
+        if key in self.layers:
+            return self.layers[key].cache.count() > 0
+        path = self._path(key)
+        if not os.path.exists(path):
+            return False
+        cache = MBTilesCache(path)
+        try:
+            return cache.count() > 0
+        finally:
+            cache.close()
+
+    def size(self):
+        return sum(size for _, size, _ in self._files())
+
+    def _files(self):
+        """(último uso, bytes, clave) de cada MBTiles del directorio."""
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return
+        for entry in entries:
+            if not entry.name.endswith(".mbtiles"):
+                continue
+            key = entry.name[:-len(".mbtiles")]
+            size = mtime = 0
+            for suffix in ("", "-wal", "-shm"):  # las escrituras recientes están en el WAL
+                try:
+                    stat = os.stat(entry.path + suffix)
+                except OSError:
+                    continue
+                size += stat.st_size
+                mtime = max(mtime, stat.st_mtime)
+            yield mtime, size, key
+
+    def evict(self):
+        """
+        Borra los MBTiles usados hace más tiempo hasta quedar por debajo de
+        ``max_bytes``. Las capas publicadas en esta sesión no se tocan.
+        """
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        for _, size, key in files:
+            if total <= self.max_bytes:
+                break
+            if key in self.layers:
+                continue
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(self._path(key) + suffix)
+                except OSError:
+                    pass
+            total -= size
+
+    @staticmethod
+    def _download(url):
+        with urllib.request.urlopen(url, timeout=FETCH_TIMEOUT) as response:
+            return response.read()
+
+    def _layer(self, key):
+        """Capa ``key``; las de otras sesiones se abren (sin origen) desde su MBTiles."""
+        layer = self.layers.get(key)
+        if layer is None and not self._closing.is_set() and os.path.exists(self._path(key)):
+            self.publish(key)
+            layer = self.layers.get(key)
+        return layer
+
+    def tile(self, key, z, x, y):
+        """Bytes de la tesela (caché o Earth Engine) o ``None``."""
+        layer = self._layer(key)
+        if layer is None or self._closing.is_set():
+            return None
+        data = layer.cache.get(z, x, y)
+        if data is not None or not layer.upstream:
+            return data
+        try:
+            data = self._fetch(layer.upstream.format(z=z, x=x, y=y))
+        except (urllib.error.URLError, OSError, ValueError):
+            layer.failed += 1
+            return None
+        layer.cache.put(z, x, y, data)
+        layer.fetched += 1
+        return data
+
+    def prefetch(self, key, zooms=None, progress=None):
+        """
+        Precarga en segundo plano las teselas del AOI de ``key``. Devuelve
+        el ``Future`` con el número de teselas nuevas.
+        """
+        layer = self.layers[key]
+        if layer.bbox is None:
+            raise ValueError(f"La capa {key} no tiene extensión para precargar.")
+        zooms = prefetch_zooms(layer.bbox) if zooms is None else zooms
+        tiles = list(iter_tiles(layer.bbox, zooms))
+
+        def run():
+            new = 0
+            for done, (z, x, y) in enumerate(tiles, 1):
+                if self._closing.is_set():
+                    return new
+                if not layer.cache.has(z, x, y) and self.tile(key, z, x, y) is not None:
+                    new += 1
+                if progress is not None:
+                    progress(done, len(tiles))
+            layer.cache.set_metadata(minzoom=min(zooms, default=0), maxzoom=max(zooms, default=0))
+            self.evict()
+            return new
+        return self._pool.submit(run)
+
+    def shutdown(self):
+        """
+        Detiene la precarga (cada hilo termina tras su tesela en curso, como
+        mucho ``FETCH_TIMEOUT``), el servidor y cierra los MBTiles.
+        """
+        self._closing.set()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        with self._lock:
+            for layer in self.layers.values():
+                layer.cache.close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                match = server._PATH.match(self.path.split("?", 1)[0])
+                if match is None:
+                    self.send_error(404)
+                    return
+                data = server.tile(match["key"], int(match["z"]), int(match["x"]), int(match["y"]))
+                if data is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("Cache-Control", "max-age=86400")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Procesado por teselas del motor NumPy para AOIs que no caben en memoria.
+
+Cada tesela se lee con un halo suficiente para el ``focal_mean`` circular,
+la pendiente y el contexto cuadrado, de modo que el núcleo de la tesela es
+idéntico al resultado de procesar el AOI completo (sin costuras). Las
+estadísticas globales de GSW se acumulan en una pasada previa sin halo.
+
+Una *fuente* es cualquier objeto con ``shape`` (alto, ancho) y
+``read(name, rows, cols)`` que devuelve la ventana de la capa ``name``
+(``before``, ``after``, ``ndbi``, ``precip``, ``occurrence``, ``dem`` o
+``extra_water``) o ``None`` si la capa no existe.
+"""
+import math
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+from .connectivity import TiledConnectivity, permanent_water, scan_tile
+from .engine import FloodParams, run_pipeline
+from .numpy_engine import NumpyEngine, make_inputs, occurrence_stats, ow_thresholds
+
+LAYER_NAMES = ("before", "after", "ndbi", "precip", "occurrence", "dem", "extra_water")
+
+
+@dataclass(frozen=True)
+class Window:
+    """Núcleo de una tesela y su ventana de lectura con halo."""
+    row: int
+    col: int
+    height: int
+    width: int
+    read_row: int
+    read_col: int
+    read_height: int
+    read_width: int
+
+    @property
+    def rows(self):
+        return slice(self.row, self.row + self.height)
+
+    @property
+    def cols(self):
+        return slice(self.col, self.col + self.width)
+
+    @property
+    def read_rows(self):
+        return slice(self.read_row, self.read_row + self.read_height)
+
+    @property
+    def read_cols(self):
+        return slice(self.read_col, self.read_col + self.read_width)
+
+    @property
+    def core(self):
+        """Slices del núcleo dentro de la ventana de lectura."""
+        r0 = self.row - self.read_row
+        c0 = self.col - self.read_col
+        return slice(r0, r0 + self.height), slice(c0, c0 + self.width)
+
+
+def pipeline_halo(params, pixel_size):
+    """Halo (px) que necesita el núcleo: suavizado/pendiente + contexto."""
+    smoothing_px = math.ceil(params.smoothing_radius / pixel_size - 1e-9)
+    return max(smoothing_px, 1) + int(params.context_radius)
+
+
+def iter_windows(shape, tile_size, halo=0):
+    """Recorre ``shape`` en teselas de ``tile_size`` px con el halo recortado al AOI."""
+    height, width = shape
+    for row in range(0, height, tile_size):
+        for col in range(0, width, tile_size):
+            h = min(tile_size, height - row)
+            w = min(tile_size, width - col)
+            r0 = max(row - halo, 0)
+            c0 = max(col - halo, 0)
+            r1 = min(row + h + halo, height)
+            c1 = min(col + w + halo, width)
+            yield Window(row, col, h, w, r0, c0, r1 - r0, c1 - c0)
+
+
+class ArraySource:
+    """Fuente sobre arreglos 2D o pilas (n, H, W), en memoria o ``np.memmap``."""
+
+    def __init__(self, before, after, ndbi, precip, occurrence, dem, extra_water=None):
+        self.layers = {
+            "before": before, "after": after, "ndbi": ndbi, "precip": precip,
+            "occurrence": occurrence, "dem": dem, "extra_water": extra_water,
+        }
+        self.shape = tuple(np.shape(dem)[-2:])
+
+    def read(self, name, rows, cols):
+        arr = self.layers.get(name)
+        if arr is None:
+            return None
+        return np.asarray(arr[..., rows, cols])
+
+
+def read_inputs(source, rows, cols):
+    """Lee todas las capas de una ventana y las prepara como ``FloodInputs``."""
+    return make_inputs(**{name: source.read(name, rows, cols) for name in LAYER_NAMES})
+
+
+def source_ow_thresholds(source, params, tile_size=2048):
+    """Umbrales (z1, z2) de FM_OW con estadísticas acumuladas en todo el AOI."""
+    count, total, total_sq = 0, 0.0, 0.0
+    for win in iter_windows(source.shape, tile_size):
+        occ = np.asarray(source.read("occurrence", win.rows, win.cols), dtype=np.float32)
+        n, s, sq = occurrence_stats(occ)
+        count, total, total_sq = count + n, total + s, total_sq + sq
+    return ow_thresholds(count, total, total_sq, params)
+
+
+class TiledProcessor:
+    """
+    Ejecuta ``run_pipeline`` tesela a tesela. La memoria de pico depende de
+    ``tile_size`` y del halo, no del tamaño del AOI.
+    """
+
+    def __init__(self, pixel_size=10.0, pixel_area=None, params=None, tile_size=1024):
+        self.pixel_size = float(pixel_size)
+        self.pixel_area = self.pixel_size ** 2 if pixel_area is None else pixel_area
+        self.params = params or FloodParams()
+        self.tile_size = int(tile_size)
+        self.halo = pipeline_halo(self.params, self.pixel_size)
+        # La conectividad es global: las teselas se procesan sin ella (``connect``)
+        self.tile_params = replace(self.params, isolated_weight=1.0)
+
+    def windows(self, shape):
+        return list(iter_windows(shape, self.tile_size, self.halo))
+
+    def process_window(self, source, win, thresholds):
+        """Ejecuta una tesela y devuelve (capas recortadas al núcleo, área ha)."""
+        inputs = read_inputs(source, win.read_rows, win.read_cols)
+        result = run_pipeline(NumpyEngine(self.pixel_size, ow_thresholds=thresholds),
+                              inputs, self.tile_params)
+        core = win.core
+        layers = {name: layer[core] for name, layer in result.layers.items()}
+        return layers, self.window_area(win, layers["FloodedBin"])
+
+    def window_area(self, win, flooded_bin):
+        """Área (ha) del núcleo ``flooded_bin`` de la ventana ``win``."""
+        pixel_area = self.pixel_area
+        if np.ndim(pixel_area) != 0:
+            pixel_area = np.asarray(pixel_area[win.rows, win.cols])
+        return NumpyEngine(self.pixel_size, pixel_area).area_ha(flooded_bin)
+
+    def needs_connectivity(self, out):
+        """
+        Si hace falta la pasada global de conectividad para ``out``: con
+        ``0 < isolated_weight < 1`` sólo cambia ``flooded`` (FloodedBin es
+        ``flooded > 0`` y el área no varía), así que sin esa capa se omite.
+        """
+        weight = self.params.isolated_weight
+        return self.params.connectivity_enabled and (weight <= 0 or "flooded" in out)
+
+    def permanent(self, source, win):
+        """Agua permanente del núcleo de ``win``."""
+        return permanent_water(source.read("occurrence", win.rows, win.cols), self.params,
+                               source.read("extra_water", win.rows, win.cols))
+
+    def scan_window(self, source, win, flooded_bin):
+        """``TileScan`` del núcleo de ``win`` para la conectividad global."""
+        pixel_area = self.pixel_area
+        if np.ndim(pixel_area) != 0:
+            pixel_area = np.asarray(pixel_area[win.rows, win.cols])
+        return scan_tile(flooded_bin, self.permanent(source, win), pixel_area)
+
+    def connect(self, source, out, scans, area_ha):
+        """
+        Conectividad con el agua permanente sobre todo el AOI (ver
+        ``model.connectivity``) a partir de los ``TileScan`` de cada
+        tesela. Pondera ``flooded`` y, con peso 0, borra de FloodedBin las
+        zonas aisladas, tesela a tesela y sólo donde las hay. Devuelve el
+        área (ha) corregida.
+        """
+        graph = TiledConnectivity(source.shape)
+        for win, scan in scans.items():
+            graph.add(win, scan)
+        graph.resolve()
+        weight = self.params.isolated_weight
+        flooded, flooded_bin = out.get("flooded"), out.get("FloodedBin")
+        reference = flooded_bin if flooded_bin is not None else flooded
+        if reference is not None:
+            for win in scans:
+                if not graph.isolated_counts(win):
+                    continue
+                mask = np.asarray(reference[win.rows, win.cols]) > 0
+                isolated = mask & ~graph.connected(win, mask, self.permanent(source, win))
+                if flooded is not None:
+                    block = np.array(flooded[win.rows, win.cols])
+                    block[isolated] *= np.float32(weight)
+                    flooded[win.rows, win.cols] = block
+                if weight <= 0 and flooded_bin is not None:
+                    block = np.array(flooded_bin[win.rows, win.cols])
+                    block[isolated] = 0
+                    flooded_bin[win.rows, win.cols] = block
+        if weight <= 0:
+            area_ha -= graph.isolated_area_ha()
+        return area_ha
+
+    def iter_tiles(self, source, thresholds=None):
+        """Genera (ventana, capas del núcleo, área ha) para cada tesela."""
+        if thresholds is None:
+            thresholds = source_ow_thresholds(source, self.params)
+        for win in self.windows(source.shape):
+            layers, area_ha = self.process_window(source, win, thresholds)
+            yield win, layers, area_ha
+
+    def run(self, source, out=None, progress=None):
+        """
+        Procesa el AOI completo y devuelve el área inundada (ha).
+
+        ``out`` es un diccionario opcional {capa: arreglo (H, W)} (p. ej. un
+        ``np.memmap``) donde se escribe el núcleo de cada tesela.
+        ``progress(done, total)`` se llama tras cada tesela.
+        """
+        out = out or {}
+        connect = self.needs_connectivity(out)
+        total = len(self.windows(source.shape))
+        area_ha, scans = 0.0, {}
+        for done, (win, layers, tile_area) in enumerate(self.iter_tiles(source), 1):
+            area_ha += tile_area
+            for name, dst in out.items():
+                dst[win.rows, win.cols] = layers[name]
+            if connect:
+                scans[win] = self.scan_window(source, win, layers["FloodedBin"])
+            if progress is not None:
+                progress(done, total)
+        if connect:
+            area_ha = self.connect(source, out, scans, area_ha)
+        return area_ha
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Trazas por etapa de un análisis.
+
+``RunTrace`` convierte los hitos de progreso (``step(value, text)``) en
+tramos temporizados: cada texto abre un tramo nuevo y cierra el anterior.
+Por tramo se guarda el tiempo de reloj, las peticiones bloqueantes a Earth
+Engine, los bytes enviados/recibidos, la variación de memoria residente
+(``rss_delta_mb``) y, con ``trace_memory``, el pico de asignaciones
+Python/NumPy por encima del nivel inicial del tramo (``alloc_peak_mb``,
+``tracemalloc``; es global al proceso, así que incluye otros hilos).
+
+Las peticiones se anotan con ``request`` en el punto donde se hacen; la
+traza activa es por hilo (``activate``), así que varias tareas en paralelo
+no se mezclan:
+
+    trace = RunTrace({"date": "2024-10-29"})
+    with activate(trace):
+        ... step(35, "Compuestas…") ...
+        with request("getInfo", obj) as req:
+            req.response = obj.getInfo()
+    trace.finish("ok"); trace.write(directory)
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+_local = threading.local()
+
+
+def _rss_mb():
+    """Memoria residente actual del proceso (MB) o ``None`` si no se sabe."""
+    try:
+        with open("/proc/self/statm") as fh:
+            pages = int(fh.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except Exception:
+        return None
+
+
+def _traced_mb():
+    """(actual, pico) de ``tracemalloc`` en MB o ``None`` si no está activo."""
+    if not tracemalloc.is_tracing():
+        return None
+    current, peak = tracemalloc.get_traced_memory()
+    return current / 2**20, peak / 2**20
+
+
+def _round(value, digits=1):
+    return None if value is None else round(value, digits)
+
+
+def payload_size(obj):
+    """Bytes del grafo serializado de ``obj`` (``None`` si no es posible)."""
+    try:
+        import ee
+        return len(ee.serializer.toJSON(obj).encode("utf-8"))
+    except Exception:
+        return None
+
+
+def _json_size(value):
+    try:
+        return len(json.dumps(value, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return None
+
+
+class Span:
+    """Tramo entre dos hitos de progreso."""
+
+    def __init__(self, value, name, start):
+        self.value = value
+        self.name = name
+        self.start = start
+        self.end = None
+        self.round_trips = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.requests = []
+        self.rss_delta_mb = None
+        self.alloc_peak_mb = None
+        self._rss0 = _rss_mb()
+        self._traced0 = None
+        if tracemalloc.is_tracing():
+            if hasattr(tracemalloc, "reset_peak"):  # Python >= 3.9
+                tracemalloc.reset_peak()
+            self._traced0 = tracemalloc.get_traced_memory()[0] / 2**20
+
+    def close(self, end):
+        self.end = end
+        rss = _rss_mb()
+        if rss is not None and self._rss0 is not None:
+            self.rss_delta_mb = rss - self._rss0
+        traced = _traced_mb()
+        if traced is not None and self._traced0 is not None:
+            self.alloc_peak_mb = max(traced[1] - self._traced0, 0.0)
+
+    @property
+    def wall_s(self):
+        return None if self.end is None else self.end - self.start
+
+    def as_dict(self, t0):
+        return {
+            "step": self.value,
+            "name": self.name,
+            "start_s": round(self.start - t0, 4),
+            "wall_s": None if self.end is None else round(self.wall_s, 4),
+            "round_trips": self.round_trips,
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "requests": self.requests,
+            "rss_delta_mb": _round(self.rss_delta_mb),
+            "alloc_peak_mb": _round(self.alloc_peak_mb),
+        }
+
+
+class RunTrace:
+    """
+    Traza de una ejecución; es invocable como ``step(value, text)``. Con
+    ``trace_memory`` activa ``tracemalloc`` (si no lo estaba) hasta
+    ``finish``.
+    """
+
+    def __init__(self, meta=None, clock=time.perf_counter, trace_memory=False):
+        self.meta = dict(meta or {})
+        self.clock = clock
+        self.created = time.time()
+        self.t0 = clock()
+        self.spans = []
+        self.status = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._owns_tracemalloc = trace_memory and not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start()
+
+    def __call__(self, value, text=None):
+        self.step(value, text)
+
+    @property
+    def current(self):
+        return self.spans[-1] if self.spans else None
+
+    def _close(self, now):
+        span = self.current
+        if span is not None and span.end is None:
+            span.close(now)
+
+    def step(self, value, text=None):
+        """Abre un tramo nuevo si hay ``text``; sin texto sólo es progreso."""
+        if not text:
+            return
+        with self._lock:
+            now = self.clock()
+            self._close(now)
+            self.spans.append(Span(value, text, now))
+
+    def add_request(self, kind, request_bytes=None, response_bytes=None, wall_s=None):
+        with self._lock:
+            span = self.current
+            if span is None:
+                span = Span(0, "(inicio)", self.t0)
+                self.spans.append(span)
+            span.round_trips += 1
+            span.request_bytes += request_bytes or 0
+            span.response_bytes += response_bytes or 0
+            span.requests.append({
+                "kind": kind,
+                "request_bytes": request_bytes,
+                "response_bytes": response_bytes,
+                "wall_s": None if wall_s is None else round(wall_s, 4),
+            })
+
+    def finish(self, status="ok", error=None):
+        with self._lock:
+            self._close(self.clock())
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+        self.status = status
+        self.error = error
+
+    @property
+    def wall_s(self):
+        ends = [span.end for span in self.spans if span.end is not None]
+        return (max(ends) - self.t0) if ends else 0.0
+
+    @property
+    def round_trips(self):
+        return sum(span.round_trips for span in self.spans)
+
+    def as_dict(self):
+        return {
+            "meta": self.meta,
+            "created": self.created,
+            "status": self.status,
+            "error": self.error,
+            "wall_s": round(self.wall_s, 4),
+            "round_trips": self.round_trips,
+            "request_bytes": sum(span.request_bytes for span in self.spans),
+            "response_bytes": sum(span.response_bytes for span in self.spans),
+            "alloc_peak_mb": _round(max((s.alloc_peak_mb for s in self.spans
+                                         if s.alloc_peak_mb is not None), default=None)),
+            "spans": [span.as_dict(self.t0) for span in self.spans],
+        }
+
+    def stages(self):
+        """Estadísticas compactas por etapa (para guardar junto al resultado)."""
+        return [{
+            "step": span.value,
+            "name": span.name,
+            "wall_s": None if span.wall_s is None else round(span.wall_s, 3),
+            "round_trips": span.round_trips,
+            "response_bytes": span.response_bytes,
+            "rss_delta_mb": _round(span.rss_delta_mb),
+        } for span in self.spans]
+
+    def summary(self, top=3):
+        """Resumen de una línea: total y las ``top`` etapas más lentas."""
+        spans = sorted((s for s in self.spans if s.wall_s is not None),
+                       key=lambda s: s.wall_s, reverse=True)[:top]
+        parts = [f"{s.name.rstrip('…. ')} {s.wall_s:.1f} s" for s in spans]
+        text = f"Total {self.wall_s:.1f} s, {self.round_trips} peticiones"
+        return f"{text} · " + " · ".join(parts) if parts else text
+
+    def write(self, directory):
+        """Guarda la traza en ``directory`` y devuelve la ruta."""
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.created))
+        label = str(self.meta.get("date", "run"))
+        path = os.path.join(directory, f"{stamp}_{label}_{id(self) & 0xffff:04x}.json")
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(self.as_dict(), fh, ensure_ascii=False, indent=2)
+        return path
+
+
+# ---------------- Traza activa por hilo ----------------
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+@contextlib.contextmanager
+def activate(trace):
+    """Hace de ``trace`` la traza activa del hilo mientras dure el bloque."""
+    previous = current_trace()
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+class _Request:
+    response = None
+
+
+@contextlib.contextmanager
+def request(kind, obj=None):
+    """
+    Anota una petición bloqueante en la traza activa (si la hay). Asigne
+    el resultado a ``.response`` para medir los bytes recibidos.
+    """
+    trace = current_trace()
+    req = _Request()
+    if trace is None:
+        yield req
+        return
+    request_bytes = payload_size(obj) if obj is not None else None
+    t0 = time.perf_counter()
+    try:
+        yield req
+    finally:
+        trace.add_request(kind, request_bytes, _json_size(req.response),
+                          time.perf_counter() - t0)
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Las pruebas importan ``model`` y ``benchmarks`` desde la raíz del plugin."""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+class _FakeBand:
+    def __init__(self, data, nodata):
+        self.data = data
+        self.nodata = nodata
+
+    def GetNoDataValue(self):
+        return self.nodata
+
+    def ReadAsArray(self, xoff, yoff, xsize, ysize):
+        return self.data[yoff:yoff + ysize, xoff:xoff + xsize].copy()
+
+
+class _FakeDataset:
+    def __init__(self, data, nodata):
+        self.RasterYSize, self.RasterXSize = data.shape
+        self._band = _FakeBand(data, nodata)
+
+    def GetRasterBand(self, band):
+        return self._band
+
+    def GetGeoTransform(self):
+        return (0.0, 10.0, 0.0, 0.0, 0.0, -10.0)
+
+    def GetProjection(self):
+        return ""
+
+
+class FakeGdal:
+    """
+    Lo que ``model.readers.GdalRaster`` usa de ``osgeo.gdal``, sobre arreglos
+    registrados por ruta (GDAL no está en el entorno de pruebas).
+    """
+    GA_ReadOnly = 0
+
+    def __init__(self):
+        self.files = {}
+
+    def add(self, path, data, nodata=None):
+        self.files[str(path)] = (np.asarray(data), nodata)
+        return str(path)
+
+    def Open(self, path, mode):
+        if path not in self.files:
+            return None
+        return _FakeDataset(*self.files[path])
+
+
+@pytest.fixture
+def fake_gdal(monkeypatch):
+    gdal = FakeGdal()
+    monkeypatch.setattr("model.readers.gdal", gdal)
+    return gdal
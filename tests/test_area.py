@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Estimador adaptativo del área frente a la suma exacta del binario."""
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import smooth_field
+from model.area import CONFIDENCE, adaptive_area
+
+SEEDS = 200
+
+
+@pytest.fixture(scope="module")
+def flooded():
+    """Manchas suaves más píxeles sueltos que la malla gruesa no ve."""
+    rng = np.random.default_rng(3)
+    field = smooth_field((1024, 1024), 40, rng)
+    return (field > np.quantile(field, 0.7)) | (rng.random(field.shape) < 0.002)
+
+
+def _exact_ha(flooded, pixel_area):
+    return float(np.sum(np.where(flooded, pixel_area, 0.0))) / 10000
+
+
+def test_error_bound_covers_exact_sum(flooded):
+    exact = _exact_ha(flooded, 100.0)
+    misses = 0
+    for seed in range(SEEDS):
+        est = adaptive_area(flooded, 100.0, factor=16, seed=seed)
+        assert 0 < est.refined_fraction < 1
+        assert est.error_ha > 0
+        misses += abs(est.area_ha - exact) > est.error_ha
+    assert misses <= (1 - CONFIDENCE) * SEEDS
+
+
+def test_per_pixel_area(flooded):
+    rows = np.linspace(90.0, 110.0, flooded.shape[0])[:, None]
+    pixel_area = np.broadcast_to(rows, flooded.shape)
+    exact = _exact_ha(flooded, pixel_area)
+    misses = 0
+    for seed in range(SEEDS // 4):
+        est = adaptive_area(flooded, pixel_area, factor=16, seed=seed)
+        misses += abs(est.area_ha - exact) > est.error_ha
+    assert misses <= (1 - CONFIDENCE) * SEEDS / 4
+
+
+def test_census_with_per_pixel_area(flooded):
+    mask = flooded[:1000, :1000]
+    pixel_area = np.broadcast_to(np.linspace(90.0, 110.0, 1000)[:, None], mask.shape)
+    est = adaptive_area(mask, pixel_area, factor=16, samples=mask.size)
+    assert est.area_ha == pytest.approx(_exact_ha(mask, pixel_area))
+    assert est.error_ha == 0
+
+
+def test_sampling_every_interior_cell_is_exact(flooded):
+    # 1000 no es múltiplo de 16: celdas parciales en el borde del AOI
+    mask = flooded[:1000, :1000]
+    est = adaptive_area(mask, 100.0, factor=16, samples=mask.size)
+    assert est.area_ha == pytest.approx(_exact_ha(mask, 100.0))
+    assert est.error_ha == 0
+
+
+@pytest.mark.parametrize("value", [False, True])
+def test_uniform_mask(value):
+    mask = np.full((200, 300), value)
+    est = adaptive_area(mask, 100.0, factor=16)
+    assert est.area_ha == pytest.approx(_exact_ha(mask, 100.0))
+    assert est.error_ha == 0
+    assert est.refined_fraction == 0
+
+
+def test_float_mask_with_nan(flooded):
+    mask = flooded[:256, :256].astype(np.float32)
+    mask[mask == 0] = np.nan  # FloodedBin enmascarado con selfMask()
+    expected = adaptive_area(flooded[:256, :256], 100.0, seed=1)
+    assert adaptive_area(mask, 100.0, seed=1) == expected
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Lectura de manifiestos CSV/JSON del modo por lotes."""
+import json
+
+import pytest
+
+from model.batch import DEFAULTS, BatchJob, read_manifest
+
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_csv_bbox_column_and_defaults(tmp_path):
+    path = _write(tmp_path, "jobs.csv",
+                  "id,date,bbox,days_before,polarization\n"
+                  'valencia,2024-10-29,"-0.5,39.2,-0.2,39.5",,vv\n'
+                  "murcia,2019-09-13,-1.2;37.9;-0.8;38.2,0,\n")
+    jobs = read_manifest(path)
+    assert jobs[0] == BatchJob("valencia", "2024-10-29", bbox=(-0.5, 39.2, -0.2, 39.5),
+                               polarization="VV")
+    assert jobs[1].bbox == (-1.2, 37.9, -0.8, 38.2)
+    assert jobs[1].days_before == 0  # 0 es un valor, no "vacío"
+    assert jobs[1].polarization == DEFAULTS["polarization"]
+
+
+def test_csv_corner_columns_and_generated_ids(tmp_path):
+    path = _write(tmp_path, "jobs.csv",
+                  "date,xmin,ymin,xmax,ymax,orbit\n"
+                  "2024-10-29,-0.5,39.2,-0.2,39.5,ascending\n"
+                  "2024-10-30,-0.5,39.2,-0.2,39.5,\n")
+    jobs = read_manifest(path)
+    assert [job.id for job in jobs] == ["job0001", "job0002"]
+    assert jobs[0].orbit == "ASCENDING"
+    assert jobs[1].orbit == DEFAULTS["orbit"]
+
+
+@pytest.mark.parametrize("wrap", [False, True], ids=["list", "jobs"])
+def test_json_rows_with_local_inputs(tmp_path, wrap):
+    rows = [
+        {"id": "a", "date": "2024-10-29", "bbox": [-0.5, 39.2, -0.2, 39.5], "days_after": 0},
+        {"id": "b", "date": "2024-10-29", "pixel_size": 20,
+         "inputs": {"before": ["b1.tif", "b2.tif"], "dem": "dem.tif"}},
+    ]
+    path = _write(tmp_path, "jobs.json", json.dumps({"jobs": rows} if wrap else rows))
+    a, b = read_manifest(path)
+    assert a.days_after == 0 and a.inputs is None
+    assert b.bbox is None and b.pixel_size == 20.0
+    assert b.inputs == {"before": ["b1.tif", "b2.tif"], "dem": "dem.tif"}
+
+
+def test_csv_inputs_as_json(tmp_path):
+    path = _write(tmp_path, "jobs.csv",
+                  "id,date,inputs\n"
+                  'a,2024-10-29,"{""dem"": ""dem.tif""}"\n')
+    assert read_manifest(path)[0].inputs == {"dem": "dem.tif"}
+
+
+@pytest.mark.parametrize("row, message", [
+    ("x,,-0.5;39.2;-0.2;39.5", "date"),
+    ("x,2024-10-29,", "AOI"),
+    ("x,2024-10-29,-0.5;39.2;-0.2", "4 valores"),
+    ("x,2024-10-29,-0.5;39.2;-0.5;39.5", "sin área"),
+])
+def test_invalid_rows(tmp_path, row, message):
+    path = _write(tmp_path, "jobs.csv", "id,date,bbox\n" + row + "\n")
+    with pytest.raises(ValueError, match=message):
+        read_manifest(path)
+
+
+def test_duplicate_ids(tmp_path):
+    path = _write(tmp_path, "jobs.csv",
+                  "id,date,bbox\n"
+                  'a,2024-10-29,"0,0,1,1"\n'
+                  'a,2024-10-30,"0,0,1,1"\n')
+    with pytest.raises(ValueError, match="repetidos"):
+        read_manifest(path)
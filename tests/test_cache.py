@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Claves canónicas y almacenamiento acotado de ``ResultCache``."""
+import os
+import time
+
+import numpy as np
+import pytest
+
+from model.cache import ResultCache, cache_key
+from model.engine import FloodParams
+
+
+def test_key_is_canonical():
+    key = cache_key(date="2024-10-29", days=3, bbox=(-0.5, 39.2), params=FloodParams())
+    assert key == cache_key(params=FloodParams(), bbox=[-0.5, 39.2], days=3.0,
+                            date="2024-10-29")
+    assert key == cache_key(date="2024-10-29", days=np.int64(3), bbox=(-0.5, 39.2 + 1e-12),
+                            params=FloodParams().as_dict())
+    assert key != cache_key(date="2024-10-29", days=4, bbox=(-0.5, 39.2), params=FloodParams())
+    assert key != cache_key(date="2024-10-29", days=3, bbox=(-0.5, 39.2),
+                            params=FloodParams(w1=5.0))
+
+
+def test_round_trip(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    key = cache_key(date="2024-10-29")
+    assert cache.get(key) is None
+    mask = np.arange(12, dtype=np.uint8).reshape(3, 4)
+    cache.put(key, {"area_ha": np.float32(12.5), "tiles": "http://localhost/{z}/{x}/{y}"},
+              {"mask": mask})
+    assert cache.get(key) == {"area_ha": 12.5, "tiles": "http://localhost/{z}/{x}/{y}"}
+    assert np.array_equal(cache.get_array(key, "mask"), mask)
+    assert cache.get_array(key, "other") is None
+
+    cache.put(key, {"area_ha": 1.0})  # sustituye la entrada completa
+    assert cache.get(key) == {"area_ha": 1.0}
+    assert cache.get_array(key, "mask") is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 9)
+    keys = [cache_key(n=n) for n in range(3)]
+    for n, key in enumerate(keys):
+        cache.put(key, {"n": n}, {"mask": np.zeros(10000, np.uint8)})
+        past = time.time() - 100 + n
+        os.utime(cache._entry_dir(key), (past, past))
+    cache.get(keys[0])  # la más antigua pasa a ser la más reciente
+
+    cache.max_bytes = cache.size() - 1
+    cache.evict()
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == {"n": 0}
+    assert cache.get(keys[2]) == {"n": 2}
+    assert cache.size() <= cache.max_bytes
+
+
+def test_clear(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    cache.put(cache_key(n=1), {"n": 1})
+    cache.clear()
+    assert cache.size() == 0
+    assert os.path.isdir(cache.directory)
+
+
+@pytest.mark.parametrize("value", [True, False, None, "3"])
+def test_non_numbers_are_not_rounded(value):
+    assert cache_key(x=value) != cache_key(x=3)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""Exportación COG de las capas del modelo (requiere GDAL)."""
+import numpy as np
+import pytest
+
+from model.cog import export_cogs, overview_factors
+from model.kernels import UINT8_NODATA, quantize
+
+
+@pytest.mark.parametrize("shape, factors", [
+    ((512, 512), []),
+    ((513, 100), [2]),
+    ((4096, 1000), [2, 4, 8]),
+])
+def test_overview_factors(shape, factors):
+    assert overview_factors(shape) == factors
+
+
+def test_export_round_trip(tmp_path):
+    gdal = pytest.importorskip("osgeo.gdal")
+    rng = np.random.default_rng(5)
+    membership = rng.random((700, 900)).astype(np.float32)
+    membership[:10] = np.nan
+    flooded_bin = np.where(membership > 0.7, 1.0, np.nan).astype(np.float32)
+    geotransform = (700000.0, 10.0, 0.0, 4400000.0, 0.0, -10.0)
+
+    paths = export_cogs({"FloodedBin": flooded_bin, "FM3": membership, "FM_FV": None},
+                        str(tmp_path), geotransform, prefix="aoi_")
+    assert sorted(paths) == ["FM3", "FloodedBin"]
+
+    dataset = gdal.Open(paths["FM3"])
+    band = dataset.GetRasterBand(1)
+    assert dataset.GetGeoTransform() == geotransform
+    assert band.GetNoDataValue() == UINT8_NODATA
+    assert band.GetOverviewCount() == 1
+    assert np.array_equal(band.ReadAsArray(), quantize(membership))
+
+    dataset = gdal.Open(paths["FloodedBin"])
+    band = dataset.GetRasterBand(1)
+    assert band.GetNoDataValue() == 0
+    assert np.array_equal(band.ReadAsArray(), (np.nan_to_num(flooded_bin) > 0).astype(np.uint8))
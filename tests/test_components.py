@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Etiquetado por tramos (``label``/``label_tiled``) frente a un relleno por inundación."""
+from collections import deque
+
+import numpy as np
+import pytest
+
+from model.components import label, label_tiled
+
+
+def _flood_fill(mask, connectivity):
+    """Etiquetas 1..n por recorrido en anchura, píxel a píxel."""
+    if connectivity == 4:
+        steps = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    else:
+        steps = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx]
+    h, w = mask.shape
+    labels = np.zeros(mask.shape, dtype=np.int32)
+    n = 0
+    for y, x in zip(*np.nonzero(mask)):
+        if labels[y, x]:
+            continue
+        n += 1
+        labels[y, x] = n
+        queue = deque([(y, x)])
+        while queue:
+            cy, cx = queue.popleft()
+            for dy, dx in steps:
+                ny, nx = cy + dy, cx + dx
+                if 0 <= ny < h and 0 <= nx < w and mask[ny, nx] and not labels[ny, nx]:
+                    labels[ny, nx] = n
+                    queue.append((ny, nx))
+    return labels, n
+
+
+def _same_partition(a, b):
+    """Mismo fondo y correspondencia uno a uno entre etiquetas."""
+    if not np.array_equal(a > 0, b > 0):
+        return False
+    pairs = np.unique(np.stack([a[a > 0], b[b > 0]]), axis=1)
+    return len(np.unique(pairs[0])) == len(np.unique(pairs[1])) == pairs.shape[1]
+
+
+@pytest.fixture(scope="module")
+def mask():
+    rng = np.random.default_rng(11)
+    return rng.random((61, 47)) < 0.5
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+def test_label_matches_flood_fill(mask, connectivity):
+    labels, n = label(mask, connectivity)
+    expected, m = _flood_fill(mask, connectivity)
+    assert n == m
+    assert set(np.unique(labels)) == set(range(n + 1))
+    assert _same_partition(labels, expected)
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+@pytest.mark.parametrize("tile_size", [1, 5, 16, 100])
+def test_label_tiled_matches_label(mask, connectivity, tile_size):
+    labels, n = label(mask, connectivity)
+    tiled, m = label_tiled(mask, tile_size, connectivity, workers=2)
+    assert n == m
+    assert _same_partition(labels, tiled)
+
+
+def test_float_mask_with_nan():
+    mask = np.array([[1, np.nan, 0.5], [0, 0, np.nan], [2, 0, 1]], dtype=np.float32)
+    labels, n = label(mask, 4)
+    assert n == 4
+    assert np.array_equal(labels > 0, np.nan_to_num(mask) > 0)
+
+
+def test_empty_and_invalid():
+    assert label(np.zeros((4, 5), bool))[1] == 0
+    assert label_tiled(np.zeros((4, 5), bool), 2)[1] == 0
+    with pytest.raises(ValueError):
+        label(np.ones((2, 2), bool), connectivity=6)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Conectividad por teselas (``TiledConnectivity``) frente al etiquetado del
+AOI completo, tanto aislada como dentro de ``TiledProcessor``.
+"""
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_scene
+from model.connectivity import connected_to_water
+from model.engine import FloodParams, run_pipeline
+from model.numpy_engine import NumpyEngine, make_inputs
+from model.tiling import ArraySource, TiledProcessor
+
+LAYERS = ("before", "after", "ndbi", "precip", "occurrence", "dem")
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+@pytest.mark.parametrize("tile_size", [3, 7, 16])
+def test_tiled_mask_matches_full_labelling(connectivity, tile_size):
+    rng = np.random.default_rng(tile_size)
+    flooded = rng.random((53, 41)) < 0.45
+    permanent = rng.random(flooded.shape) < 0.01
+    full = connected_to_water(flooded, permanent, connectivity)
+    tiled = connected_to_water(flooded, permanent, connectivity, tile_size=tile_size, workers=2)
+    assert np.array_equal(full, tiled)
+
+
+@pytest.fixture(scope="module")
+def scene():
+    return make_scene(256)
+
+
+@pytest.mark.parametrize("weight", [0.0, 0.5])
+def test_tiled_processor_matches_whole_aoi(scene, weight):
+    params = replace(FloodParams(), isolated_weight=weight)
+    whole = run_pipeline(NumpyEngine(10.0), make_inputs(*(scene[k] for k in LAYERS)), params)
+
+    out = {"flooded": np.zeros((256, 256), np.float32),
+           "FloodedBin": np.zeros((256, 256), np.uint8)}
+    processor = TiledProcessor(10.0, params=params, tile_size=64)
+    area_ha = processor.run(ArraySource(*(scene[k] for k in LAYERS)), out=out)
+
+    assert area_ha == pytest.approx(whole.area_ha, abs=1e-6)
+    assert np.array_equal(out["FloodedBin"], whole.layers["FloodedBin"])
+    np.testing.assert_allclose(out["flooded"], whole.layers["flooded"], atol=1e-6)
+
+
+def test_partial_weight_skips_global_pass_without_flooded():
+    processor = TiledProcessor(10.0, params=replace(FloodParams(), isolated_weight=0.5))
+    assert not processor.needs_connectivity({"FloodedBin": None})
+    assert processor.needs_connectivity({"flooded": None})
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Peticiones bloqueantes del análisis Earth Engine con ``model.fake_ee``."""
+import sys
+import types
+
+import pytest
+
+from model import fake_ee
+
+RESPONSES = {"size": 2, "If": 0}
+
+
+def _analyze(**kwargs):
+    import ee
+    from model.ee_engine import analyze
+
+    geometry = ee.Geometry.Rectangle([-0.5, 39.2, -0.2, 39.5])
+    return analyze("2024-10-29", 30, 10, "VH", "DESCENDING", geometry, **kwargs)
+
+
+def test_counts_and_area_in_one_getinfo():
+    with fake_ee.installed(responses=RESPONSES) as session:
+        _, result = _analyze()
+        assert session.round_trips == 1
+        result.flooded_bin.getMapId({"min": 0, "max": 1, "palette": ["blue"]})
+    assert [kind for kind, _ in session.requests] == ["getInfo", "getMapId"]
+
+
+def test_cached_area_needs_no_getinfo():
+    with fake_ee.installed(responses=RESPONSES) as session:
+        area_ha, _ = _analyze(with_area=False)
+    assert area_ha is None
+    assert session.round_trips == 0
+
+
+@pytest.mark.parametrize("missing", ["before", "after"])
+def test_missing_scenes_fail_after_the_same_request(missing, monkeypatch):
+    # El error se decide en el cliente con los recuentos de la única petición
+    with fake_ee.installed(responses=RESPONSES) as session:
+        from model import ee_engine
+
+        real = ee_engine.evaluate_summary
+
+        def empty(counts, *args, **kwargs):
+            counts = dict(counts, **{f"{missing}_count": 0})
+            return real(counts, *args, **kwargs)
+
+        monkeypatch.setattr(ee_engine, "evaluate_summary", empty)
+        with pytest.raises(RuntimeError, match=missing):
+            _analyze()
+    assert session.getinfo_calls == 1
+
+
+def _probe(name, ee_module, monkeypatch):
+    module = types.ModuleType(name)
+    module.ee = ee_module
+    monkeypatch.setitem(sys.modules, name, module)
+    return module
+
+
+def test_uninstall_restores_exactly_the_rebound_modules(monkeypatch):
+    real = types.ModuleType("ee")
+    monkeypatch.setitem(sys.modules, "ee", real)
+    own = _probe(f"{fake_ee._PACKAGE}._probe_ee", real, monkeypatch)
+    other = _probe("third_party_probe_ee", real, monkeypatch)
+
+    with fake_ee.installed() as session:
+        assert sys.modules["ee"] is session._fake
+        assert own.ee is session._fake
+        assert other.ee is real
+    assert sys.modules["ee"] is real
+    assert own.ee is real
+    assert other.ee is real
+
+
+def test_uninstall_without_real_ee(monkeypatch):
+    monkeypatch.delitem(sys.modules, "ee", raising=False)
+    with fake_ee.installed() as first:
+        own = _probe(f"{fake_ee._PACKAGE}._probe_ee", first._fake, monkeypatch)
+    with fake_ee.installed() as second:
+        assert own.ee is second._fake
+    assert "ee" not in sys.modules
+    assert own.ee is first._fake
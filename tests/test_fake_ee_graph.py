@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Presupuesto de peticiones y de grafo del análisis Earth Engine, ejecutado
+sobre una escena sintética con ``model.fake_ee`` y contrastado con el
+motor NumPy.
+"""
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import ee_catalog, make_scene
+from model import fake_ee
+from model.engine import run_pipeline
+from model.numpy_engine import NumpyEngine, make_inputs
+
+SIZE = 128
+DATE = "2024-10-20"  # sin la mezcla T500 (sólo existe como asset en Earth Engine)
+
+# Presupuestos con algo de holgura sobre lo medido; si se superan, el grafo ha crecido.
+# getInfo lleva las dos ramas de ``area_mode="auto"`` (suma exacta y estimador adaptativo).
+MAX_GRAPH_NODES = {"getInfo": 320, "getMapId": 160}
+MAX_REQUEST_KIB = {"getInfo": 44.0, "getMapId": 22.0}
+
+
+@pytest.fixture(scope="module")
+def scene():
+    return make_scene(SIZE)
+
+
+@pytest.fixture(scope="module")
+def run(scene):
+    catalog = ee_catalog(scene, DATE, 30, 10)
+    with fake_ee.installed(catalog=catalog) as session:
+        import ee
+        from model.ee_engine import analyze
+
+        geometry = ee.Geometry.Rectangle([-0.5, 39.2, -0.2, 39.5])
+        area_ha, result = analyze(DATE, 30, 10, "VH", "DESCENDING", geometry)
+        result.flooded_bin.getMapId({"min": 0, "max": 1, "palette": ["blue"]})
+        flooded = session.compute(result.flooded_bin).array()
+    return session, area_ha, np.nan_to_num(flooded) > 0, catalog["pixel_size"]
+
+
+@pytest.fixture(scope="module")
+def local(scene, run):
+    inputs = make_inputs(*(scene[k] for k in ("before", "after", "ndbi", "precip",
+                                               "occurrence", "dem")))
+    return run_pipeline(NumpyEngine(run[3]), inputs)
+
+
+def test_two_round_trips(run):
+    session = run[0]
+    assert session.round_trips == 2
+    assert [kind for kind, _ in session.requests] == ["getInfo", "getMapId"]
+
+
+@pytest.mark.parametrize("index, kind", [(0, "getInfo"), (1, "getMapId")])
+def test_graph_budget(run, index, kind):
+    session = run[0]
+    assert session.requests[index][0] == kind
+    assert session.graph_nodes[index] <= MAX_GRAPH_NODES[kind]
+    assert session.request_bytes[index] / 1024 <= MAX_REQUEST_KIB[kind]
+
+
+def test_area_matches_numpy_engine(run, local):
+    area_ha = run[1]
+    assert local.area_ha > 0
+    assert area_ha == pytest.approx(local.area_ha, abs=0.01)
+
+
+def test_flooded_mask_matches_numpy_engine(run, local):
+    assert np.array_equal(run[2], np.nan_to_num(local.flooded_bin) > 0)
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Medias focales rápidas frente a la suma directa sobre los desplazamientos."""
+import numpy as np
+import pytest
+
+from model.focal import (FFT_RADIUS_THRESHOLD, box_mean, circle_mean, disk_offsets,
+                         neighborhood_mean, square_offsets)
+
+
+@pytest.fixture(scope="module")
+def img():
+    rng = np.random.default_rng(7)
+    a = rng.normal(0.0, 1.0, (70, 90)).astype(np.float32)
+    a[rng.random(a.shape) < 0.1] = np.nan
+    a[30:40, :] = np.nan  # banda enmascarada más ancha que los radios pequeños
+    return a
+
+
+def _loop_mean(img, offsets):
+    """Media enmascarada píxel a píxel, sin vectorizar."""
+    h, w = img.shape
+    out = np.full((h, w), np.nan)
+    for y in range(h):
+        for x in range(w):
+            if np.isnan(img[y, x]):
+                continue
+            values = [img[y + dy, x + dx] for dy, dx in offsets
+                      if 0 <= y + dy < h and 0 <= x + dx < w and not np.isnan(img[y + dy, x + dx])]
+            out[y, x] = np.mean(values, dtype=np.float64)
+    return out
+
+
+def test_neighborhood_mean_matches_loop(img):
+    small = img[25:45, :20]
+    for offsets in (square_offsets(2), disk_offsets(2.5)):
+        np.testing.assert_allclose(neighborhood_mean(small, offsets),
+                                   _loop_mean(small, offsets), rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("radius", [0, 1, 3, 8, 40])
+def test_box_mean_matches_reference(img, radius):
+    out = box_mean(img, radius)
+    assert out.dtype == img.dtype
+    np.testing.assert_allclose(out, neighborhood_mean(img, square_offsets(radius)),
+                               rtol=1e-5, atol=1e-5)
+
+
+@pytest.mark.parametrize("radius", [1, 2.5, 5, FFT_RADIUS_THRESHOLD + 3, 30])
+@pytest.mark.parametrize("method", ["auto", "runs", "fft"])
+def test_circle_mean_matches_reference(img, radius, method):
+    out = circle_mean(img, radius, method)
+    assert out.dtype == img.dtype
+    np.testing.assert_allclose(out, neighborhood_mean(img, disk_offsets(radius)),
+                               rtol=1e-4, atol=1e-5)
+
+
+def test_masked_centre_stays_masked(img):
+    nan = np.isnan(img)
+    assert np.array_equal(np.isnan(box_mean(img, 3)), nan)
+    assert np.array_equal(np.isnan(circle_mean(img, 20)), nan)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        circle_mean(np.zeros((4, 4)), 1, method="scipy")
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Pertenencias difusas de ``model.kernels`` frente a una referencia directa."""
+import numpy as np
+import pytest
+
+from model.kernels import (UINT8_NODATA, UINT8_SCALE, dequantize, fuzzy_gaussian, fuzzy_s,
+                           fuzzy_trapezoid, fuzzy_z, quantize)
+
+
+def _ramp(x, lo, hi):
+    if hi <= lo:
+        return np.where(np.isnan(x), np.nan, (x > lo).astype(np.float64))
+    return np.clip((x - lo) / (hi - lo), 0, 1)
+
+
+REFERENCE = {
+    "s": (fuzzy_s, (0.2, 0.6), lambda x, p: _ramp(x, *p)),
+    "s_step": (fuzzy_s, (0.4, 0.4), lambda x, p: _ramp(x, *p)),
+    "z": (fuzzy_z, (0.2, 0.6), lambda x, p: 1 - _ramp(x, *p)),
+    "z_step": (fuzzy_z, (0.4, 0.4), lambda x, p: 1 - _ramp(x, *p)),
+    "trapezoid": (fuzzy_trapezoid, (0.1, 0.3, 0.5, 0.9),
+                  lambda x, p: np.fmin(_ramp(x, p[0], p[1]), 1 - _ramp(x, p[2], p[3]))),
+    "trapezoid_steps": (fuzzy_trapezoid, (0.3, 0.3, 0.6, 0.6),
+                        lambda x, p: np.fmin(_ramp(x, p[0], p[1]), 1 - _ramp(x, p[2], p[3]))),
+    "gaussian": (fuzzy_gaussian, (0.5, 0.2),
+                 lambda x, p: np.exp(-0.5 * ((x - p[0]) / p[1]) ** 2)),
+}
+
+
+@pytest.fixture
+def x():
+    # Más elementos que un bloque de ``_evaluate`` para cruzar varios
+    rng = np.random.default_rng(0)
+    arr = rng.uniform(-0.2, 1.2, (300, 300)).astype(np.float32)
+    arr[rng.random(arr.shape) < 0.05] = np.nan
+    return arr
+
+
+@pytest.mark.parametrize("name", sorted(REFERENCE))
+def test_kernel_matches_reference(name, x):
+    kernel, params, reference = REFERENCE[name]
+    expected = reference(x.astype(np.float64), params)
+    np.testing.assert_allclose(kernel(x, *params), expected, atol=1e-6)
+
+
+@pytest.mark.parametrize("name", sorted(REFERENCE))
+def test_kernel_in_place_keeps_nan(name, x):
+    kernel, params, _ = REFERENCE[name]
+    expected = kernel(x, *params)
+    aliased = x.copy()
+    result = kernel(aliased, *params, out=aliased)
+    assert result is aliased
+    np.testing.assert_array_equal(np.isnan(result), np.isnan(x))
+    np.testing.assert_allclose(result, expected, atol=1e-6)
+
+
+@pytest.mark.parametrize("name", sorted(REFERENCE))
+def test_uint8_output_quantizes_float(name, x):
+    kernel, params, _ = REFERENCE[name]
+    as_float = kernel(x, *params)
+    as_uint8 = kernel(x, *params, dtype=np.uint8)
+    np.testing.assert_array_equal(as_uint8, quantize(as_float))
+    assert ((as_uint8 == UINT8_NODATA) == np.isnan(x)).all()
+    np.testing.assert_allclose(dequantize(as_uint8), as_float, atol=0.5 / UINT8_SCALE + 1e-6)
+
+
+def test_fm_hd_step_keeps_masked_dem():
+    from dataclasses import replace
+
+    from model.engine import FloodParams
+    from model.numpy_engine import NumpyEngine, slope_degrees
+
+    dem = np.tile(np.arange(16, dtype=np.float32), (16, 1))
+    dem[8, 8] = np.nan  # diferencias centrales: NaN en los vecinos del píxel
+    masked = np.isnan(slope_degrees(dem, 10.0))
+    params = replace(FloodParams(), slope_z1=3.0, slope_z2=3.0)
+    fm_hd = NumpyEngine(10.0).fm_hd(dem, params)
+    assert masked.any()
+    np.testing.assert_array_equal(np.isnan(fm_hd), masked)
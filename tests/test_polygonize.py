@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Vectorización por teselas de FloodedBin (requiere GDAL/OGR)."""
+import numpy as np
+import pytest
+
+from model.components import label
+
+ogr = pytest.importorskip("osgeo.ogr")
+from model.polygonize import polygonize  # noqa: E402
+
+GEOTRANSFORM = (700000.0, 10.0, 0.0, 4400000.0, 0.0, -10.0)
+
+
+def _features(path):
+    dataset = ogr.Open(path)
+    layer = dataset.GetLayer(0)
+    return [(feature.GetField("pixels"), feature.GetField("area_ha"),
+             feature.GetGeometryRef().GetArea()) for feature in layer]
+
+
+@pytest.mark.parametrize("tile_size", [16, 1000])
+def test_one_polygon_per_component(tmp_path, tile_size):
+    rng = np.random.default_rng(2)
+    flooded = rng.random((90, 70)) < 0.3
+    flooded[20:60, 10:50] = True  # una zona grande que cruza varias teselas
+    labels, n = label(flooded, 8)
+    path = str(tmp_path / "flooded.gpkg")
+
+    written = polygonize(flooded, path, GEOTRANSFORM, tile_size=tile_size, simplify=0,
+                         workers=2)
+    features = _features(path)
+    assert written == len(features) == n
+    assert sorted(p for p, _, _ in features) == sorted(np.bincount(labels.ravel())[1:])
+    for pixels, area_ha, geom_area in features:
+        assert area_ha == pytest.approx(pixels * 100 / 10000)
+        assert geom_area == pytest.approx(pixels * 100)
+
+
+def test_min_pixels(tmp_path):
+    flooded = np.zeros((40, 40), bool)
+    flooded[2, 2] = True
+    flooded[10:20, 10:20] = True
+    path = str(tmp_path / "flooded.gpkg")
+    assert polygonize(flooded, path, GEOTRANSFORM, min_pixels=2) == 1
+    assert [p for p, _, _ in _features(path)] == [100]
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""Todos los lectores de ``model.readers`` aceptan las mismas ventanas."""
+import numpy as np
+import pytest
+
+from model.readers import GdalRaster, NpyRaster, RasterSource
+
+WINDOWS = [
+    (slice(0, None), slice(0, None)),
+    (slice(None, None), slice(2, None)),
+    (slice(3, 7), slice(-4, None)),
+    (slice(5, 100), slice(0, 3)),
+]
+
+
+@pytest.fixture
+def data():
+    arr = np.arange(9 * 11, dtype=np.float32).reshape(9, 11)
+    arr[4, 5] = -9999
+    return arr
+
+
+@pytest.mark.parametrize("rows, cols", WINDOWS)
+def test_gdal_and_npy_read_the_same_window(data, fake_gdal, tmp_path, rows, cols):
+    np.save(tmp_path / "a.npy", data)
+    npy = NpyRaster(str(tmp_path / "a.npy"), nodata=-9999)
+    gdal = GdalRaster(fake_gdal.add(tmp_path / "a.tif", data, nodata=-9999))
+    np.testing.assert_array_equal(gdal.read(rows, cols), npy.read(rows, cols))
+    np.testing.assert_array_equal(gdal.read(rows, cols), np.where(data == -9999, np.nan, data)[rows, cols])
+
+
+def test_raster_source_mixes_readers(data, fake_gdal, tmp_path):
+    np.save(tmp_path / "dem.npy", data)
+    tif = fake_gdal.add(tmp_path / "occ.tif", data)
+    source = RasterSource(before=[tif, tif], after=tif, ndbi=tif, precip=tif,
+                          occurrence=tif, dem=str(tmp_path / "dem.npy"))
+    assert source.read("before", slice(0, None), slice(0, None)).shape == (2, 9, 11)
+    assert source.read("extra_water", slice(0, 2), slice(0, 2)) is None
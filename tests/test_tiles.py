@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Puerto del servidor de teselas (``model.tiles``): sin cambios silenciosos."""
+import socket
+
+import pytest
+
+from model.tiles import PortInUseError, TileServer, local_ports
+
+
+@pytest.fixture
+def busy_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(1)
+    yield sock.getsockname()[1]
+    sock.close()
+
+
+def test_busy_port_fails_loudly(busy_port, tmp_path):
+    with pytest.raises(PortInUseError):
+        TileServer(str(tmp_path), port=busy_port)
+
+
+def test_fallback_reports_the_new_port(busy_port, tmp_path):
+    server = TileServer(str(tmp_path), port=busy_port, fallback=True)
+    try:
+        assert server.moved
+        assert server.port != busy_port
+        assert f":{server.port}/" in server.xyz_url("k")
+    finally:
+        server.shutdown()
+
+
+def test_free_port_is_kept(tmp_path):
+    server = TileServer(str(tmp_path), port=0)
+    try:
+        assert not server.moved
+    finally:
+        server.shutdown()
+
+
+def test_local_ports_reads_plain_and_encoded_layer_urls():
+    sources = [
+        "type=xyz&url=http://127.0.0.1:47615/abc-1/{z}/{x}/{y}.png&zmin=0&zmax=22",
+        "type=xyz&url=http://127.0.0.1:47620/def/%7Bz%7D/%7Bx%7D/%7By%7D.png",
+        "type=xyz&url=https://earthengine.googleapis.com/v1/map/{z}/{x}/{y}",
+        None,
+    ]
+    assert local_ports(sources) == {47615, 47620}
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Ajuste incremental de un trabajo local (``tune_local_job`` + ``GraphCache``)."""
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_scene
+from model.batch import BatchJob, tune_local_job
+from model.engine import FloodParams, GraphCache, run_pipeline
+from model.numpy_engine import NumpyEngine, make_inputs
+
+LAYERS = ("before", "after", "ndbi", "precip", "occurrence", "dem")
+
+
+@pytest.fixture(scope="module")
+def scene():
+    return make_scene(128)
+
+
+@pytest.fixture
+def job(scene, tmp_path):
+    inputs = {}
+    for name in LAYERS:
+        inputs[name] = str(tmp_path / f"{name}.npy")
+        np.save(inputs[name], scene[name])
+    return BatchJob("tuning", "2024-10-20", inputs=inputs, pixel_size=10.0)
+
+
+def test_rerun_reuses_inputs_and_upstream_stages(job, scene, monkeypatch):
+    graphs = GraphCache()
+    tune_local_job(job, graphs=graphs)
+    graph = graphs.latest
+
+    # Las entradas ya compuestas no se vuelven a leer
+    monkeypatch.setattr("model.readers.RasterSource.__init__", None)
+    params = replace(FloodParams(), w1=5.0)
+    result = tune_local_job(job, params, graphs=graphs)
+
+    assert graphs.latest is graph
+    assert graph.computed == ["fuse", "context", "flooded", "area"]
+    whole = run_pipeline(NumpyEngine(10.0), make_inputs(*(scene[k] for k in LAYERS)), params)
+    assert result.area_ha == pytest.approx(whole.area_ha)
+
+
+def test_cache_keeps_most_recent_jobs(job):
+    other = replace(job, pixel_size=20.0)
+    graphs = GraphCache(size=1)
+    tune_local_job(job, graphs=graphs)
+    first = graphs.latest
+    tune_local_job(other, graphs=graphs)
+    tune_local_job(job, graphs=graphs)
+    assert graphs.latest is not first
+
+
+def test_gdal_backed_job_matches_npy(job, scene, fake_gdal, tmp_path):
+    tifs = {}
+    for name in LAYERS:
+        if np.ndim(scene[name]) == 3:  # pilas S1/CHIRPS: una escena por fichero
+            tifs[name] = [fake_gdal.add(tmp_path / f"{name}_{i}.tif", layer)
+                          for i, layer in enumerate(scene[name])]
+        else:
+            tifs[name] = fake_gdal.add(tmp_path / f"{name}.tif", scene[name])
+    gdal_job = replace(job, inputs=tifs)
+
+    result = tune_local_job(gdal_job, graphs=GraphCache())
+    assert result.area_ha == pytest.approx(tune_local_job(job, graphs=GraphCache()).area_ha)